@@ -4,16 +4,27 @@ from .shinglegenerator import ShingleGenerator
 from .sieve import Sieve
 from .document import Document, InMemoryDocument
 from .corpus import Corpus, InMemoryCorpus
-from .dictionary import Dictionary, InMemoryDictionary
-from .posting import Posting
-from .postinglist import PostingList, InMemoryPostingList, CompressedInMemoryPostingList
+from .dictionary import Dictionary, InMemoryDictionary, FrontCodedDictionary, PerfectHashDictionary
+from .posting import Posting, PositionalPosting
+from .postingcodec import PostingCodec, VariableBytePostingCodec, BitPackingCodec, PForDeltaCodec, Simple8bCodec, EliasGammaCodec
+from .postingcursor import PostingCursor, IteratorPostingCursor, PostingCursorIterator
+from .postinglist import PostingList, InMemoryPostingList, CompressedInMemoryPostingList, ImpactOrderedPostingList
 from .invertedindex import InvertedIndex, InMemoryInvertedIndex
+from .mappedinvertedindex import MappedInvertedIndex
+from .spimiindexbuilder import SpimiIndexBuilder
+from .segmentedinvertedindex import SegmentedInvertedIndex
 from .stringfinder import Trie, StringFinder
+from .querycache import QueryCache
+from .tracer import Tracer, RecordingTracer, JsonLinesExporter
 from .suffixarray import SuffixArray
 from .postingsmerger import PostingsMerger
+from .wildcardexpander import WildcardExpander
 from .simplesearchengine import SimpleSearchEngine
+from .impactsearchengine import ImpactSearchEngine
+from .phrasesearchengine import PhraseSearchEngine
 from .ranker import Ranker, SimpleRanker
 from .betterranker import BetterRanker
+from .bm25ranker import BM25Ranker, BM25FRanker
 from .naivebayesclassifier import NaiveBayesClassifier
 from .variablebytecodec import VariableByteCodec
 from .expressioncomposer import ExpressionComposer
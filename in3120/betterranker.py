@@ -2,6 +2,10 @@
 # -*- coding: utf-8 -*-
 
 import math
+import itertools
+import numpy as np
+from array import array
+from typing import Optional
 from .ranker import Ranker
 from .corpus import Corpus
 from .posting import Posting
@@ -31,8 +35,42 @@ class BetterRanker(Ranker):
         self._document_id = None
         self._corpus = corpus
         self._inverted_index = inverted_index
+        self._generation = None  # What the cached information below was derived from.
+        self._idf_scores = {}  # Computed on demand, per term.
+        self._static_scores = None  # Computed on demand, indexed by document identifier.
+        self._static_upper_bound = None  # Computed on demand.
+
+    def _validate(self) -> None:
+        # The cached information depends on the corpus size and on the document frequencies, so it
+        # needs to be recomputed if the corpus or the index changes.
+        generation = (self._corpus.size(), self._inverted_index.get_generation())
+        if generation != self._generation:
+            self._generation = generation
+            self._idf_scores = {}
+            self._static_scores = None
+            self._static_upper_bound = None
+
+    def _get_idf_score(self, term: str) -> float:
+        idf_score = self._idf_scores.get(term)
+        if idf_score is None:
+            idf_score = math.log10(self._corpus.size() / float(self._inverted_index.get_document_frequency(term)))
+            self._idf_scores[term] = idf_score
+        return idf_score
+
+    def _get_static_scores(self) -> array:
+        # A dense column of static scores, so that we don't have to look up and parse the field of
+        # every document that we score. That requires a full pass over the corpus, so do that only once.
+        if self._static_scores is None:
+            scores = [(d.document_id, float(d[self._static_score_field_name] or self._static_score_default_value))
+                      for d in self._corpus]
+            size = 1 + max((document_id for (document_id, _) in scores), default=-1)
+            self._static_scores = array("d", itertools.repeat(self._static_score_default_value, size))
+            for (document_id, score) in scores:
+                self._static_scores[document_id] = score
+        return self._static_scores
 
     def reset(self, document_id: int) -> None:
+        self._validate()
         self._score = 0.0
         self._document_id = document_id
 
@@ -43,8 +81,7 @@ class BetterRanker(Ranker):
         assert posting.term_frequency > 0
         assert posting.document_id == self._document_id
         tf_score = 1.0 + math.log10(posting.term_frequency)
-        idf_score = math.log10(self._corpus.size() / float(self._inverted_index.get_document_frequency(term)))
-        self._score += (1.0 + math.log10(multiplicity)) * tf_score * idf_score
+        self._score += (1.0 + math.log10(multiplicity)) * tf_score * self._get_idf_score(term)
 
     def evaluate(self) -> float:
         # Now that the dynamic (query-dependent) score is fully updated, combine it
@@ -52,6 +89,36 @@ class BetterRanker(Ranker):
         # ways of combining the two are plausible. In a large real-world search system,
         # weights would be machine-learnt offline and it'd be up to the chosen ML model
         # how to best combine the many features to yield a compound relevance score.
-        document = self._corpus[self._document_id]
-        static_quality_score = float(document[self._static_score_field_name] or self._static_score_default_value)
+        static_quality_score = self._get_static_scores()[self._document_id]
         return (self._dynamic_score_weight * self._score) + (self._static_score_weight * static_quality_score)
+
+    def get_upper_bound(self, term: str, multiplicity: int, maximum_term_frequency: int) -> Optional[float]:
+        # Mirrors update/3, assuming the largest possible term frequency. Both the TF and IDF
+        # scores are non-negative and the TF score is monotonically increasing.
+        self._validate()
+        if self._inverted_index.get_document_frequency(term) == 0 or maximum_term_frequency == 0:
+            return 0.0
+        tf_score = 1.0 + math.log10(maximum_term_frequency)
+        return self._dynamic_score_weight * (1.0 + math.log10(multiplicity)) * tf_score * self._get_idf_score(term)
+
+    def get_static_upper_bound(self) -> float:
+        # Mirrors evaluate/0. The dynamic part is accounted for by the per-term bounds, so we only
+        # need the largest static score in the corpus.
+        self._validate()
+        if self._static_upper_bound is None:
+            scores = self._get_static_scores()
+            self._static_upper_bound = self._static_score_weight * max(scores, default=self._static_score_default_value)
+        return self._static_upper_bound
+
+    def get_term_score(self, term: str, multiplicity: int, term_frequency: int) -> Optional[float]:
+        # Mirrors update/3, operation by operation, so that the results are identical.
+        self._validate()
+        tf_score = 1.0 + math.log10(term_frequency)
+        return (1.0 + math.log10(multiplicity)) * tf_score * self._get_idf_score(term)
+
+    def evaluate_many(self, document_ids: np.ndarray, scores: np.ndarray) -> np.ndarray:
+        # Mirrors evaluate/0, operation by operation, so that the results are identical. The static
+        # scores can be viewed as a NumPy array without copying them.
+        self._validate()
+        static_scores = np.frombuffer(self._get_static_scores(), dtype=np.float64)
+        return (self._dynamic_score_weight * scores) + (self._static_score_weight * static_scores[document_ids])
@@ -0,0 +1,274 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import math
+import itertools
+from array import array
+from typing import Dict, List, Optional, Tuple
+from .ranker import Ranker
+from .corpus import Corpus
+from .posting import Posting
+from .invertedindex import InvertedIndex
+
+
+class BM25Ranker(Ranker):
+    """
+    A ranker that does Okapi BM25 ranking. Unlike TF-IDF ranking, BM25 saturates the term
+    frequencies and normalizes them for document length, so that long documents don't win
+    just because they mention the query terms many times.
+
+    The document lengths are looked up in the inverted index, so the index has to keep
+    track of these. Repeated query terms are handled by simply scaling a term's contribution
+    by its multiplicity in the query.
+
+    See Section 11.4.3 in https://nlp.stanford.edu/IR-book/pdf/irbookonlinereading.pdf. We use
+    the IDF variant that never goes negative, as in Lucene.
+    """
+
+    def __init__(self, corpus: Corpus, inverted_index: InvertedIndex, k1: float = 1.2, b: float = 0.75):
+        assert k1 >= 0.0
+        assert 0.0 <= b <= 1.0
+        self._k1 = k1
+        self._b = b
+        self._score = 0.0
+        self._document_id = None
+        self._corpus = corpus
+        self._inverted_index = inverted_index
+        self._generation = None  # What the cached information below was derived from.
+        self._idf_scores = {}  # Computed on demand, per term.
+        self._normalizations = None  # Computed on demand, indexed by document identifier.
+
+    def _validate(self) -> None:
+        # The cached information depends on the corpus size, on the document frequencies, and on
+        # the document lengths, so it needs to be recomputed if the corpus or the index changes.
+        generation = (self._corpus.size(), self._inverted_index.get_generation())
+        if generation != self._generation:
+            self._generation = generation
+            self._idf_scores = {}
+            self._normalizations = None
+
+    def _get_idf_score(self, term: str) -> float:
+        idf_score = self._idf_scores.get(term)
+        if idf_score is None:
+            size = self._corpus.size()
+            document_frequency = self._inverted_index.get_document_frequency(term)
+            idf_score = math.log(1.0 + (size - document_frequency + 0.5) / (document_frequency + 0.5))
+            self._idf_scores[term] = idf_score
+        return idf_score
+
+    def _get_normalization(self, document_id: int) -> float:
+        """
+        Returns the length normalization factor for the given document, i.e., what gets multiplied
+        by k1 in the denominator of the BM25 formula. Documents of average length get 1.0.
+        """
+        length = self._inverted_index.get_document_length(document_id)
+        average = self._inverted_index.get_average_document_length()
+        assert length is not None and average is not None, "The index doesn't keep track of document lengths"
+        return (1.0 - self._b) + (self._b * length / average if average else 0.0)
+
+    def _get_minimum_normalization(self) -> float:
+        """
+        Returns the smallest normalization factor across all documents. This is what the
+        shortest documents get.
+        """
+        return min(self._get_normalizations(), default=1.0)
+
+    def _get_normalizations(self) -> array:
+        # The normalization factors are query-independent, so compute them all in one go and look
+        # them up in O(1) time per scored document.
+        if self._normalizations is None:
+            document_ids = [d.document_id for d in self._corpus]
+            self._normalizations = array("d", itertools.repeat(1.0, 1 + max(document_ids, default=-1)))
+            for document_id in document_ids:
+                self._normalizations[document_id] = self._get_normalization(document_id)
+        return self._normalizations
+
+    def reset(self, document_id: int) -> None:
+        self._validate()
+        self._score = 0.0
+        self._document_id = document_id
+
+    def update(self, term: str, multiplicity: int, posting: Posting) -> None:
+        assert term is not None
+        assert multiplicity > 0
+        assert posting is not None
+        assert posting.term_frequency > 0
+        assert posting.document_id == self._document_id
+        tf = posting.term_frequency
+        tf_score = tf * (self._k1 + 1.0) / (tf + self._k1 * self._get_normalizations()[self._document_id])
+        self._score += multiplicity * tf_score * self._get_idf_score(term)
+
+    def evaluate(self) -> float:
+        return self._score
+
+    def get_upper_bound(self, term: str, multiplicity: int, maximum_term_frequency: int) -> Optional[float]:
+        # Mirrors update/3. The TF score increases with the term frequency and decreases with the
+        # normalization factor, so assume the largest term frequency and the shortest document.
+        self._validate()
+        if self._inverted_index.get_document_frequency(term) == 0 or maximum_term_frequency == 0:
+            return 0.0
+        tf = maximum_term_frequency
+        tf_score = tf * (self._k1 + 1.0) / (tf + self._k1 * self._get_minimum_normalization())
+        return multiplicity * tf_score * self._get_idf_score(term)
+
+
+class BM25FRanker(BM25Ranker):
+    """
+    A fielded variant of the BM25 ranker, where the length normalization takes the document's
+    fields into account. Each field has a weight and its own b parameter, and a document's
+    normalization factor is the weighted average of the per-field normalization factors, where
+    each field's length is compared to the field's average length. This way, a long body field
+    doesn't get penalized the same way as an overly long title field.
+
+    If the inverted index is fielded and keeps track of all the weighted fields, we do full BM25F:
+    The term frequencies are looked up per field, length normalized per field, and then combined
+    into a single pseudo term frequency using the field weights as boosts before saturation. A hit
+    in a field with weight 3.0 then counts as much as three hits in a field with weight 1.0. If a
+    query term is qualified by a field, e.g., 'title:foo', only that field contributes, and if that
+    field isn't weighted then the query term is scored as if the index weren't fielded. Otherwise,
+    the index aggregates the term frequencies across the indexed fields, so the term frequencies
+    are not weighted per field. Only the length normalization is.
+
+    In the fielded case, the ranker uses the term frequencies in the postings it is given as far as
+    it can, and looks up the remaining per-field term frequencies in the index. That is cheapest if
+    the documents are scored in order of increasing document identifiers, but any order gives the
+    same scores.
+
+    See "Simple BM25 Extension to Multiple Weighted Fields" by Robertson et al.
+    """
+
+    def __init__(self, corpus: Corpus, inverted_index: InvertedIndex, field_weights: Dict[str, float],
+                 k1: float = 1.2, b: Optional[Dict[str, float]] = None):
+        super().__init__(corpus, inverted_index, k1)
+        assert field_weights
+        assert all(weight >= 0.0 for weight in field_weights.values())
+        assert sum(field_weights.values()) > 0.0
+        self._field_weights = field_weights
+        self._field_bs = {f: (b or {}).get(f, 0.75) for f in field_weights}
+        assert all(0.0 <= b <= 1.0 for b in self._field_bs.values())
+        self._fielded = False  # Can we look up the term frequencies per field?
+        self._complete = False  # Do the weighted fields add up to the term frequencies in the postings?
+        self._field_terms = {}  # Computed on demand, per query term.
+        self._field_normalizations = None  # Computed on demand, per field and indexed by document identifier.
+        self._cursors = {}  # Per field-qualified term, for looking up the per-field term frequencies.
+
+    def _validate(self) -> None:
+        generation = self._generation
+        super()._validate()
+        if generation != self._generation:
+            self._fielded = set(self._field_weights) <= set(self._inverted_index.get_indexed_fields())
+            self._complete = self._fielded and set(self._field_weights) == set(self._inverted_index.get_indexed_fields())
+            self._field_terms = {}
+            self._field_normalizations = None
+            self._cursors = {}
+
+    def _get_normalization(self, document_id: int) -> float:
+        weighted, total = 0.0, 0.0
+        for (field, weight) in self._field_weights.items():
+            weighted += weight * self._get_field_normalization(document_id, field)
+            total += weight
+        return weighted / total
+
+    def _get_field_normalization(self, document_id: int, field: str) -> float:
+        b = self._field_bs[field]
+        length = self._inverted_index.get_document_length(document_id, field)
+        average = self._inverted_index.get_average_document_length(field)
+        assert length is not None and average is not None, "The index doesn't keep track of field lengths"
+        return (1.0 - b) + (b * length / average if average else 0.0)
+
+    def _get_field_normalizations(self) -> Dict[str, array]:
+        # Like the overall normalization factors, these are query-independent.
+        if self._field_normalizations is None:
+            document_ids = [d.document_id for d in self._corpus]
+            self._field_normalizations = {}
+            for field in self._field_weights:
+                normalizations = array("d", itertools.repeat(1.0, 1 + max(document_ids, default=-1)))
+                for document_id in document_ids:
+                    normalizations[document_id] = self._get_field_normalization(document_id, field)
+                self._field_normalizations[field] = normalizations
+        return self._field_normalizations
+
+    def _get_field_terms(self, term: str) -> List[Tuple[str, str]]:
+        """
+        Returns the (field, field-qualified term) pairs that contribute to the given query term's score. If
+        the query term is already qualified by a field that isn't weighted, none do.
+        """
+        field_terms = self._field_terms.get(term)
+        if field_terms is None:
+            fields = self._inverted_index.get_indexed_fields()
+            qualified = [f for f in fields if term.startswith(self._inverted_index.qualify(f, ""))]
+            field_terms = [(f, term) for f in qualified if f in self._field_weights] if qualified else \
+                [(f, self._inverted_index.qualify(f, term)) for f in self._field_weights]
+            self._field_terms[term] = field_terms
+        return field_terms
+
+    def _get_field_term_frequency(self, qualified_term: str) -> int:
+        # The per-field cursors move forward alongside the cursor the postings come from, so that each one only
+        # moves when it's behind. Documents are usually scored in order of increasing document identifiers. If
+        # they aren't, e.g., because a new query is evaluated, we start over.
+        entry = self._cursors.get(qualified_term)
+        if entry is None or self._document_id < entry[1]:
+            entry = [self._inverted_index.get_postings_cursor(qualified_term), self._document_id]
+            self._cursors[qualified_term] = entry
+        cursor, entry[1] = entry[0], self._document_id
+        if cursor.document_id is not None and cursor.document_id < self._document_id:
+            cursor.advance_to(self._document_id)
+        return cursor.term_frequency if cursor.document_id == self._document_id else 0
+
+    def _get_field_term_frequencies(self, term: str, posting: Posting) -> List[Tuple[str, int]]:
+        """
+        Returns the (field, term frequency) pairs for the given query term and its posting. The posting
+        already holds the term frequency of a field-qualified term, or the sum of the per-field term
+        frequencies if the weighted fields are all the indexed fields. Only the rest is looked up.
+        """
+        field_terms = self._get_field_terms(term)
+        if field_terms and field_terms[0][1] == term:
+            return [(field_terms[0][0], posting.term_frequency)]
+        field_tfs = [(f, self._get_field_term_frequency(t)) for (f, t) in field_terms[:-1 if self._complete else None]]
+        if self._complete:
+            remainder = posting.term_frequency - sum(tf for (_, tf) in field_tfs)
+            assert remainder >= 0, "The posting doesn't agree with the per-field postings"
+            field_tfs.append((field_terms[-1][0], remainder))
+        return field_tfs
+
+    def reset(self, document_id: int) -> None:
+        # Starting over, e.g., because a new query is evaluated? Then let go of the cursors.
+        if self._document_id is not None and document_id < self._document_id:
+            self._cursors = {}
+        super().reset(document_id)
+
+    def update(self, term: str, multiplicity: int, posting: Posting) -> None:
+        if not self._fielded or not self._get_field_terms(term):
+            super().update(term, multiplicity, posting)
+            return
+        assert term is not None
+        assert multiplicity > 0
+        assert posting is not None
+        assert posting.term_frequency > 0
+        assert posting.document_id == self._document_id
+        normalizations = self._get_field_normalizations()
+        tf = 0.0
+        for (field, field_tf) in self._get_field_term_frequencies(term, posting):
+            if field_tf:
+                tf += self._field_weights[field] * field_tf / normalizations[field][self._document_id]
+        tf_score = tf * (self._k1 + 1.0) / (tf + self._k1)
+        self._score += multiplicity * tf_score * self._get_idf_score(term)
+
+    def get_upper_bound(self, term: str, multiplicity: int, maximum_term_frequency: int) -> Optional[float]:
+        # Mirrors update/3. The pseudo term frequency increases with the per-field term frequencies and decreases
+        # with the per-field normalization factors, so assume the largest of the former and the smallest of the latter.
+        self._validate()
+        if not self._fielded or not self._get_field_terms(term):
+            return super().get_upper_bound(term, multiplicity, maximum_term_frequency)
+        if self._inverted_index.get_document_frequency(term) == 0:
+            return 0.0
+        normalizations = self._get_field_normalizations()
+        tf = 0.0
+        for (field, qualified_term) in self._get_field_terms(term):
+            field_tf = self._inverted_index.get_maximum_term_frequency(qualified_term)
+            if field_tf is None:
+                return None
+            if field_tf:
+                tf += self._field_weights[field] * field_tf / min(normalizations[field], default=1.0)
+        tf_score = tf * (self._k1 + 1.0) / (tf + self._k1)
+        return multiplicity * tf_score * self._get_idf_score(term)
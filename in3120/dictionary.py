@@ -3,7 +3,13 @@
 
 from abc import abstractmethod
 import collections.abc
-from typing import Optional
+import hashlib
+import mmap
+import struct
+import numpy as np
+from array import array
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+from .variablebytecodec import VariableByteCodec
 
 
 class Dictionary(collections.abc.Iterable):
@@ -79,3 +85,332 @@ class InMemoryDictionary(Dictionary):
 
     def get_term_id(self, term: str) -> Optional[int]:
         return self._terms.get(term, None)
+
+    def freeze(self) -> "FrontCodedDictionary":
+        """
+        Returns a compact, read-only copy of the dictionary. The term identifiers are retained.
+        """
+        return FrontCodedDictionary(self)
+
+
+class FrontCodedDictionary(Dictionary):
+    """
+    A compact, read-only dictionary, suitable for large vocabularies. Built once from some other
+    dictionary, e.g., after indexing is done, and uses several times less memory than a Python dict.
+    See Section 5.2 in https://nlp.stanford.edu/IR-book/pdf/05comp.pdf for details.
+
+    The terms are sorted and UTF-8 encoded, and then divided into blocks of consecutive terms. The first
+    term in each block is stored in full, whereas each of the remaining ones is stored as the length
+    of the prefix it shares with the preceding term plus the remaining suffix. The lengths are variable-byte
+    encoded and kept apart from the suffixes, so that both can be kept in single byte buffers. A term
+    is looked up by doing binary search over the block heads and then decoding a single block.
+
+    Since the terms are stored sorted, we need two arrays to map between a term's rank in sorted order
+    and its identifier. That way, we can also map term identifiers back to terms.
+    """
+
+    # How many terms to put in each block. Larger blocks compress better, but make lookups slower.
+    _block_size = 16
+
+    def __init__(self, terms: Iterable[Tuple[str, int]]):
+        entries = sorted((term.encode("utf-8"), term_id) for (term, term_id) in terms)
+        self.__lengths = bytearray()  # The variable-byte encoded (shared, suffix) length pairs.
+        self.__suffixes = bytearray()  # The term suffixes, concatenated.
+        self.__length_offsets = array("I")  # Where each block starts in the lengths buffer.
+        self.__suffix_offsets = array("I")  # Where each block starts in the suffixes buffer.
+        self.__term_ids = array("I")  # The term identifier, per rank.
+        self.__ranks = array("I", bytes(4 * len(entries)))  # The rank, per term identifier.
+        previous = b""
+        for (rank, (term, term_id)) in enumerate(entries):
+            assert 0 <= term_id < len(entries), "Term identifiers must be dense"
+            if rank % self._block_size == 0:
+                self.__length_offsets.append(len(self.__lengths))
+                self.__suffix_offsets.append(len(self.__suffixes))
+                shared = 0
+            else:
+                assert term != previous, "Terms must be unique"
+                shared = next((i for (i, (a, b)) in enumerate(zip(previous, term)) if a != b), min(len(previous), len(term)))
+            VariableByteCodec.encode(shared, self.__lengths)
+            VariableByteCodec.encode(len(term) - shared, self.__lengths)
+            self.__suffixes.extend(term[shared:])
+            self.__term_ids.append(term_id)
+            self.__ranks[term_id] = rank
+            previous = term
+        self.__lengths = bytes(self.__lengths)
+        self.__suffixes = bytes(self.__suffixes)
+
+    def __iter__(self):
+        """
+        Yields all (term, term identifier) pairs, with the terms in sorted order.
+        """
+        for block in range(len(self.__length_offsets)):
+            for (rank, term) in self.__decode_block(block):
+                yield (term.decode("utf-8"), self.__term_ids[rank])
+
+    def size(self) -> int:
+        return len(self.__term_ids)
+
+    def add_if_absent(self, term: str) -> int:
+        term_id = self.get_term_id(term)
+        assert term_id is not None, "The dictionary is frozen"
+        return term_id
+
+    def get_term_id(self, term: str) -> Optional[int]:
+        needle = term.encode("utf-8")
+
+        # Locate the last block whose head does not come after the term. Only that block can contain it.
+        low = 0
+        high = len(self.__length_offsets)
+        while low < high:
+            middle = (low + high) // 2
+            if self.__get_head(middle) <= needle:
+                low = middle + 1
+            else:
+                high = middle
+        if low == 0:
+            return None
+
+        # Decode the block until we find the term, or pass where it should have been.
+        for (rank, candidate) in self.__decode_block(low - 1):
+            if candidate >= needle:
+                return self.__term_ids[rank] if candidate == needle else None
+        return None
+
+    def get_term(self, term_id: int) -> Optional[str]:
+        """
+        Looks up the term that has the given term identifier. If there is no such term, None is returned.
+        """
+        if not 0 <= term_id < len(self.__ranks):
+            return None
+        rank = self.__ranks[term_id]
+        for (i, term) in self.__decode_block(rank // self._block_size):
+            if i == rank:
+                return term.decode("utf-8")
+
+    def get_byte_size(self) -> int:
+        """
+        Returns the number of bytes occupied by the buffers and arrays that make up the dictionary.
+        """
+        arrays = (self.__length_offsets, self.__suffix_offsets, self.__term_ids, self.__ranks)
+        return len(self.__lengths) + len(self.__suffixes) + sum(a.itemsize * len(a) for a in arrays)
+
+    def thaw(self) -> InMemoryDictionary:
+        """
+        Returns a mutable copy of the dictionary. The term identifiers are retained.
+        """
+        dictionary = InMemoryDictionary()
+        for term_id in range(self.size()):
+            dictionary.add_if_absent(self.get_term(term_id))
+        return dictionary
+
+    def __get_head(self, block: int) -> bytes:
+        # The first term in a block shares no prefix with anything, so the second length is its full length.
+        where = self.__length_offsets[block]
+        where += VariableByteCodec.decode(self.__lengths, where)[1]
+        (length, _) = VariableByteCodec.decode(self.__lengths, where)
+        start = self.__suffix_offsets[block]
+        return self.__suffixes[start:start + length]
+
+    def __decode_block(self, block: int) -> Iterator[Tuple[int, bytes]]:
+        # Yields the (rank, term) pairs in the given block, in sorted order.
+        where = self.__length_offsets[block]
+        start = self.__suffix_offsets[block]
+        first = block * self._block_size
+        term = b""
+        for rank in range(first, min(first + self._block_size, len(self.__term_ids))):
+            (shared, increment) = VariableByteCodec.decode(self.__lengths, where)
+            where += increment
+            (length, increment) = VariableByteCodec.decode(self.__lengths, where)
+            where += increment
+            term = term[:shared] + self.__suffixes[start:start + length]
+            start += length
+            yield (rank, term)
+
+
+class PerfectHashDictionary(Dictionary):
+    """
+    A read-only dictionary that maps each of the N terms it was built from onto {0, .., N - 1} via a
+    minimal perfect hash function, using the "hash, displace, and compress" (CHD) scheme by Belazzougui et al.
+    The term identifiers are given by the hash function, and not by the order in which the terms were
+    supplied. By default the terms are stored too, ordered by term identifier, so that the dictionary can
+    be iterated over and term identifiers can be mapped back to terms. If that isn't needed, the terms can
+    be left out, and the dictionary then only needs a few bytes per term.
+
+    Each term is hashed into a bucket, and all buckets are assigned a displacement at build time so that
+    no two terms end up in the same slot. Looking up a term then takes O(1) time: Hash the term, look up
+    its bucket's displacement, and compute the slot. A small fingerprint of each term is kept per slot,
+    so that out-of-vocabulary terms are rejected, except with probability 1/65536.
+
+    Everything lives in a single flat buffer, so that the dictionary can be written to disk and accessed
+    via memory mapping, e.g., alongside a persistent inverted index.
+    """
+
+    # The layout of the buffer header. Everything is little-endian. The header is followed by the
+    # per-bucket displacements, each one a fixed-width integer, and then by the per-slot fingerprints.
+    # If the terms are stored, these come last: The per-slot offsets into the UTF-8 encoded terms, with
+    # an extra offset at the end, followed by the concatenated terms.
+    _header = struct.Struct("<8sIIIIII")
+    _fingerprint = struct.Struct("<H")
+    _offset = struct.Struct("<I")
+    _magic = b"IN3120PH"
+    _version = 2
+
+    # The average number of terms per bucket. Larger buckets save space, but take longer to build.
+    _bucket_size = 5
+
+    # How many displacements to try per bucket before giving up on a seed. Bounds the build time, as the
+    # search would otherwise be quadratic in the number of terms in the worst case.
+    _displacements = 1024
+
+    # How many seeds to try before giving up. Failure is virtually impossible unless the terms repeat.
+    _attempts = 20
+
+    def __init__(self, terms: Iterable[str], store_terms: bool = True):
+        terms = [term.encode("utf-8") for term in terms]
+        assert len(set(terms)) == len(terms), "Terms must be unique"
+        for seed in range(self._attempts):
+            data = self.__build(terms, seed, store_terms)
+            if data is not None:
+                self.__load(data)
+                return
+        assert False, "Failed to build the perfect hash function"
+
+    @staticmethod
+    def from_buffer(buffer: Union[bytes, bytearray, memoryview, mmap.mmap]) -> "PerfectHashDictionary":
+        """
+        Loads a dictionary from the given buffer, as produced by get_buffer/0. Nothing is copied, so
+        the buffer can be, e.g., memory mapped.
+        """
+        dictionary = PerfectHashDictionary.__new__(PerfectHashDictionary)
+        dictionary.__load(buffer)
+        return dictionary
+
+    def get_buffer(self) -> Union[bytes, bytearray, memoryview, mmap.mmap]:
+        """
+        Returns the buffer that holds the complete dictionary.
+        """
+        return self.__data
+
+    def __iter__(self):
+        """
+        Yields all (term, term identifier) pairs, ordered by term identifier. Requires that the terms are stored.
+        """
+        assert self.__terms_offset, "The terms are not stored"
+        for term_id in range(self.__count):
+            yield (self.get_term(term_id), term_id)
+
+    def size(self) -> int:
+        return self.__count
+
+    def add_if_absent(self, term: str) -> int:
+        term_id = self.get_term_id(term)
+        assert term_id is not None, "The dictionary is frozen"
+        return term_id
+
+    def get_term_id(self, term: str) -> Optional[int]:
+        if self.__count == 0:
+            return None
+        (bucket, h1, h2, fingerprint) = self.__hash(term.encode("utf-8"), self.__seed, self.__count, self.__bucket_count)
+        where = self._header.size + bucket * self.__width
+        (d0, d1) = divmod(int.from_bytes(self.__data[where:where + self.__width], "little"), self.__count)
+        slot = (h1 + d0 * h2 + d1) % self.__count
+        if self._fingerprint.unpack_from(self.__data, self.__fingerprints_offset + 2 * slot)[0] != fingerprint:
+            return None
+        return slot
+
+    def get_term(self, term_id: int) -> Optional[str]:
+        """
+        Looks up the term that has the given term identifier. If there is no such term, None is returned.
+        Requires that the terms are stored.
+        """
+        assert self.__terms_offset, "The terms are not stored"
+        if not 0 <= term_id < self.__count:
+            return None
+        base = self.__terms_offset + self._offset.size * (self.__count + 1)
+        (start, end) = struct.unpack_from("<II", self.__data, self.__terms_offset + self._offset.size * term_id)
+        return bytes(self.__data[base + start:base + end]).decode("utf-8")
+
+    @staticmethod
+    def __hash(term: bytes, seed: int, count: int, bucket_count: int) -> Tuple[int, int, int, int]:
+        # Returns the term's bucket, the two hash values that define where its candidate slots are, and its
+        # fingerprint. Python's built-in hash function is randomized per process, so we can't use that.
+        (a, b, c, d) = struct.unpack("<IIII", hashlib.blake2b(term, digest_size=16, salt=seed.to_bytes(16, "little")).digest())
+        return (a % bucket_count, b % count, c % count, d & 0xFFFF)
+
+    def __load(self, data: Union[bytes, bytearray, memoryview, mmap.mmap]) -> None:
+        (magic, version, self.__seed, self.__count, self.__bucket_count, self.__width,
+         self.__terms_offset) = self._header.unpack_from(data, 0)
+        if magic != self._magic or version != self._version:
+            raise IOError("Not a perfect hash dictionary, or unsupported version")
+        self.__data = data
+        self.__fingerprints_offset = self._header.size + self.__bucket_count * self.__width
+
+    @staticmethod
+    def __build(terms: List[bytes], seed: int, store_terms: bool) -> Optional[bytes]:
+        # Builds the buffer using the given seed. Returns None if we fail and need to try another seed.
+        count = len(terms)
+        bucket_count = max(1, -(-count // PerfectHashDictionary._bucket_size))
+        hashes = np.array([PerfectHashDictionary.__hash(t, seed, count, bucket_count) for t in terms],
+                          dtype=np.int64).reshape(count, 4)
+        occupied = np.zeros(count, dtype=bool)
+        fingerprints = np.zeros(count, dtype="<u2")
+        displacements = np.zeros(bucket_count, dtype=np.int64)
+        assigned = np.zeros(count, dtype=np.int64)  # The slot, per term.
+
+        # Place the largest buckets first, while the table is still mostly empty. Each bucket has to
+        # find a displacement (d0, d1) such that its terms all land in distinct free slots.
+        order = np.argsort(hashes[:, 0], kind="stable")
+        buckets = np.split(order, np.flatnonzero(np.diff(hashes[order, 0])) + 1) if count else []
+        buckets.sort(key=len, reverse=True)
+        free = 0  # All slots before this one are occupied.
+        for members in buckets:
+            (h1, h2) = (hashes[members, 1], hashes[members, 2])
+            if len(members) == 1:
+
+                # Any free slot will do. Pick the first one.
+                while occupied[free]:
+                    free += 1
+                (d0, d1) = (0, (free - int(h1[0])) % count)
+            else:
+                for d0 in range(min(count, PerfectHashDictionary._displacements)):
+                    base = (h1 + d0 * h2) % count
+                    if len(np.unique(base)) < len(base):
+                        continue
+                    d1 = PerfectHashDictionary.__find_shift(base, occupied)
+                    if d1 is not None:
+                        break
+                else:
+                    return None
+            slots = (h1 + d0 * h2 + d1) % count
+            occupied[slots] = True
+            assigned[members] = slots
+            fingerprints[slots] = hashes[members, 3]
+            displacements[hashes[members[0], 0]] = d0 * count + d1
+
+        # Lay out the buffer. Use as few bytes per displacement as we can.
+        width = max(1, (int(displacements.max(initial=0)).bit_length() + 7) // 8)
+        packed = displacements.astype("<u8").view(np.uint8).reshape(bucket_count, 8)[:, :width]
+        body = packed.tobytes() + fingerprints.tobytes()
+        terms_offset = 0
+        if store_terms:
+            ordered = [b""] * count
+            for (term, slot) in zip(terms, assigned.tolist()):
+                ordered[slot] = term
+            offsets = np.cumsum([0] + [len(term) for term in ordered], dtype=np.int64).astype("<u4")
+            terms_offset = PerfectHashDictionary._header.size + len(body)
+            body += offsets.tobytes() + b"".join(ordered)
+        header = PerfectHashDictionary._header.pack(PerfectHashDictionary._magic, PerfectHashDictionary._version,
+                                                    seed, count, bucket_count, width, terms_offset)
+        return header + body
+
+    @staticmethod
+    def __find_shift(base: np.ndarray, occupied: np.ndarray) -> Optional[int]:
+        # Returns the smallest d1 such that all the given slots are free when shifted by d1, or None if
+        # there is no such d1. Try a range of shifts at a time, since a small d1 usually does the job.
+        count = len(occupied)
+        for start in range(0, count, 256):
+            shifts = (base[:, None] + np.arange(start, min(count, start + 256))[None, :]) % count
+            fits = np.flatnonzero(~occupied[shifts].any(axis=0))
+            if len(fits):
+                return start + int(fits[0])
+        return None
@@ -2,10 +2,11 @@
 # -*- coding: utf-8 -*-
 
 import math
-from typing import Iterator, Dict, Any, Callable
+from typing import Iterator, Dict, Any, Callable, List, Optional
 from .edittable import EditTable
 from .sieve import Sieve
 from .trie import Trie
+from .tracer import Tracer
 
 
 class EditSearchEngine:
@@ -21,8 +22,9 @@ class EditSearchEngine:
     efficient.
     """
 
-    def __init__(self, trie: Trie):
+    def __init__(self, trie: Trie, tracer: Optional[Tracer] = None):
         self.__trie = trie
+        self.__tracer = tracer or Tracer()  # Keeps track of where the time goes, if anyone cares.
 
     def evaluate(self, query: str, options: dict) -> Iterator[Dict[str, Any]]:
         """
@@ -35,6 +37,21 @@ class EditSearchEngine:
         The client can supply a dictionary of options that controls the query evaluation process:
         Supported dictionary keys include "upper_bound" (int), "candidate_count" (int),
         "hit_count" (int), "first_n" (int), and "scoring" (str).
+
+        If the engine has a tracer, the query is traced with the stages "traverse" and "sieve".
+        Candidate matches are scored as they are found, so that time is included in the "traverse"
+        stage. The "trie_nodes" and "candidates" counters say how many nodes in the trie were visited
+        and how many candidate matches were scored.
+        """
+        with self.__tracer.trace("EditSearchEngine", query):
+            results = self.__evaluate(query, options)
+            if self.__tracer.is_recording():
+                results = list(results)
+        yield from results
+
+    def __evaluate(self, query: str, options: dict) -> Iterator[Dict[str, Any]]:
+        """
+        Evaluates the given query. See evaluate/2.
         """
         # The upper bound for the edit distance we accept between the query and a match. Assumed to be
         # a small number, e.g., 1, 2, or 3. The lower we set the upper bound, the more we can prune
@@ -87,22 +104,29 @@ class EditSearchEngine:
             candidate_count -= 1
             return candidate_count > 0
 
-        # Search! We receive and sift results via the callback.
-        if root:
-            self.__dfs(root, 0, table, upper_bound, callback)
+        # Search! We receive and sift results via the callback. Keep track of how much work we did.
+        visits = [0]
+        budget = candidate_count
+        with self.__tracer.span("traverse"):
+            if root:
+                self.__dfs(root, 0, table, upper_bound, callback, visits)
+        self.__tracer.count("trie_nodes", visits[0])
+        self.__tracer.count("candidates", budget - candidate_count)
 
         # Emit the best matches!
-        for (score, (distance, match)) in sieve.winners():
-            yield {"score": score, "distance": distance, "match": head + match}
+        with self.__tracer.span("sieve"):
+            for (score, (distance, match)) in sieve.winners():
+                yield {"score": score, "distance": distance, "match": head + match}
 
     def __dfs(self, node: Trie, level: int, table: EditTable,
-              upper_bound: int, callback: Callable[[float, str], bool]) -> bool:
+              upper_bound: int, callback: Callable[[float, str], bool], visits: List[int]) -> bool:
         """
         Does a recursive depth-first search in the trie, pruning away paths that cannot lead
         to matches with a sufficiently low edit cost. See paper by Shang and Merrett for a
         detailed discussion.
 
-        Returns True unless the supplied callback tells us to abort the search.
+        Returns True unless the supplied callback tells us to abort the search. The number of
+        visited nodes is accumulated in the given single-element list.
 
         As this implementation is recursive, the call stack might blow up if we go really
         many levels deep into the trie. That should not be an issue as the primary use case
@@ -111,6 +135,7 @@ class EditSearchEngine:
         use cases.
         """
         # Are we at a node in the trie that corresponds to a dictionary entry?
+        visits[0] += 1
         if node.is_final():
 
             # This may or may not be something that we want to report: We know that the
@@ -132,7 +157,7 @@ class EditSearchEngine:
         for transition in node.transitions():
             distance = table.update2(level + 1, transition)
             if distance <= upper_bound:
-                if not self.__dfs(node.child(transition), level + 1, table, upper_bound, callback):
+                if not self.__dfs(node.child(transition), level + 1, table, upper_bound, callback, visits):
                     return False
 
         # Continue the search.
@@ -0,0 +1,176 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .sieve import Sieve
+from .corpus import Corpus
+from .invertedindex import InvertedIndex
+from .postinglist import ImpactOrderedPostingList
+
+
+class ImpactSearchEngine:
+    """
+    Realizes a query evaluator that does score-at-a-time traversal of impact-ordered posting lists, i.e.,
+    where the postings are grouped by their precomputed and quantized score contributions. The segments of
+    all the query terms' posting lists are processed in order of decreasing impact, and the impacts are
+    added up in a dense array of score accumulators, one per document. The most important postings are
+    thus processed first, and the ones that matter the least are processed last, if at all.
+
+    After processing a segment, the largest impact a document can still gain is the sum of the impacts
+    of each query term's next segment. Once that drops below the K-th best score so far, documents we
+    haven't seen yet can't make it into the result set. We then stop processing whole segments, and only
+    look up the remaining impacts for the candidates that can still catch up with the K-th best one. The
+    candidates get weeded out as the remaining impacts shrink, so usually only a handful of lookups are
+    needed for the low-impact segments of frequent terms. The final scores are exact.
+
+    The documents are ranked by their accumulated impacts, i.e., by a quantized variant of TF-IDF. Unlike
+    with SimpleSearchEngine, there is no ranker to supply. The query terms are OR-ed together.
+
+    See "Vector-Space Ranking with Effective Early Termination" by Anh et al., and "Anytime Ranking for
+    Impact-Ordered Indexes" by Lin and Trotman.
+    """
+
+    def __init__(self, corpus: Corpus, inverted_index: InvertedIndex):
+        self.__corpus = corpus
+        self.__inverted_index = inverted_index
+        self.__statistics = Counter()  # Accumulated across all evaluated queries.
+
+    def get_statistics(self) -> Dict[str, int]:
+        """
+        Returns some simple counters, accumulated across all queries evaluated so far. The "queries" counter
+        is the number of evaluated queries, and the "postings" counter is the total number of postings that
+        were processed. The "terminations" counter is the number of queries where some postings could be
+        skipped, either because they couldn't affect the result set or because the budget ran out.
+        """
+        return dict(self.__statistics)
+
+    def evaluate(self, query: str, options: dict) -> Iterator[Dict[str, Any]]:
+        """
+        Evaluates the given query, doing score-at-a-time ranked retrieval. Only the "best" matches are yielded
+        back to the client as dictionaries having the keys "score" (float) and "document" (Document). The
+        maximum number of documents to return to the client is controlled via the "hit_count" (int) option.
+
+        By default, the results are identical to what exhaustive evaluation would produce. For anytime ranking,
+        the client can supply a "budget" (int) option. Evaluation then stops once that many postings have been
+        processed, and the results are based on the scores accumulated so far. Since the most important postings
+        are processed first, a modest budget usually gives results that are close to the exact ones.
+        """
+        # Produce the query terms, with multiplicities. We must use the same string processing here as we
+        # used when building up the inverted index.
+        unique_query_terms = list(Counter(self.__inverted_index.get_terms(query)).items())
+        hit_count = max(1, min(100, options.get("hit_count", 10)))
+        budget = options.get("budget", None)
+        debug = options.get("debug", False)
+        assert budget is None or budget >= 0
+
+        # Look up the impact-ordered posting lists, and traverse them.
+        posting_lists = []
+        for (term, multiplicity) in unique_query_terms:
+            posting_list = self.__inverted_index.get_impact_ordered_postings(term)
+            assert posting_list is not None, "The index doesn't provide impact-ordered posting lists"
+            posting_lists.append((posting_list, multiplicity))
+        sieve = Sieve(hit_count)
+        (postings, terminated) = self.__evaluate_saat(posting_lists, sieve, budget, debug)
+        self.__statistics.update(queries=1, postings=postings, terminations=int(terminated))
+
+        # Alert the client about the best-matching documents. Emit documents sorted according to their scores.
+        for (score, document_id) in sieve.winners():
+            yield {"score": score, "document": self.__corpus[document_id]}
+
+    def __evaluate_saat(self, posting_lists: List[Tuple[ImpactOrderedPostingList, int]], sieve: Sieve,
+                        budget: Optional[int], debug: bool) -> Tuple[int, bool]:
+        """
+        Does score-at-a-time traversal of the given posting lists, and sifts the documents that might make it
+        into the result set through the given sieve. Returns the number of postings processed, and whether
+        any postings were skipped.
+        """
+        # Merge the segments from all the posting lists. A query term's multiplicity scales its impacts.
+        segments = sorted(((posting_list.get_impact(j) * multiplicity, i, j)
+                           for (i, (posting_list, multiplicity)) in enumerate(posting_lists)
+                           for j in range(posting_list.get_segment_count())), key=lambda s: (-s[0], s[1], s[2]))
+        size = 1 + max((int(document_ids[-1]) for (posting_list, _) in posting_lists
+                        for (_, document_ids) in posting_list), default=-1)
+
+        # What each query term can still contribute to a document's score, i.e., the impact of its next segment.
+        remaining = [posting_list.get_impact(0) * multiplicity for (posting_list, multiplicity) in posting_lists]
+
+        # Accumulate, one segment at a time. Within a segment the document identifiers are unique, so plain
+        # fancy indexing does the job. Keep track of which documents we've seen, so that checking whether
+        # we can stop costs time proportional to the number of candidates instead of the number of documents.
+        # Checking isn't free, so only check when we've processed about as many postings as there are candidates.
+        k = sieve.size()
+        scores = np.zeros(size, dtype=np.int64)
+        candidates = []
+        candidate_count = 0
+        survivors = None
+        postings = 0
+        unchecked = 0
+        for (impact, i, j) in segments:
+            if budget is not None and postings >= budget:
+                break
+            (posting_list, multiplicity) = posting_lists[i]
+            document_ids = posting_list.get_segment(j)[1]
+
+            # Once we know which documents can still make it into the result set, only these need updating. Look
+            # them up using binary search, and drop the ones that have fallen too far behind. If the budget doesn't
+            # cover the whole segment, process only as much of it as the budget allows. The rest then remains.
+            if survivors is not None:
+                where = np.minimum(np.searchsorted(document_ids, survivors), len(document_ids) - 1)
+                hits = survivors[document_ids[where] == survivors]
+                if budget is not None and len(hits) > budget - postings:
+                    hits = hits[:budget - postings]
+                else:
+                    remaining[i] = posting_list.get_impact(j + 1) * multiplicity
+                scores[hits] += impact
+                postings += len(hits)
+                survivors = self.__get_survivors(survivors, scores, k, sum(remaining))
+                continue
+            if budget is not None and len(document_ids) > budget - postings:
+                document_ids = document_ids[:budget - postings]
+            else:
+                remaining[i] = posting_list.get_impact(j + 1) * multiplicity
+
+            fresh = document_ids[scores[document_ids] == 0]
+            candidates.append(fresh)
+            candidate_count += len(fresh)
+            scores[document_ids] += impact
+            postings += len(document_ids)
+            unchecked += len(document_ids)
+            if unchecked < candidate_count or candidate_count < k:
+                continue
+            unchecked = 0
+
+            # Can documents we haven't seen yet still make it into the result set? If not, we're left with the
+            # candidates that can still catch up with the K-th best one.
+            candidates = [np.concatenate(candidates)]
+            bound = sum(remaining)
+            if bound < np.partition(scores[candidates[0]], candidate_count - k)[candidate_count - k]:
+                survivors = self.__get_survivors(np.sort(candidates[0]), scores, k, bound)
+                if debug:
+                    print("*** REFINING")
+                    print("postings  =", postings)
+                    print("survivors =", len(survivors))
+
+        # Sift the winners through the sieve. If we didn't narrow them down along the way, locate the K-th largest
+        # score and sift every document that ties or beats it. Sifting in the order of the document identifiers
+        # makes ties resolve the same way regardless of how far we got.
+        if survivors is None:
+            survivors = np.sort(np.concatenate(candidates)) if candidates else np.zeros(0, dtype=np.int64)
+            survivors = self.__get_survivors(survivors, scores, k, 0)
+        for document_id in survivors.tolist():
+            sieve.sift(float(scores[document_id]), document_id)
+        return (postings, postings < sum(len(posting_list) for (posting_list, _) in posting_lists))
+
+    @staticmethod
+    def __get_survivors(candidates: np.ndarray, scores: np.ndarray, k: int, bound: int) -> np.ndarray:
+        """
+        Returns the candidates that can end up with a score that ties or beats the K-th best candidate's, given
+        that no candidate can gain more than the given bound. The candidates are kept in their original order.
+        """
+        if len(candidates) <= k:
+            return candidates
+        candidate_scores = scores[candidates]
+        cutoff = np.partition(candidate_scores, len(candidates) - k)[len(candidates) - k]
+        return candidates[candidate_scores + bound >= cutoff]
@@ -1,16 +1,25 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+from __future__ import annotations
+import heapq
 import itertools
+import math
+import re
 from abc import ABC, abstractmethod
 from collections import Counter
-from typing import Iterable, Iterator, List
-from .dictionary import InMemoryDictionary
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from .dictionary import InMemoryDictionary, FrontCodedDictionary
 from .normalizer import Normalizer
 from .tokenizer import Tokenizer
-from .corpus import Corpus
-from .posting import Posting
-from .postinglist import CompressedInMemoryPostingList, InMemoryPostingList, PostingList
+from .document import Document
+from .corpus import Corpus, InMemoryCorpus
+from .posting import Posting, PositionalPosting
+from .postingcursor import PostingCursor
+from .postinglist import CompressedInMemoryPostingList, ImpactOrderedPostingList, InMemoryPostingList, PostingList
 
 
 class InvertedIndex(ABC):
@@ -33,6 +42,16 @@ class InvertedIndex(ABC):
         """
         pass
 
+    def get_term_ranges(self, buffer: str) -> Tuple[str, List[Tuple[str, Tuple[int, int]]]]:
+        """
+        As get_terms/1, but also tells where each term's token occurs, e.g., so that query syntax between
+        the tokens can be parsed. Returns the canonicalized buffer that the ranges refer to, and the (term,
+        range) pairs. By default we can't tell where the tokens are within a string of non-whitespace
+        characters, so each such string is processed on its own and its terms get the string's range.
+        """
+        return (buffer, [(term, match.span()) for match in re.finditer(r"\S+", buffer)
+                         for term in self.get_terms(match.group())])
+
     @abstractmethod
     def get_postings_iterator(self, term: str) -> Iterator[Posting]:
         """
@@ -41,6 +60,13 @@ class InvertedIndex(ABC):
         """
         pass
 
+    def get_postings_cursor(self, term: str) -> PostingCursor:
+        """
+        Returns a cursor that can be used to traverse the term's associated posting list without
+        allocating a Posting object per entry. For out-of-vocabulary terms we associate empty posting lists.
+        """
+        return PostingCursor.of(self.get_postings_iterator(term))
+
     @abstractmethod
     def get_document_frequency(self, term: str) -> int:
         """
@@ -48,60 +74,414 @@ class InvertedIndex(ABC):
         """
         pass
 
+    def get_maximum_term_frequency(self, term: str) -> Optional[int]:
+        """
+        Returns the largest term frequency found in the given term's posting list. Together with
+        the ranker, this allows query evaluators to compute upper bounds on how much a query term can
+        contribute to a document's score. Returns None if the index doesn't keep track of this.
+        """
+        return None
+
+    def get_document_length(self, document_id: int, field: Optional[str] = None) -> Optional[int]:
+        """
+        Returns the number of tokens that were indexed for the given document, either for the given
+        field or, if no field is given, summed across all indexed fields. Returns None if the index
+        doesn't keep track of this.
+        """
+        return None
+
+    def get_average_document_length(self, field: Optional[str] = None) -> Optional[float]:
+        """
+        Returns the average of get_document_length/2 across all indexed documents, for the given
+        field or across all indexed fields. Returns None if the index doesn't keep track of this.
+        """
+        return None
+
+    def get_champion_postings_cursor(self, term: str) -> Optional[PostingCursor]:
+        """
+        Returns a cursor over the term's champion list, i.e., the subset of the term's associated posting list
+        that is most likely to contribute to the top-ranked documents. The postings are ordered by document
+        identifier, as usual. For out-of-vocabulary terms we associate empty posting lists. Returns None if the
+        index doesn't keep track of champion lists.
+        """
+        return None
+
+    def get_impact_ordered_postings(self, term: str) -> Optional[ImpactOrderedPostingList]:
+        """
+        Returns the term's associated posting list, laid out with the postings having the largest precomputed
+        score contributions first. This allows for score-at-a-time query evaluation. For out-of-vocabulary terms
+        we associate empty posting lists. Returns None if the index doesn't support this.
+        """
+        return None
+
+    def get_generation(self) -> int:
+        """
+        Returns a number that changes whenever the contents of the index change. Clients that
+        cache information derived from the index (e.g., rankers that precompute IDF scores) can
+        use this to know when their caches need to be refreshed. Indexes that never change after
+        they have been built can just return a constant.
+        """
+        return 0
+
+    def get_indexed_fields(self) -> List[str]:
+        """
+        Returns the fields that field-qualified terms are indexed for, i.e., the fields that can be
+        searched for individually. The field-qualified terms are formed by qualify/2. Returns an empty
+        list if the index doesn't keep track of which fields the terms occur in.
+        """
+        return []
+
+    def is_positional(self) -> bool:
+        """
+        Checks if the postings in this index are PositionalPosting objects, i.e., if the index
+        can be used for phrase and proximity search.
+        """
+        return False
+
+    @staticmethod
+    def qualify(field: str, term: str) -> str:
+        """
+        Returns the field-qualified variant of the given term, e.g., 'title:foo' for the term 'foo'
+        occurring in the 'title' field.
+        """
+        return f"{field}:{term}"
+
+
+def _count_terms(field_terms: List[List[str]], qualified_fields: List[str]) -> Counter:
+    """
+    Computes the term frequencies for a document, given the terms in each of its fields. Terms are also counted
+    per field for the given fields, as field-qualified terms. The terms are kept in the order they were first
+    encountered, with the field-qualified terms after the others and field by field.
+    """
+    term_frequencies = Counter(itertools.chain.from_iterable(field_terms))
+    for (field, terms) in zip(qualified_fields, field_terms):
+        term_frequencies.update(InvertedIndex.qualify(field, term) for term in terms)
+    return term_frequencies
+
+
+def _index_shard(documents: List[Tuple[int, List[str]]], normalizer: Normalizer, tokenizer: Tokenizer,
+                 qualified_fields: List[str]) -> Tuple[List[Tuple[int, List[int]]], Dict[str, Tuple[array, array]]]:
+    """
+    Does the heavy lifting for a shard of the corpus when the index is built in parallel. Runs in a
+    worker process. The documents are (document identifier, field values) pairs, sorted by their
+    document identifiers. Returns the documents' field lengths, and a compact posting list per
+    term as a pair of arrays holding document identifiers and term frequencies. Field-qualified
+    terms are produced for the given fields, if any.
+
+    The terms are kept in the order they were first encountered, so that merging the shards in order
+    assigns term identifiers exactly as a serial build would.
+    """
+    lengths = []
+    postings = {}
+    for (document_id, values) in documents:
+        field_terms = [[normalizer.normalize(t) for t in tokenizer.strings(normalizer.canonicalize(v))] for v in values]
+        lengths.append((document_id, [len(terms) for terms in field_terms]))
+        for (term, term_frequency) in _count_terms(field_terms, qualified_fields).items():
+            if term not in postings:
+                postings[term] = (array("I"), array("I"))
+            postings[term][0].append(document_id)
+            postings[term][1].append(term_frequency)
+    return lengths, postings
+
 
 class InMemoryInvertedIndex(InvertedIndex):
     """
     A simple in-memory implementation of an inverted index, suitable for small corpora.
 
     In a serious application we'd have configuration to allow for field-specific NLP,
-    scale beyond current memory constraints, have a positional index, and so on.
+    scale beyond current memory constraints, and so on.
+
+    If index compression is enabled, only the posting lists are compressed. By default the posting
+    lists are variable-byte encoded, but a PostingCodec can be named instead, which implies compression.
+    The dictionary is a hash table, so that looking up terms is fast. For large vocabularies, freeze/0
+    can be used to trade some lookup speed for a much smaller front-coded dictionary.
+
+    If the index is positional, the postings are PositionalPosting objects that also record where
+    in the document each term occurs. The fields are concatenated when assigning positions, with a
+    gap of 100 positions between consecutive fields so that phrases with less slop than that don't
+    span field boundaries.
+
+    If the index is fielded, we also keep track of which fields the terms occur in. Each term is then
+    additionally indexed per field as a field-qualified term, e.g., 'title:foo' for the term 'foo'
+    occurring in the 'title' field. That way, each field gets its own posting lists and statistics, so
+    that fielded searches can be done and rankers can weight the term frequencies per field. This is
+    done in the same pass over the corpus, at the cost of roughly doubling the number of postings.
+
+    If champion lists are requested, we also keep track of the r postings per term having the highest sum of
+    TF-IDF score and static quality score, where the latter is found in the documents' "static_quality_score"
+    field. See Section 7.1.3 in https://nlp.stanford.edu/IR-book/pdf/irbookonlinereading.pdf. These are
+    built on demand, and don't take up extra space for terms having at most r postings. The static quality
+    scores are recorded per document when the documents are indexed, so that the index doesn't need the
+    corpus to build the champion lists. Indexes that are merged or grown one document at a time thus get
+    the same champion lists as indexes built from scratch.
 
-    If index compression is enabled, only the posting lists are compressed. Dictionary
-    compression is currently not supported.
+    Building the index is CPU bound and dominated by string processing. If more than one worker
+    is specified, the corpus is split into shards of consecutive documents that are processed in
+    parallel by a pool of worker processes. The shards are then merged in order, producing an index
+    that is identical to what a serial build would produce. The normalizer and tokenizer then need
+    to be picklable.
     """
 
-    def __init__(self, corpus: Corpus, fields: Iterable[str], normalizer: Normalizer, tokenizer: Tokenizer, compressed: bool = False):
+    # When building in parallel, how many shards per worker? More shards balance the load better,
+    # but add more overhead.
+    _shards_per_worker = 4
+
+    # In a positional index, how many positions to skip between fields. Phrase searches with less slop
+    # than this won't match across fields. Gaps below 128 still encode as a single byte.
+    _field_gap = 100
+
+    # When laying out posting lists for score-at-a-time evaluation, how many distinct impacts are there?
+    _impact_levels = 255
+
+    # When building champion lists, where do we find the static quality score? What if it's missing?
+    _static_score_field_name = "static_quality_score"
+    _static_score_default_value = 0.0
+
+    def __init__(self, corpus: Corpus, fields: Iterable[str], normalizer: Normalizer, tokenizer: Tokenizer,
+                 compressed: bool = False, workers: int = 1, positional: bool = False, codec: Optional[str] = None,
+                 fielded: bool = False, champions: Optional[int] = None):
         self.__corpus = corpus
         self.__normalizer = normalizer
         self.__tokenizer = tokenizer
         self.__posting_lists : List[PostingList] = []
-        self.__dictionary = InMemoryDictionary()
-        self.__build_index(fields, compressed)
+        self.__maximum_term_frequencies = array("I")  # Per term, so that we can compute score upper bounds.
+        self.__fields = list(fields)
+        self.__qualified_fields = self.__fields if fielded else []  # The fields we index field-qualified terms for.
+        self.__field_lengths = {f: array("I") for f in self.__fields}  # Per document, for length normalization.
+        self.__document_lengths = array("I")  # Per document, summed across the fields.
+        self.__document_ids = array("I")  # The indexed documents, in ascending order.
+        self.__base_document_id = 0  # What the per-document arrays are relative to.
+        self.__dictionary: Union[InMemoryDictionary, FrontCodedDictionary] = InMemoryDictionary()
+        self.__compressed = compressed or codec is not None
+        self.__positional = positional
+        self.__codec = codec
+        self.__generation = 0
+        self.__impact_posting_lists: Dict[int, ImpactOrderedPostingList] = {}  # Built on demand, per term identifier.
+        self.__impact_scale = None  # Maps precomputed score contributions to impacts, if computed.
+        self.__impact_generation = None  # The generation of the index when the above were computed.
+        self.__champions = champions  # How many postings to keep per champion list, if any.
+        self.__champion_posting_lists: Dict[int, PostingList] = {}  # Built on demand, per term identifier.
+        self.__static_scores = array("d")  # Per document, if we keep track of champion lists.
+        self.__champion_generation = None  # The generation of the index when the above were computed.
+        self.__unfinalized: Set[int] = set()  # The posting lists added to since the index was last finalized.
+        assert champions is None or champions > 0
+        assert not fielded or all(":" not in f for f in self.__fields), "Field names can't contain ':'"
+        assert workers > 0
+        assert workers == 1 or not positional, "Positional indexes are built serially"
+        if workers > 1:
+            self.__build_index_in_parallel(self.__fields, self.__compressed, workers)
+        else:
+            self.__build_index(self.__fields, self.__compressed)
 
     def __repr__(self):
+        self.__finalize_pending()
         return str({term: self.__posting_lists[term_id] for (term, term_id) in self.__dictionary})
 
     def __build_index(self, fields: Iterable[str], compressed: bool) -> None:
         for document in self.__corpus:
+            self.__index_document(document, fields, compressed)
+
+        # Implementations may or may not need to tie up any loose ends.
+        self.__finalize()
 
-            # Compute TF values for all unique terms in the document. Note that we
-            # currently don't keep track of which field each term occurs in.
-            # If we were to allow fielded searches (e.g., "find documents that
-            # contain 'foo' in the 'title' field") then we would have to keep
-            # track of that, either as a synthetic term in the dictionary
-            # (e.g., 'foo.title') or as extra data in the posting.
-            all_terms = itertools.chain.from_iterable(self.get_terms(document.get_field(f, "")) for f in fields)
-            term_frequencies = Counter(all_terms)
+    def __index_document(self, document: Document, fields: Iterable[str], compressed: bool) -> List[int]:
+        # Compute TF values for all unique terms in the document. If the index is fielded, we also keep
+        # track of which field each term occurs in, as synthetic field-qualified terms in the dictionary
+        # (e.g., 'title:foo'). That allows fielded searches (e.g., "find documents that contain 'foo' in
+        # the 'title' field") without having to build a separate index per field.
+        field_terms = [list(self.get_terms(document.get_field(f, ""))) for f in fields]
+        term_frequencies = _count_terms(field_terms, self.__qualified_fields)
 
-            for (term, term_frequency) in term_frequencies.items():
+        # Keep track of the document's length, both per field and in total. Rankers that normalize
+        # for document length can then look these up in O(1) time at query time.
+        self.__record_document(document.document_id, [len(terms) for terms in field_terms],
+                               self.__get_static_score(document))
 
-                # Assign the term an identifier, if needed. First come, first serve.
-                term_id = self.__dictionary.add_if_absent(term)
+        # If we're building a positional index, keep track of where each term occurs. The terms are
+        # still processed in order of first occurrence below, so that the term identifiers don't
+        # depend on whether the index is positional or not.
+        term_positions = {}
+        if self.__positional:
+            offset = 0
+            for (field, terms) in zip(fields, field_terms):
+                for (i, term) in enumerate(terms):
+                    term_positions.setdefault(term, []).append(offset + i)
+                    if self.__qualified_fields:
+                        term_positions.setdefault(self.qualify(field, term), []).append(offset + i)
+                offset += len(terms) + self._field_gap
 
-                # Locate the posting list for this term. Create it, if needed.
-                if term_id >= len(self.__posting_lists):
-                    assert term_id == len(self.__posting_lists)
-                    self.__posting_lists.append(CompressedInMemoryPostingList() if compressed else InMemoryPostingList())
-                posting_list = self.__posting_lists[term_id]
+        term_ids = []
+        for (term, term_frequency) in term_frequencies.items():
 
-                # Append the posting to the posting list. The posting lists
-                # must be kept sorted so that we can efficiently traverse and
-                # merge them when querying the inverted index.
-                posting_list.append_posting(Posting(document.document_id, term_frequency))
+            # Assign the term an identifier, if needed. First come, first serve.
+            term_id = self.__add_term(term, compressed)
+            term_ids.append(term_id)
+
+            # Append the posting to the posting list. The posting lists
+            # must be kept sorted so that we can efficiently traverse and
+            # merge them when querying the inverted index.
+            if self.__positional:
+                positions = PositionalPosting.encode_positions(term_positions[term])
+                self.__add_posting(term_id, PositionalPosting(document.document_id, term_frequency, positions))
+            else:
+                self.__add_posting(term_id, Posting(document.document_id, term_frequency))
+
+        # Report which posting lists we added to.
+        return term_ids
+
+    def __get_static_score(self, document: Document) -> float:
+        # Only needed if we keep track of champion lists.
+        if self.__champions is None:
+            return self._static_score_default_value
+        return float(document[self._static_score_field_name] or self._static_score_default_value)
+
+    def add_document(self, document: Document) -> None:
+        """
+        Indexes one more document, without rebuilding the index. The document's identifier must
+        be larger than those of all previously indexed documents, so that the posting lists remain
+        sorted. The document is not added to the corpus.
+
+        Adding documents thaws the affected posting lists. These are compacted again the next time
+        the index is read from, so that adding documents in bulk doesn't compact the index over and
+        over again. A frozen dictionary thaws if the document brings in new terms, and stays thawed
+        until freeze/0 is invoked again.
+        """
+        assert not self.__document_ids or document.document_id > self.__document_ids[-1], "Documents must be sorted"
+        self.__unfinalized.update(self.__index_document(document, self.__fields, self.__compressed))
+        self.__generation += 1
+
+    @staticmethod
+    def merge(indexes: List[InMemoryInvertedIndex], deleted: Callable[[int], bool]) -> InMemoryInvertedIndex:
+        """
+        Merges the given indexes into a new index, leaving out postings for the documents that
+        are flagged as deleted. The indexes must have been built the same way, and the documents
+        in each index must have larger identifiers than the documents in the preceding indexes.
+        The merge works directly on the posting lists, so no documents are reprocessed. Everything
+        we know about the documents, e.g., their lengths and static quality scores, is carried over
+        from the indexes. The merged index therefore doesn't need the corpus.
+        """
+        assert indexes
+        first = indexes[0]
+        merged = InMemoryInvertedIndex(InMemoryCorpus(), first.__fields, first.__normalizer,
+                                       first.__tokenizer, first.__compressed, 1, first.__positional, first.__codec,
+                                       bool(first.__qualified_fields), first.__champions)
+        for index in indexes:
+            assert index.__fields == merged.__fields
+            assert index.__champions == merged.__champions
+            index.__finalize_pending()
+            for document_id in index.__document_ids:
+                if not deleted(document_id):
+                    lengths = [index.get_document_length(document_id, f) for f in index.__fields]
+                    merged.__record_document(document_id, lengths, index.__get_recorded_static_score(document_id))
+            for (term, term_id) in index.__dictionary:
+                postings = [p for p in index.__posting_lists[term_id] if not deleted(p.document_id)]
+                if postings:
+                    merged_term_id = merged.__add_term(term, merged.__compressed)
+                    for posting in postings:
+                        merged.__add_posting(merged_term_id, posting)
+        merged.__finalize()
+        return merged
+
+    def __build_index_in_parallel(self, fields: List[str], compressed: bool, workers: int) -> None:
+        # Split the corpus into shards of consecutive documents. Only the field values are shipped
+        # to the worker processes, not the documents themselves.
+        documents = [(d.document_id, [d.get_field(f, "") for f in fields]) for d in self.__corpus]
+        static_scores = {d.document_id: self.__get_static_score(d) for d in self.__corpus} if self.__champions else {}
+        shard_size = max(1, -(-len(documents) // (workers * self._shards_per_worker)))
+        shards = [documents[i:i + shard_size] for i in range(0, len(documents), shard_size)]
+
+        # Process the shards in parallel, and merge the results in order as they come back. Within a
+        # shard the terms are ordered by first occurrence, and each term's postings are ordered by
+        # document identifier, so this reproduces the serial build exactly.
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_index_shard, shards, itertools.repeat(self.__normalizer),
+                                   itertools.repeat(self.__tokenizer), itertools.repeat(self.__qualified_fields))
+            for (lengths, postings) in results:
+                for (document_id, field_lengths) in lengths:
+                    self.__record_document(document_id, field_lengths,
+                                           static_scores.get(document_id, self._static_score_default_value))
+                for (term, (document_ids, term_frequencies)) in postings.items():
+                    term_id = self.__add_term(term, compressed)
+                    for (document_id, term_frequency) in zip(document_ids, term_frequencies):
+                        self.__add_posting(term_id, Posting(document_id, term_frequency))
 
         # Implementations may or may not need to tie up any loose ends.
+        self.__finalize()
+
+    def freeze(self) -> None:
+        """
+        Compacts the dictionary into a read-only, front-coded dictionary that takes several times less
+        memory, at the cost of slower term lookups. Worthwhile for large vocabularies that are queried
+        more than they are updated. If a document that brings in a new term is added later, the whole
+        dictionary thaws again, in O(V) time.
+        """
+        self.__finalize_pending()
+        if isinstance(self.__dictionary, InMemoryDictionary):
+            self.__dictionary = self.__dictionary.freeze()
+
+    def __finalize(self) -> None:
+        # Done indexing, for now. Compact the posting lists. These thaw again if more documents get added later.
         for posting_list in self.__posting_lists:
             posting_list.finalize_postings()
+        self.__unfinalized.clear()
+
+    def __finalize_pending(self) -> None:
+        # Documents have been added since we last finalized, so some posting lists have thawed. Compact
+        # these again, but leave the rest alone.
+        if not self.__unfinalized:
+            return
+        for term_id in self.__unfinalized:
+            self.__posting_lists[term_id].finalize_postings()
+        self.__unfinalized.clear()
+
+    def __add_term(self, term: str, compressed: bool) -> int:
+        # Assign the term an identifier, if needed. Create the term's posting list, if needed. A frozen
+        # dictionary has to thaw first if the term is new.
+        if isinstance(self.__dictionary, FrontCodedDictionary):
+            term_id = self.__dictionary.get_term_id(term)
+            if term_id is not None:
+                return term_id
+            self.__dictionary = self.__dictionary.thaw()
+        term_id = self.__dictionary.add_if_absent(term)
+        if term_id >= len(self.__posting_lists):
+            assert term_id == len(self.__posting_lists)
+            if compressed:
+                posting_list = CompressedInMemoryPostingList(self.__positional, self.__codec)
+            else:
+                posting_list = InMemoryPostingList(self.__positional)
+            self.__posting_lists.append(posting_list)
+            self.__maximum_term_frequencies.append(0)
+        return term_id
+
+    def __add_posting(self, term_id: int, posting: Posting) -> None:
+        self.__posting_lists[term_id].append_posting(posting)
+        self.__maximum_term_frequencies[term_id] = max(self.__maximum_term_frequencies[term_id], posting.term_frequency)
+
+    def __record_document(self, document_id: int, lengths: List[int], static_score: float) -> None:
+        # Document identifiers are usually dense, but allow for gaps. They need not start at zero,
+        # e.g., if the index is a segment of a larger index, so the lengths and static scores are
+        # stored relative to the first document identifier. The static scores are only needed if
+        # we keep track of champion lists.
+        if not self.__document_ids:
+            self.__base_document_id = document_id
+        i = document_id - self.__base_document_id
+        if i >= len(self.__document_lengths):
+            padding = i + 1 - len(self.__document_lengths)
+            self.__document_lengths.extend(itertools.repeat(0, padding))
+            for field_lengths in self.__field_lengths.values():
+                field_lengths.extend(itertools.repeat(0, padding))
+            if self.__champions is not None:
+                self.__static_scores.extend(itertools.repeat(self._static_score_default_value, padding))
+        for (field, length) in zip(self.__fields, lengths):
+            self.__field_lengths[field][i] = length
+        self.__document_lengths[i] = sum(lengths)
+        if self.__champions is not None:
+            self.__static_scores[i] = static_score
+        self.__document_ids.append(document_id)
+
+    def __get_recorded_static_score(self, document_id: int) -> float:
+        i = document_id - self.__base_document_id
+        return self.__static_scores[i] if 0 <= i < len(self.__static_scores) else self._static_score_default_value
 
     def get_terms(self, buffer: str) -> Iterator[str]:
         # In a serious large-scale application there could be field-specific tokenizers.
@@ -109,9 +489,21 @@ class InMemoryInvertedIndex(InvertedIndex):
         tokens = self.__tokenizer.strings(self.__normalizer.canonicalize(buffer))
         return (self.__normalizer.normalize(t) for t in tokens)
 
+    def get_term_ranges(self, buffer: str) -> Tuple[str, List[Tuple[str, Tuple[int, int]]]]:
+        buffer = self.__normalizer.canonicalize(buffer)
+        return (buffer, [(self.__normalizer.normalize(t), r) for (t, r) in self.__tokenizer.tokens(buffer)])
+
+    def get_indexed_terms(self) -> Iterator[str]:
+        """
+        Yields all the terms in the index. The terms are emitted back in arbitrary order.
+        """
+        self.__finalize_pending()
+        return (term for (term, _) in self.__dictionary)
+
     def get_postings_iterator(self, term: str) -> Iterator[Posting]:
         # Assume that everything fits in memory. This would not be the case in a serious
         # large-scale application, even with compression.
+        self.__finalize_pending()
         term_id = self.__dictionary.get_term_id(term)
         return iter([]) if term_id is None else iter(self.__posting_lists[term_id])
 
@@ -119,5 +511,122 @@ class InMemoryInvertedIndex(InvertedIndex):
         # In a serious large-scale application we'd store this number explicitly, e.g., as part of the dictionary.
         # That way, we can look up the document frequency without having to access the posting lists
         # themselves. Imagine if the posting lists don't even reside in memory!
+        self.__finalize_pending()
         term_id = self.__dictionary.get_term_id(term)
         return 0 if term_id is None else self.__posting_lists[term_id].get_length()
+
+    def get_maximum_term_frequency(self, term: str) -> Optional[int]:
+        self.__finalize_pending()
+        term_id = self.__dictionary.get_term_id(term)
+        return 0 if term_id is None else self.__maximum_term_frequencies[term_id]
+
+    def get_document_length(self, document_id: int, field: Optional[str] = None) -> Optional[int]:
+        lengths = self.__document_lengths if field is None else self.__field_lengths[field]
+        i = document_id - self.__base_document_id
+        return lengths[i] if 0 <= i < len(lengths) else 0
+
+    def get_average_document_length(self, field: Optional[str] = None) -> Optional[float]:
+        lengths = self.__document_lengths if field is None else self.__field_lengths[field]
+        return sum(lengths) / len(self.__document_ids) if self.__document_ids else 0.0
+
+    def get_champion_postings_cursor(self, term: str) -> Optional[PostingCursor]:
+        if self.__champions is None:
+            return None
+
+        # The TF-IDF scores depend on the number of documents, so rebuild everything if the index has changed.
+        if self.__champion_generation != self.__generation:
+            self.__champion_posting_lists = {}
+            self.__champion_generation = self.__generation
+        self.__finalize_pending()
+        term_id = self.__dictionary.get_term_id(term)
+        if term_id is None:
+            return PostingCursor.of(iter([]))
+        posting_list = self.__champion_posting_lists.get(term_id)
+        if posting_list is None:
+            posting_list = self.__build_champion_posting_list(term_id)
+            self.__champion_posting_lists[term_id] = posting_list
+        return posting_list.get_cursor()
+
+    def __build_champion_posting_list(self, term_id: int) -> PostingList:
+        # Short posting lists are their own champion lists.
+        posting_list = self.__posting_lists[term_id]
+        if posting_list.get_length() <= self.__champions:
+            return posting_list
+
+        # Locate the best postings. The IDF score is the same for all of them, but it determines how the
+        # TF score is weighed against the static quality score.
+        idf_score = math.log10(len(self.__document_ids) / posting_list.get_length())
+
+        def score(posting: Posting) -> float:
+            static_score = self.__get_recorded_static_score(posting.document_id)
+            return (1.0 + math.log10(posting.term_frequency)) * idf_score + static_score
+
+        champions = heapq.nlargest(self.__champions, posting_list, key=score)
+        champions.sort(key=lambda p: p.document_id)
+        champion_posting_list = InMemoryPostingList(self.__positional)
+        for posting in champions:
+            champion_posting_list.append_posting(posting)
+        champion_posting_list.finalize_postings()
+        return champion_posting_list
+
+    def get_impact_ordered_postings(self, term: str) -> Optional[ImpactOrderedPostingList]:
+        """
+        The impact of a posting is its TF-IDF score contribution, i.e., (1 + log(tf)) * log(N / df) where N is
+        the number of indexed documents. The contributions are quantized linearly into a small number of levels,
+        where the largest contribution found anywhere in the index gets the highest level.
+
+        The impact-ordered posting lists are built on demand, as a separate layout alongside the regular posting
+        lists, and rebuilt if the index changes.
+        """
+        # The impacts depend on the number of documents, so recompute everything if the index has changed.
+        if self.__impact_generation != self.__generation:
+            self.__impact_posting_lists = {}
+            largest = max((self.__get_contribution(term_id, tf) for (term_id, tf) in enumerate(self.__maximum_term_frequencies)),
+                          default=0.0)
+            self.__impact_scale = self._impact_levels / largest if largest > 0.0 else 0.0
+            self.__impact_generation = self.__generation
+        self.__finalize_pending()
+        term_id = self.__dictionary.get_term_id(term)
+        if term_id is None:
+            return ImpactOrderedPostingList([], [])
+        posting_list = self.__impact_posting_lists.get(term_id)
+        if posting_list is None:
+            document_ids = []
+            impacts = []
+            cursor = self.__posting_lists[term_id].get_cursor()
+            while cursor.next():
+                document_ids.append(cursor.document_id)
+                impact = math.ceil(self.__impact_scale * self.__get_contribution(term_id, cursor.term_frequency))
+                impacts.append(min(impact, self._impact_levels))
+            posting_list = ImpactOrderedPostingList(document_ids, impacts)
+            self.__impact_posting_lists[term_id] = posting_list
+        return posting_list
+
+    def __get_contribution(self, term_id: int, term_frequency: int) -> float:
+        # The TF-IDF score contribution of a posting, before quantization.
+        if term_frequency == 0:
+            return 0.0
+        document_frequency = self.__posting_lists[term_id].get_length()
+        return (1.0 + math.log10(term_frequency)) * math.log10(len(self.__document_ids) / document_frequency)
+
+    def get_generation(self) -> int:
+        return self.__generation
+
+    def get_indexed_fields(self) -> List[str]:
+        return list(self.__qualified_fields)
+
+    def is_positional(self) -> bool:
+        return self.__positional
+
+    def get_document_ids(self) -> Iterator[int]:
+        """
+        Yields the identifiers of all the indexed documents, in ascending order.
+        """
+        return iter(self.__document_ids)
+
+    def has_document(self, document_id: int) -> bool:
+        """
+        Checks if the given document has been indexed.
+        """
+        i = bisect_left(self.__document_ids, document_id)
+        return i < len(self.__document_ids) and self.__document_ids[i] == document_id
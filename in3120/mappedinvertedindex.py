@@ -0,0 +1,186 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import mmap
+import struct
+import numpy as np
+from typing import Iterable, Iterator, List, Optional, Tuple
+from .invertedindex import InvertedIndex
+from .normalizer import Normalizer
+from .tokenizer import Tokenizer
+from .posting import Posting
+from .postinglist import CompressedInMemoryPostingList
+from .variablebytecodec import VariableByteCodec
+
+
+class MappedInvertedIndex(InvertedIndex):
+    """
+    A read-only inverted index that lives in a file on disk, and that is accessed via memory
+    mapping. Nothing but a small trailer is read up front, so opening the index is cheap
+    regardless of its size. The operating system pages in the parts of the file that we touch
+    when we look up terms and traverse posting lists, and several processes that map the same
+    file share the same physical pages.
+
+    The file consists of three segments followed by a fixed-size trailer:
+
+      * The postings segment. The posting lists, back to back, each one encoded exactly as
+        in CompressedInMemoryPostingList, i.e., gap encoding combined with variable-byte encoding.
+      * The dictionary segment. One fixed-size entry per term, sorted according to the terms.
+        Each entry holds where the term's string starts in the string segment, where the term's
+        posting list starts in the postings segment, the term's document frequency, and the largest
+        term frequency in the term's posting list. A final sentinel entry allows us to compute where
+        the last term and posting list end.
+      * The string segment. The UTF-8 encoded terms, back to back.
+      * The trailer. A magic marker, a version number, the term count, and the segment offsets.
+
+    Term lookups are done via binary search over the dictionary segment. Since UTF-8 preserves
+    the ordering of code points, comparing the encoded byte strings orders the terms the same way
+    as comparing the Python strings.
+
+    The processing of query strings needs to mirror how the index was originally built, so the
+    client needs to supply the same normalizer and tokenizer as were originally used.
+    """
+
+    # The layout of the trailer and the dictionary entries. Everything is little-endian.
+    _trailer = struct.Struct("<8sIIQQ")
+    _entry = struct.Struct("<QQII")
+    _magic = b"IN3120MI"
+    _version = 1
+
+    def __init__(self, filename: str, normalizer: Normalizer, tokenizer: Tokenizer):
+        self.__normalizer = normalizer
+        self.__tokenizer = tokenizer
+        with open(filename, mode="rb") as file:
+            self.__data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.__data) < self._trailer.size:
+            raise IOError("Not an index file")
+        trailer = self._trailer.unpack_from(self.__data, len(self.__data) - self._trailer.size)
+        (magic, version, self.__term_count, self.__entries_offset, self.__strings_offset) = trailer
+        if magic != self._magic or version != self._version:
+            raise IOError("Not an index file, or unsupported version")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self) -> None:
+        """
+        Releases the memory mapping. The index cannot be used afterwards.
+        """
+        self.__data.close()
+
+    def __get_entry(self, i: int) -> Tuple[int, int, int, int]:
+        """
+        Returns the (string offset, postings offset, document frequency, maximum term frequency)
+        quadruple for the i-th term in the sorted dictionary segment.
+        """
+        return self._entry.unpack_from(self.__data, self.__entries_offset + i * self._entry.size)
+
+    def __get_string(self, i: int) -> bytes:
+        """
+        Returns the UTF-8 encoded string for the i-th term in the sorted dictionary segment.
+        """
+        start = self._entry.unpack_from(self.__data, self.__entries_offset + i * self._entry.size)[0]
+        end = self._entry.unpack_from(self.__data, self.__entries_offset + (i + 1) * self._entry.size)[0]
+        return self.__data[self.__strings_offset + start:self.__strings_offset + end]
+
+    def __binary_search(self, term: str) -> Optional[int]:
+        """
+        Locates the given term in the sorted dictionary segment. Returns None if the term
+        is not present.
+        """
+        needle = term.encode("utf-8")
+        left = 0
+        right = self.__term_count
+        while left < right:
+            middle = (left + right) // 2
+            if self.__get_string(middle) < needle:
+                left = middle + 1
+            else:
+                right = middle
+        if left < self.__term_count and self.__get_string(left) == needle:
+            return left
+        return None
+
+    def get_terms(self, buffer: str) -> Iterator[str]:
+        tokens = self.__tokenizer.strings(self.__normalizer.canonicalize(buffer))
+        return (self.__normalizer.normalize(t) for t in tokens)
+
+    def get_term_ranges(self, buffer: str) -> Tuple[str, List[Tuple[str, Tuple[int, int]]]]:
+        buffer = self.__normalizer.canonicalize(buffer)
+        return (buffer, [(self.__normalizer.normalize(t), r) for (t, r) in self.__tokenizer.tokens(buffer)])
+
+    def get_indexed_terms(self) -> Iterator[str]:
+        """
+        Yields all the terms in the index, in sorted order.
+        """
+        for i in range(self.__term_count):
+            yield self.__get_string(i).decode("utf-8")
+
+    def get_postings_iterator(self, term: str) -> Iterator[Posting]:
+        # Decode directly from the mapped buffer. No posting data is copied onto the heap
+        # up front.
+        i = self.__binary_search(term)
+        if i is None:
+            return iter([])
+        start = self.__get_entry(i)[1]
+        end = self.__get_entry(i + 1)[1]
+        return CompressedInMemoryPostingList.CompressedInMemoryPostingListIterator(self.__data, start, end)
+
+    def get_document_frequency(self, term: str) -> int:
+        # Stored explicitly in the dictionary segment, so we don't have to touch the posting data.
+        i = self.__binary_search(term)
+        return 0 if i is None else self.__get_entry(i)[2]
+
+    def get_maximum_term_frequency(self, term: str) -> Optional[int]:
+        i = self.__binary_search(term)
+        return 0 if i is None else self.__get_entry(i)[3]
+
+    @staticmethod
+    def write(filename: str, entries: Iterable[Tuple[str, Iterable[Posting]]]) -> None:
+        """
+        Writes an index file that can subsequently be opened as a MappedInvertedIndex. The
+        supplied (term, postings) pairs must be sorted according to the terms, and the postings
+        for each term must be sorted according to the document identifiers. The entries are
+        consumed in a streaming fashion, so only the dictionary needs to fit in memory.
+
+        For example, to persist an existing in-memory index:
+
+           MappedInvertedIndex.write(filename, ((t, index[t]) for t in sorted(index.get_indexed_terms())))
+        """
+        cls = MappedInvertedIndex
+        dictionary = bytearray()
+        strings = bytearray()
+        previous = None
+        term_count = 0
+        with open(filename, mode="wb") as file:
+
+            # The postings segment starts at offset zero. Encode one posting list at a time.
+            where = 0
+            for (term, postings) in entries:
+                encoded_term = term.encode("utf-8")
+                assert previous is None or previous < encoded_term, "Terms must be unique and sorted"
+                previous = encoded_term
+                # Interleave the gaps and the term frequencies, and encode them all in one go.
+                numbers = np.array([(p.document_id, p.term_frequency) for p in postings], dtype=np.int64).reshape(-1, 2)
+                document_frequency = len(numbers)
+                maximum_term_frequency = int(numbers[:, 1].max(initial=0))
+                numbers[:, 0] = np.diff(numbers[:, 0], prepend=0)
+                assert document_frequency == 0 or numbers[1:, 0].min(initial=1) > 0, "Postings must be sorted"
+                buffer = VariableByteCodec.encode_many(numbers.ravel())
+                dictionary.extend(cls._entry.pack(len(strings), where, document_frequency, maximum_term_frequency))
+                strings.extend(encoded_term)
+                file.write(buffer)
+                where += len(buffer)
+                term_count += 1
+
+            # The sentinel entry, so that we know where the last term and posting list end.
+            dictionary.extend(cls._entry.pack(len(strings), where, 0, 0))
+
+            # The remaining segments, and the trailer that tells us where they are.
+            file.write(dictionary)
+            file.write(strings)
+            trailer = cls._trailer.pack(cls._magic, cls._version, term_count, where, where + len(dictionary))
+            file.write(trailer)
@@ -0,0 +1,100 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from bisect import bisect_right
+from typing import Iterator, Dict, Any, List
+from .sieve import Sieve
+from .corpus import Corpus
+from .invertedindex import InvertedIndex
+from .postingsmerger import PostingsMerger
+
+
+class PhraseSearchEngine:
+    """
+    Realizes phrase and proximity search over a positional inverted index. For example, the query
+    'to be or not to be' matches documents where these terms occur consecutively and in that order.
+    If some slop is allowed, the terms still have to occur in the given order, but each term may be
+    separated from the preceding one by up to that many other tokens.
+
+    The posting lists are first intersected on the document identifiers alone, skipping ahead where we
+    can. The positions are only decoded for the documents that contain all the query terms, and these
+    are typically few compared to the documents that contain just some of them.
+
+    Compared to phrase search via a suffix array, the inverted index only needs to store a few bytes
+    per token in the corpus, rather than the normalized corpus text itself plus an offset per token.
+    """
+
+    # The index leaves a gap between the fields when assigning positions, so that phrases don't span
+    # field boundaries. Allowing more slop than that gap would defeat this.
+    _max_slop = 99
+
+    def __init__(self, corpus: Corpus, inverted_index: InvertedIndex):
+        assert inverted_index.is_positional(), "Phrase search requires a positional index"
+        self.__corpus = corpus
+        self.__inverted_index = inverted_index
+
+    def evaluate(self, query: str, options: dict) -> Iterator[Dict[str, Any]]:
+        """
+        Evaluates the given query, doing phrase or proximity search. The matching documents are ranked
+        according to how many times the query phrase occurs in the document, and only the "best" matches
+        are yielded back to the client. Ties are resolved arbitrarily.
+
+        The client can supply a dictionary of options that controls the query evaluation process: The
+        maximum number of documents to return to the client is controlled via the "hit_count" (int)
+        option, and the number of tokens that are allowed between consecutive query terms is controlled
+        via the "slop" (int) option. The default slop is 0, i.e., exact phrase matching, and the slop is
+        capped at 99.
+
+        The results yielded back to the client are dictionaries having the keys "score" (int) and
+        "document" (Document).
+        """
+        # Print verbose debug information?
+        debug = options.get("debug", False)
+
+        # Produce the query terms. Define that the empty query matches nothing, not everything.
+        query_terms = list(self.__inverted_index.get_terms(query))
+        if not query_terms:
+            return
+        unique_query_terms = list(dict.fromkeys(query_terms))
+        slots = [unique_query_terms.index(term) for term in query_terms]
+
+        # Keep track of the K highest-scoring documents.
+        slop = max(0, min(self._max_slop, options.get("slop", 0)))
+        sieve = Sieve(max(1, min(100, options.get("hit_count", 10))))
+
+        # Intersect on the document identifiers first, and only then look at the positions.
+        posting_lists = [self.__inverted_index[term] for term in unique_query_terms]
+        document_frequencies = [self.__inverted_index.get_document_frequency(term) for term in unique_query_terms]
+        for postings in PostingsMerger.intersection_many_postings(posting_lists, document_frequencies):
+            positions = [list(posting.get_positions()) for posting in postings]
+            score = self.__count_occurrences([positions[slot] for slot in slots], slop)
+            if score > 0:
+                sieve.sift(score, postings[0].document_id)
+                if debug:
+                    print("*** MATCH")
+                    print("document =", self.__corpus[postings[0].document_id])
+                    print("score    =", score)
+
+        # Emit documents sorted according to their relevancy scores.
+        for (score, document_id) in sieve.winners():
+            yield {"score": score, "document": self.__corpus[document_id]}
+
+    @staticmethod
+    def __count_occurrences(positions: List[List[int]], slop: int) -> int:
+        """
+        Counts how many positions of the first query term start an occurrence of the phrase. The
+        positions are given per query term, sorted. Each subsequent term has to occur after the
+        preceding one, with at most the given slop in between.
+        """
+        # Work backwards from the last query term, keeping only the positions that can be extended into
+        # an occurrence of the rest of the phrase. Each position is then checked once per query term.
+        extensible = positions[-1]
+        for candidates in reversed(positions[:-1]):
+            extensible = [p for p in candidates if PhraseSearchEngine.__reaches(extensible, p, slop)]
+        return len(extensible)
+
+    @staticmethod
+    def __reaches(positions: List[int], previous: int, slop: int) -> bool:
+        # Is there a position after the previous one, with at most the given slop in between?
+        i = bisect_right(positions, previous)
+        return i < len(positions) and positions[i] <= previous + 1 + slop
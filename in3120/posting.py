@@ -1,7 +1,8 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator, Optional
+from .variablebytecodec import VariableByteCodec
 
 
 class Posting:
@@ -9,6 +10,9 @@ class Posting:
     A very simple posting entry in a non-positional inverted index.
     """
 
+    # We might create a great many of these, so do without a per-instance dictionary.
+    __slots__ = ("document_id", "term_frequency")
+
     def __init__(self, document_id: int, term_frequency: int):
         self.document_id = document_id
         self.term_frequency = term_frequency
@@ -24,3 +28,54 @@ class Posting:
         Facilitates JSON serialization.
         """
         return {"document_id": self.document_id, "term_frequency": self.term_frequency}
+
+
+class PositionalPosting(Posting):
+    """
+    A posting entry in a positional inverted index. In addition to the term frequency, the posting
+    knows where in the document the term occurs. The positions are kept gap-encoded and variable-byte
+    encoded, and are only decoded if and when they're asked for. The encoded positions can be a slice
+    of some larger buffer, so that postings can be decoded from a compressed posting list without
+    copying anything.
+    """
+
+    __slots__ = ("__data", "__start", "__end")
+
+    def __init__(self, document_id: int, term_frequency: int, data: bytes, start: int = 0, end: Optional[int] = None):
+        super().__init__(document_id, term_frequency)
+        self.__data = data
+        self.__start = start
+        self.__end = len(data) if end is None else end
+
+    def get_positions(self) -> Iterator[int]:
+        """
+        Yields the positions where the term occurs in the document, in ascending order. The positions
+        are decoded when asked for.
+        """
+        # Decode straight from the underlying buffer, via a view so that the positions come first. They need
+        # not be preceded by variable-byte encoded data in the buffer, and the codec checks that they are.
+        (positions, _) = VariableByteCodec.decode_gaps(memoryview(self.__data)[self.__start:self.__end])
+        return iter(positions.tolist())
+
+    def get_encoded_positions(self) -> bytes:
+        """
+        Returns the encoded positions, as produced by encode_positions/1.
+        """
+        return bytes(self.__data[self.__start:self.__end])
+
+    @staticmethod
+    def encode_positions(positions: Iterable[int]) -> bytes:
+        """
+        Gap-encodes and variable-byte encodes the given positions, which must be sorted in
+        ascending order.
+        """
+        data = bytearray()
+        previous = 0
+        for position in positions:
+            assert position >= previous
+            VariableByteCodec.encode(position - previous, data)
+            previous = position
+        return bytes(data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(super().to_dict(), positions=list(self.get_positions()))
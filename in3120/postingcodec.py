@@ -0,0 +1,299 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple
+import numpy as np
+from .variablebytecodec import VariableByteCodec
+
+
+class PostingCodec(ABC):
+    """
+    Abstract base class for a codec that compresses blocks of non-negative integers, e.g., the
+    document identifier gaps or the term frequencies of a block of postings. A block is encoded
+    as a whole and decoded as a whole, which allows codecs that are not byte-aligned.
+
+    The encoded blocks are not self-delimiting with respect to their length, so the number of
+    integers in a block must be supplied when decoding.
+
+    Codecs are stateless, and are looked up by name in a registry. See, e.g., Section 5.3 in
+    https://nlp.stanford.edu/IR-book/pdf/05comp.pdf, and the papers by Zukowski et al. (PForDelta)
+    and by Anh and Moffat (Simple-8b).
+    """
+
+    # Maps codec names to codec instances.
+    _registry: Dict[str, "PostingCodec"] = {}
+
+    @staticmethod
+    def register(name: str, codec: "PostingCodec") -> None:
+        """
+        Makes the given codec available under the given name. Replaces any codec that was
+        previously registered under the same name.
+        """
+        assert name
+        PostingCodec._registry[name] = codec
+
+    @staticmethod
+    def create(name: str) -> "PostingCodec":
+        """
+        Returns the codec that is registered under the given name.
+        """
+        assert name in PostingCodec._registry, f"Unknown codec '{name}'"
+        return PostingCodec._registry[name]
+
+    @staticmethod
+    def get_names() -> List[str]:
+        """
+        Returns the names of all registered codecs, in order of registration.
+        """
+        return list(PostingCodec._registry.keys())
+
+    @abstractmethod
+    def encode(self, numbers: np.ndarray) -> bytes:
+        """
+        Encodes the given block of non-negative integers, and returns the resulting bytes.
+        """
+        pass
+
+    @abstractmethod
+    def decode(self, source: bytearray, count: int, start: int = 0) -> Tuple[np.ndarray, int]:
+        """
+        Starting at the given position in the source buffer, decodes a block of the given number
+        of integers. Returns a pair comprised of the decoded integers as a NumPy array, and the number
+        of bytes read from the source buffer.
+        """
+        pass
+
+    @staticmethod
+    def _read_number(source: bytearray, start: int) -> Tuple[int, int]:
+        # Headers are variable-byte encoded, but since they can follow data that is not variable-byte
+        # encoded we can't use VariableByteCodec.decode/2 directly on the source buffer. Its check
+        # for a preceding terminator byte doesn't apply if we start from a view.
+        return VariableByteCodec.decode(memoryview(source)[start:], 0)
+
+    @staticmethod
+    def _bit_lengths(numbers: np.ndarray) -> np.ndarray:
+        # How many bits each number needs, with zero needing none.
+        return np.array([int(n).bit_length() for n in numbers], dtype=np.int64)
+
+    @staticmethod
+    def _pack(numbers: np.ndarray, width: int) -> bytes:
+        # Writes the lowest width bits of each number, most significant bit first, and pads the
+        # result to a whole number of bytes.
+        if width == 0 or not len(numbers):
+            return b""
+        shifts = np.arange(width - 1, -1, -1, dtype=np.uint64)
+        bits = ((numbers.astype(np.uint64)[:, None] >> shifts[None, :]) & np.uint64(1)).astype(np.uint8)
+        return np.packbits(bits.ravel()).tobytes()
+
+    @staticmethod
+    def _unpack(source: bytearray, count: int, width: int, start: int) -> Tuple[np.ndarray, int]:
+        # The inverse of _pack/2. Returns the numbers, and how many bytes they occupied.
+        if width == 0 or count == 0:
+            return np.zeros(count, dtype=np.int64), 0
+        used = (count * width + 7) // 8
+        data = np.frombuffer(source, dtype=np.uint8, count=used, offset=start)
+        bits = np.unpackbits(data)[:count * width].reshape(count, width).astype(np.uint64)
+        shifts = np.arange(width - 1, -1, -1, dtype=np.uint64)
+        return (bits << shifts[None, :]).sum(axis=1, dtype=np.uint64).astype(np.int64), used
+
+
+class VariableBytePostingCodec(PostingCodec):
+    """
+    Plain variable-byte encoding, as done by VariableByteCodec. Byte-aligned and fast, but a small
+    number never takes up less than a byte.
+    """
+
+    # For blocks shorter than this, NumPy's per-call overhead dominates and we decode one number at a time.
+    _threshold = 16
+
+    def encode(self, numbers: np.ndarray) -> bytes:
+        return VariableByteCodec.encode_many(numbers)
+
+    def decode(self, source: bytearray, count: int, start: int = 0) -> Tuple[np.ndarray, int]:
+        view = memoryview(source)[start:]
+        if count >= self._threshold:
+            return VariableByteCodec.decode_many(view, count)
+        numbers = []
+        where = 0
+        for _ in range(count):
+            (number, increment) = VariableByteCodec.decode(view, where)
+            numbers.append(number)
+            where += increment
+        return np.array(numbers, dtype=np.int64), where
+
+
+class BitPackingCodec(PostingCodec):
+    """
+    Frame-of-reference encoding: The smallest number in the block is the reference, and the
+    differences from the reference are packed using just as many bits as the largest difference
+    needs. The header holds the reference and the bit width.
+    """
+
+    def encode(self, numbers: np.ndarray) -> bytes:
+        numbers = np.asarray(numbers, dtype=np.int64)
+        assert not len(numbers) or numbers.min() >= 0
+        reference = int(numbers.min(initial=0))
+        differences = numbers - reference
+        width = int(differences.max(initial=0)).bit_length()
+        header = VariableByteCodec.encode_many([reference, width])
+        return header + self._pack(differences, width)
+
+    def decode(self, source: bytearray, count: int, start: int = 0) -> Tuple[np.ndarray, int]:
+        (reference, used1) = self._read_number(source, start)
+        (width, used2) = self._read_number(source, start + used1)
+        (differences, used3) = self._unpack(source, count, width, start + used1 + used2)
+        return differences + reference, used1 + used2 + used3
+
+
+class PForDeltaCodec(PostingCodec):
+    """
+    Patched frame-of-reference encoding: The bit width is chosen so that most, but not necessarily
+    all, of the numbers fit. The numbers that don't fit are exceptions, and only their lowest bits are
+    packed. Their remaining high bits are stored separately, together with where in the block the
+    exceptions are, so that they can be patched up after unpacking. That way, a few outliers don't
+    inflate the bit width for the whole block.
+
+    The bit width is chosen to minimize the estimated size of the encoded block. The header holds
+    the bit width and the number of exceptions. The exceptions are variable-byte encoded.
+    """
+
+    def encode(self, numbers: np.ndarray) -> bytes:
+        numbers = np.asarray(numbers, dtype=np.int64)
+        assert not len(numbers) or numbers.min() >= 0
+        width = self.__choose_width(self._bit_lengths(numbers))
+        exceptions = np.flatnonzero(numbers >> width)
+        header = VariableByteCodec.encode_many([width, len(exceptions)])
+        low = numbers & ((1 << width) - 1)
+        patches = b""
+        if len(exceptions):
+            patches = VariableByteCodec.encode_many(np.concatenate((np.diff(exceptions, prepend=0),
+                                                                    numbers[exceptions] >> width)))
+        return header + self._pack(low, width) + patches
+
+    def decode(self, source: bytearray, count: int, start: int = 0) -> Tuple[np.ndarray, int]:
+        (width, used1) = self._read_number(source, start)
+        (exceptions, used2) = self._read_number(source, start + used1)
+        where = start + used1 + used2
+        (numbers, used3) = self._unpack(source, count, width, where)
+        where += used3
+        used4 = 0
+        if exceptions:
+            (patches, used4) = VariableByteCodec.decode_many(memoryview(source)[where:], 2 * exceptions)
+            numbers[np.cumsum(patches[:exceptions])] |= patches[exceptions:] << width
+        return numbers, used1 + used2 + used3 + used4
+
+    @staticmethod
+    def __choose_width(lengths: np.ndarray) -> int:
+        # For each candidate bit width, estimate the cost in bytes: The packed low bits, plus about a
+        # byte for each exception's position and as many bytes as its high bits need.
+        best = (0, None)
+        for width in range(int(lengths.max(initial=0)) + 1):
+            excess = lengths[lengths > width] - width
+            cost = (len(lengths) * width + 7) // 8 + len(excess) + int(((excess + 6) // 7).sum())
+            if best[1] is None or cost < best[1]:
+                best = (width, cost)
+        return best[0]
+
+
+class Simple8bCodec(PostingCodec):
+    """
+    Simple-8b encoding: Numbers are packed into 64-bit words, where the 4 most significant bits
+    of each word is a selector that says how the remaining 60 bits are divided between numbers of
+    equal width. A word can thus hold, e.g., 60 numbers of 1 bit each, or 2 numbers of 30 bits
+    each. The first two selectors represent runs of zeros. Numbers must be less than 2^60.
+
+    Decoding is fast, since every word can be decoded independently of the others.
+    """
+
+    # Per selector, how many numbers are packed into a word, and using how many bits each.
+    _selectors = [(240, 0), (120, 0), (60, 1), (30, 2), (20, 3), (15, 4), (12, 5), (10, 6),
+                  (8, 7), (7, 8), (6, 10), (5, 12), (4, 15), (3, 20), (2, 30), (1, 60)]
+
+    def encode(self, numbers: np.ndarray) -> bytes:
+        numbers = [int(n) for n in numbers]
+        lengths = [n.bit_length() for n in numbers]
+        assert not numbers or (min(numbers) >= 0 and max(lengths) <= 60)
+        words = []
+        i = 0
+        while i < len(numbers):
+
+            # Greedily pick the selector that packs the most numbers. If we're near the end, the
+            # last word can be padded with zeros.
+            for (selector, (count, width)) in enumerate(self._selectors):
+                if max(lengths[i:i + count]) <= width:
+                    break
+            word = selector << 60
+            for (j, number) in enumerate(numbers[i:i + count]):
+                word |= number << (j * width)
+            words.append(word)
+            i += count
+        return np.array(words, dtype="<u8").tobytes()
+
+    def decode(self, source: bytearray, count: int, start: int = 0) -> Tuple[np.ndarray, int]:
+        if count == 0:
+            return np.zeros(0, dtype=np.int64), 0
+
+        # Every word holds at least one number, so we need to look at no more than this many words.
+        # Find out how many words we actually need.
+        available = min(count, (len(source) - start) // 8)
+        words = np.frombuffer(source, dtype="<u8", count=available, offset=start)
+        selectors = (words >> np.uint64(60)).astype(np.int64)
+        counts = np.array([c for (c, _) in self._selectors], dtype=np.int64)[selectors]
+        ends = np.cumsum(counts)
+        needed = int(np.searchsorted(ends, count)) + 1
+        if needed > len(words):
+            raise IndexError("Not enough numbers in buffer")
+        words, selectors, ends = words[:needed], selectors[:needed], ends[:needed]
+
+        # Decode all the words that share a selector in one go, and scatter the numbers into place.
+        numbers = np.zeros(int(ends[-1]), dtype=np.int64)
+        for selector in np.unique(selectors):
+            (n, width) = self._selectors[selector]
+            if width == 0:
+                continue
+            which = np.flatnonzero(selectors == selector)
+            shifts = np.arange(n, dtype=np.uint64) * np.uint64(width)
+            values = (words[which][:, None] >> shifts[None, :]) & np.uint64((1 << width) - 1)
+            numbers[(ends[which] - n)[:, None] + np.arange(n)[None, :]] = values.astype(np.int64)
+        return numbers[:count], 8 * needed
+
+
+class EliasGammaCodec(PostingCodec):
+    """
+    Elias-gamma encoding: A positive number n is written as floor(log2 n) zero bits followed by n in
+    binary. Since n's binary representation starts with a one bit, the length of the leading run of
+    zeros says how many bits follow. The codec adds one to each number, so that zero can be encoded.
+    The block is padded to a whole number of bytes.
+
+    Very compact for small numbers, but decoding has to proceed bit by bit and is slow.
+    """
+
+    def encode(self, numbers: np.ndarray) -> bytes:
+        numbers = [int(n) + 1 for n in numbers]
+        assert not numbers or min(numbers) >= 1
+        bits = "".join("0" * (n.bit_length() - 1) + format(n, "b") for n in numbers)
+        bits += "0" * (-len(bits) % 8)
+        return int(bits, 2).to_bytes(len(bits) // 8, "big") if bits else b""
+
+    def decode(self, source: bytearray, count: int, start: int = 0) -> Tuple[np.ndarray, int]:
+        # Look at no more bytes than the largest possible encoding needs.
+        chunk = bytes(source[start:start + (count * 127 + 7) // 8])
+        bits = format(int.from_bytes(chunk, "big"), "b").zfill(8 * len(chunk)) if chunk else ""
+        numbers = []
+        where = 0
+        for _ in range(count):
+            one = bits.find("1", where)
+            if one < 0:
+                raise IndexError("Not enough numbers in buffer")
+            length = one - where
+            numbers.append(int(bits[one:one + length + 1], 2) - 1)
+            where = one + length + 1
+        return np.array(numbers, dtype=np.int64), (where + 7) // 8
+
+
+PostingCodec.register("vb", VariableBytePostingCodec())
+PostingCodec.register("bitpacking", BitPackingCodec())
+PostingCodec.register("pfordelta", PForDeltaCodec())
+PostingCodec.register("simple8b", Simple8bCodec())
+PostingCodec.register("gamma", EliasGammaCodec())
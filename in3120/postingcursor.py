@@ -0,0 +1,140 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional, Union
+from .posting import Posting
+
+
+class PostingCursor(Posting, ABC):
+    """
+    Abstract base class for a cursor over a posting list. Unlike an iterator, which hands out a new
+    Posting object per entry, a cursor is a single mutable object that is moved along the posting list.
+    Its document_id and term_frequency attributes describe the posting it currently points to.
+
+    Initially, the cursor points to nothing, and next/0 or advance_to/1 must be invoked to move it to the
+    first posting. When these return False the cursor has run off the end of the posting list, and its
+    document_id attribute is None.
+
+    The cursor doubles as a flyweight Posting for the entry it currently points to, and can be passed
+    along, e.g., to a Ranker. If a client needs a Posting that outlives the cursor's current position,
+    it should use get_posting/0.
+    """
+
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(-1, 0)
+
+    @abstractmethod
+    def next(self) -> bool:
+        """
+        Moves the cursor to the next posting. Returns False if there are no more postings.
+        """
+        pass
+
+    def advance_to(self, document_id: int) -> bool:
+        """
+        Moves the cursor to the first posting at or after the current one whose document identifier is
+        equal to or larger than the given one. Returns False if there is no such posting. The cursor never
+        moves backwards.
+
+        Implementations that can skip ahead efficiently, e.g., by making use of skip pointers, should
+        override this. By default we simply scan forward one posting at a time.
+        """
+        if self.document_id is None:
+            return False
+        if self.document_id >= document_id:
+            return True
+        while self.next():
+            if self.document_id >= document_id:
+                return True
+        return False
+
+    def get_posting(self) -> Posting:
+        """
+        Returns a Posting object for the posting that the cursor currently points to.
+        """
+        return Posting(self.document_id, self.term_frequency)
+
+    @staticmethod
+    def of(postings: Union["PostingCursor", Iterator[Posting]]) -> "PostingCursor":
+        """
+        Returns a cursor over the given postings. If a cursor is given, we simply return it. If an
+        iterator is given and it can supply a cursor itself, via a get_cursor/0 method, we use that.
+        Otherwise we wrap the iterator. Either way, the iterator should not be used any further.
+        """
+        if isinstance(postings, PostingCursor):
+            return postings
+        get_cursor = getattr(postings, "get_cursor", None)
+        return get_cursor() if get_cursor else IteratorPostingCursor(postings)
+
+
+class IteratorPostingCursor(PostingCursor):
+    """
+    Adapts a plain posting iterator to the cursor API. Uses the iterator's advance_to/1 method to
+    skip ahead, if it has one.
+    """
+
+    __slots__ = ("__iterator", "__posting")
+
+    def __init__(self, iterator: Iterator[Posting]):
+        super().__init__()
+        self.__iterator = iterator
+        self.__posting: Optional[Posting] = None
+
+    def next(self) -> bool:
+        return self.__move(next(self.__iterator, None))
+
+    def advance_to(self, document_id: int) -> bool:
+        if self.document_id is None or self.document_id >= document_id:
+            return self.document_id is not None
+        advance_to = getattr(self.__iterator, "advance_to", None)
+        if advance_to:
+            return self.__move(advance_to(document_id))
+        return super().advance_to(document_id)
+
+    def get_posting(self) -> Posting:
+        return self.__posting
+
+    def __move(self, posting: Optional[Posting]) -> bool:
+        self.__posting = posting
+        if posting is None:
+            self.document_id = None
+            return False
+        self.document_id = posting.document_id
+        self.term_frequency = posting.term_frequency
+        return True
+
+
+class PostingCursorIterator(Iterator[Posting]):
+    """
+    Adapts a cursor to the iterator API, for clients that prefer Posting objects. Supports skipping
+    ahead via advance_to/1, and hands out the underlying cursor via get_cursor/0.
+    """
+
+    def __init__(self, cursor: PostingCursor):
+        self.__cursor = cursor
+
+    def __next__(self) -> Posting:
+        if self.__cursor.next():
+            return self.__cursor.get_posting()
+        raise StopIteration
+
+    def advance_to(self, document_id: int) -> Optional[Posting]:
+        """
+        Advances the iterator to the first remaining posting whose document identifier is equal to or
+        larger than the given one, and returns that posting. Returns None if no such posting exists.
+        The iterator never moves backwards.
+        """
+        # The posting the cursor points to has already been emitted, so look beyond it.
+        cursor = self.__cursor
+        if cursor.document_id is not None and cursor.advance_to(max(document_id, cursor.document_id + 1)):
+            return cursor.get_posting()
+        return None
+
+    def get_cursor(self) -> PostingCursor:
+        """
+        Returns the underlying cursor. The iterator and the cursor share their position.
+        """
+        return self.__cursor
@@ -2,9 +2,14 @@
 # -*- coding: utf-8 -*-
 
 from abc import ABC, abstractmethod
-from typing import Iterator, List
-from .posting import Posting
+from array import array
+from bisect import bisect_left
+from typing import Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from .posting import Posting, PositionalPosting
 from .variablebytecodec import VariableByteCodec
+from .postingcodec import PostingCodec
+from .postingcursor import PostingCursor, IteratorPostingCursor, PostingCursorIterator
 
 
 class PostingList(ABC):
@@ -12,6 +17,9 @@ class PostingList(ABC):
     Abstract base class for a simple posting list.
     """
 
+    # Allows subclasses to do without a per-instance dictionary.
+    __slots__ = ()
+
     def __iter__(self):
         return self.get_iterator()
 
@@ -32,6 +40,13 @@ class PostingList(ABC):
         """
         pass
 
+    def get_cursor(self) -> PostingCursor:
+        """
+        Returns a cursor that can be used to traverse the posting list without allocating a Posting
+        object per entry. Implementations that can do better than wrapping an iterator should override this.
+        """
+        return IteratorPostingCursor(self.get_iterator())
+
     @abstractmethod
     def append_posting(self, posting: Posting) -> None:
         """
@@ -52,72 +67,570 @@ class PostingList(ABC):
 class InMemoryPostingList(PostingList):
     """
     A simple in-memory implementation of a posting list.
+
+    The postings are not kept as Posting objects, but column-wise: One column holds the document
+    identifiers and another the term frequencies. While postings are being appended the columns are
+    growable arrays, and when the posting list is finalized they are frozen into a single two-dimensional
+    NumPy array, one row per column. That way a posting costs 8 bytes instead of a Python object, and
+    clients can get at whole columns in one go. Posting objects are created on the fly as we iterate
+    over the posting list.
+
+    If the posting list is positional, the postings' encoded positions are concatenated into a single
+    buffer, and a third column says where in that buffer each posting's positions end.
     """
 
-    def __init__(self):
-        self.__postings : List[Posting] = []
+    # We might have a great many posting lists, so keep the per-list overhead down.
+    __slots__ = ("__columns", "__positions")
+
+    class InMemoryPostingListCursor(PostingCursor):
+        """
+        A cursor over the columns of a posting list. Since the postings are randomly accessible, we can
+        efficiently skip ahead via exponential (galloping) search followed by binary search. That way,
+        skipping ahead d postings costs O(log d) rather than O(d).
+        """
+
+        __slots__ = ("__document_ids", "__term_frequencies", "__positions", "__position_ends", "__where")
+
+        def __init__(self, columns: Sequence[Sequence[int]], positions: Optional[bytes] = None):
+            super().__init__()
+            if isinstance(columns, np.ndarray):
+                columns = [memoryview(column) for column in columns]  # Much faster element access.
+            self.__document_ids = columns[0]  # The column of document identifiers, sorted.
+            self.__term_frequencies = columns[1]  # The column of term frequencies.
+            self.__positions = positions  # The encoded positions for all postings, if positional.
+            self.__position_ends = columns[2] if positions is not None else None  # Where each posting's positions end.
+            self.__where = -1  # The index of the posting we currently point to.
+
+        def next(self) -> bool:
+            where = self.__where + 1
+            if where < len(self.__document_ids):
+                self.__where = where
+                self.document_id = self.__document_ids[where]
+                self.term_frequency = self.__term_frequencies[where]
+                return True
+            self.__where = len(self.__document_ids)
+            self.document_id = None
+            return False
+
+        def advance_to(self, document_id: int) -> bool:
+            if self.document_id is None or self.document_id >= document_id:
+                return self.document_id is not None
+
+            # Gallop ahead, doubling the step size, until we overshoot or run out of postings.
+            document_ids = self.__document_ids
+            low = self.__where + 1
+            step = 1
+            high = low
+            while high < len(document_ids) and document_ids[high] < document_id:
+                low = high + 1
+                high += step
+                step *= 2
+            high = min(high, len(document_ids))
+
+            # The posting we're looking for, if any, is somewhere in the range [low, high]. Binary search.
+            while low < high:
+                middle = (low + high) // 2
+                if document_ids[middle] < document_id:
+                    low = middle + 1
+                else:
+                    high = middle
+            self.__where = low - 1
+            return self.next()
+
+        def get_posting(self) -> Posting:
+            if self.__positions is not None:
+                where = self.__where
+                start = self.__position_ends[where - 1] if where else 0
+                return PositionalPosting(self.document_id, self.term_frequency,
+                                         self.__positions, start, self.__position_ends[where])
+            return Posting(self.document_id, self.term_frequency)
+
+        def read_remaining(self) -> Tuple[np.ndarray, np.ndarray]:
+            """
+            Consumes all postings after the current one, and returns their document identifiers and term
+            frequencies as a pair of NumPy arrays.
+            """
+            where = self.__where + 1
+            self.__where = len(self.__document_ids)
+            self.document_id = None
+            return (np.asarray(self.__document_ids[where:], dtype=np.int64),
+                    np.asarray(self.__term_frequencies[where:], dtype=np.int64))
+
+    class InMemoryPostingListIterator(PostingCursorIterator):
+        """
+        An iterator over the columns of a posting list, backed by a cursor.
+        """
+
+        def __init__(self, columns: Sequence[Sequence[int]], positions: Optional[bytes] = None):
+            super().__init__(InMemoryPostingList.InMemoryPostingListCursor(columns, positions))
+
+        def read_remaining(self) -> Tuple[np.ndarray, np.ndarray]:
+            """
+            Consumes all remaining postings, and returns their document identifiers and term frequencies
+            as a pair of NumPy arrays.
+            """
+            return self.get_cursor().read_remaining()
+
+    def __init__(self, positional: bool = False):
+        self.__columns = (array("I"), array("I"), array("I")) if positional else (array("I"), array("I"))
+        self.__positions = bytearray() if positional else None  # All encoded positions, concatenated.
 
     def get_length(self) -> int:
-        return len(self.__postings)
+        return len(self.__columns[0])
 
     def get_iterator(self) -> Iterator[Posting]:
-        return iter(self.__postings)
+        return __class__.InMemoryPostingListIterator(self.__columns, self.__positions)
+
+    def get_cursor(self) -> PostingCursor:
+        return __class__.InMemoryPostingListCursor(self.__columns, self.__positions)
+
+    def get_document_ids(self) -> np.ndarray:
+        """
+        Returns the document identifiers of all postings, in ascending order, as a read-only NumPy array.
+        """
+        return self.__freeze(self.__columns)[0]
+
+    def get_term_frequencies(self) -> np.ndarray:
+        """
+        Returns the term frequencies of all postings, parallel to get_document_ids/0, as a read-only
+        NumPy array.
+        """
+        return self.__freeze(self.__columns)[1]
 
     def append_posting(self, posting: Posting) -> None:
-        assert len(self.__postings) == 0 or self.__postings[-1].document_id < posting.document_id
-        self.__postings.append(posting)
+        document_ids = self.__columns[0]
+        assert len(document_ids) == 0 or document_ids[-1] < posting.document_id
+
+        # Appending after the posting list has been finalized is allowed, but rare. Thaw, if needed.
+        if isinstance(self.__columns, np.ndarray):
+            self.__columns = tuple(array("I", column.tobytes()) for column in self.__columns)
+            if self.__positions is not None:
+                self.__positions = bytearray(self.__positions)
+        self.__columns[0].append(posting.document_id)
+        self.__columns[1].append(posting.term_frequency)
+        if self.__positions is not None:
+            self.__positions.extend(posting.get_encoded_positions())
+            self.__columns[2].append(len(self.__positions))
 
     def finalize_postings(self) -> None:
-        pass
+        self.__columns = self.__freeze(self.__columns)
+        if self.__positions is not None:
+            self.__positions = bytes(self.__positions)
+
+    @staticmethod
+    def __freeze(columns: Sequence[Sequence[int]]) -> np.ndarray:
+        if isinstance(columns, np.ndarray):
+            return columns
+        frozen = np.vstack([np.frombuffer(column, dtype=np.uint32) for column in columns])
+        frozen.flags.writeable = False
+        return frozen
 
 
 class CompressedInMemoryPostingList(PostingList):
     """
     A simple in-memory implementation of a compressed posting list. Combines simple gap encoding
-    with variable-byte encoding. 
+    with variable-byte encoding.
+
+    The postings are logically grouped into fixed-size blocks, and for each block we keep a small
+    header that holds the block's last document identifier and where in the byte array the block
+    starts. The byte array itself is a single contiguous gap-encoded stream, but the headers act
+    as skip pointers: When looking for a given document identifier we can consult the headers and
+    jump over whole blocks of postings without decoding them. See Section 2.3.5 in
+    https://nlp.stanford.edu/IR-book/pdf/irbookonlinereading.pdf.
+
+    If the posting list is positional, each posting's encoded positions are stored right after the
+    term frequency, prefixed by their length in bytes. The positions can thus be skipped over cheaply
+    when they're not needed, and decoded lazily when they are.
+
+    Alternatively, the posting list can be compressed using a named PostingCodec. Each block is then
+    encoded as a unit: A byte holding the number of postings in the block, followed by the block's
+    gaps and then its term frequencies, each encoded using the codec. For positional posting lists,
+    the lengths of the encoded positions follow, encoded using the codec, and then the encoded
+    positions themselves. Postings are buffered until a block fills up, or until the posting list
+    is finalized. Note that a block is always decoded as a whole. As in Lucene, blocks that are not
+    full are variable-byte encoded, whatever the codec: The typical posting list is short, and a full
+    block is needed for the fixed costs of the more elaborate codecs to pay off.
     """
 
-    class CompressedInMemoryPostingListIterator(Iterator[Posting]):
+    # The number of postings per block.
+    _block_size = 128
+
+    # We might have a great many posting lists, so keep the per-list overhead down.
+    __slots__ = ("__logical_length", "__data", "__block_offsets", "__block_last_document_ids",
+                 "__positional", "__codec", "__pending")
+
+    class CompressedInMemoryPostingListCursor(PostingCursor):
         """
-        A custom iterator that decodes the compressed integers as we traverse the underlying byte
+        A custom cursor that decodes the compressed integers as we traverse the underlying byte
         array. The decoding logic needs to mirror the encoding logic that happens when postings are
         appended to the byte array.
+
+        The cursor can optionally be restricted to a given range of the buffer. That way, we can also
+        use it to decode posting data that is embedded in some larger buffer, e.g., a memory-mapped file.
+
+        If block headers are supplied, these are used as skip pointers by advance_to/1. Otherwise
+        advance_to/1 falls back to decoding its way forward one posting at a time.
+
+        Unless the posting list is positional, the rest of the current block is decoded in bulk when the
+        cursor enters it, and advance_to/1 can then search the decoded block. That is much faster than
+        decoding one integer at a time, except for the shortest posting lists where the fixed cost of a
+        bulk decode doesn't pay off.
         """
 
-        def __init__(self, data: bytearray):
+        # Bulk decode only if there are at least this many bytes left in the block.
+        _bulk_threshold = 64
+
+        __slots__ = ("__data", "__where", "__end", "__block_offsets", "__block_last_document_ids",
+                     "__count", "__positional", "__positions_start", "__positions_end",
+                     "__document_ids", "__term_frequencies", "__next")
+
+        def __init__(self, data: bytearray, start: int = 0, end: Optional[int] = None,
+                     block_offsets: Optional[array] = None, block_last_document_ids: Optional[array] = None,
+                     positional: bool = False):
+            super().__init__()
             self.__data = data  # The buffer holding all the compressed posting data.
-            self.__where = 0  # Our current position in the buffer.
-            self.__document_id = 0  # We encoded the gaps, so accumulate them when decoding.
+            self.__where = start  # Our current position in the buffer.
+            self.__end = len(data) if end is None else end  # Where the posting data stops.
+            self.__block_offsets = block_offsets  # Where each block starts in the buffer, if known.
+            self.__block_last_document_ids = block_last_document_ids  # The last document identifier in each block.
+            self.__count = 0  # How many postings we've decoded so far.
+            self.__positional = positional  # Are there positions embedded in the posting data?
+            self.__positions_start = 0  # Where the current posting's encoded positions start, if positional.
+            self.__positions_end = 0  # Where the current posting's encoded positions end, if positional.
+            self.__document_ids = []  # The document identifiers decoded in bulk, if any.
+            self.__term_frequencies = []  # The term frequencies decoded in bulk, if any.
+            self.__next = 0  # The index of the next posting decoded in bulk.
 
-        def __next__(self) -> Posting:
-            if self.__where < len(self.__data):
+        def next(self) -> bool:
+            if self.document_id is None:
+                return False
+            if self.__next < len(self.__document_ids) or self.__decode_block():
+                self.document_id = self.__document_ids[self.__next]
+                self.term_frequency = self.__term_frequencies[self.__next]
+                self.__next += 1
+                self.__count += 1
+                return True
+            if self.__where < self.__end:
                 (gap, increment) = VariableByteCodec.decode(self.__data, self.__where)
                 self.__where += increment
-                self.__document_id += gap
-                (term_frequency, increment) = VariableByteCodec.decode(self.__data, self.__where)
+                self.document_id = (self.document_id if self.__count else 0) + gap  # Accumulate the gaps.
+                (self.term_frequency, increment) = VariableByteCodec.decode(self.__data, self.__where)
                 self.__where += increment
-                return Posting(self.__document_id, term_frequency)
+                self.__count += 1
+                if self.__positional:
+                    (length, increment) = VariableByteCodec.decode(self.__data, self.__where)
+                    self.__positions_start = self.__where + increment
+                    self.__where = self.__positions_end = self.__positions_start + length
+                return True
+            self.document_id = None
+            return False
+
+        def advance_to(self, document_id: int) -> bool:
+            if self.document_id is None or self.document_id >= document_id:
+                return self.document_id is not None
+            if self.__block_offsets is not None:
+
+                # Which block does the next posting belong to? Find the first block at or after that one
+                # whose last document identifier is large enough. Note that binary search is overkill if
+                # we're only skipping ahead a few blocks, but it's simple and correct.
+                block_size = CompressedInMemoryPostingList._block_size
+                current = self.__count // block_size
+                target = bisect_left(self.__block_last_document_ids, document_id, current)
+
+                # Jump ahead, if we can. The gaps are continuous across blocks, so the block's
+                # base document identifier is the last document identifier in the preceding block.
+                if target > current:
+                    if target >= len(self.__block_offsets):
+                        self.__where = self.__end
+                        self.document_id = None
+                        return False
+                    self.__where = self.__block_offsets[target]
+                    self.document_id = self.__block_last_document_ids[target - 1]
+                    self.__count = target * block_size
+                    self.__document_ids, self.__term_frequencies, self.__next = [], [], 0
+
+            # Search within the block, if it's been decoded in bulk. Otherwise scan forward.
+            if self.__next < len(self.__document_ids) or self.__decode_block():
+                i = bisect_left(self.__document_ids, document_id, self.__next)
+                if i < len(self.__document_ids):
+                    self.__count += i - self.__next
+                    self.__next = i
+                    return self.next()
+                self.__count += i - 1 - self.__next
+                self.__next = i - 1
+                self.next()
+            while self.next():
+                if self.document_id >= document_id:
+                    return True
+            return False
+
+        def get_posting(self) -> Posting:
+            if self.__positional:
+                return PositionalPosting(self.document_id, self.term_frequency, self.__data,
+                                         self.__positions_start, self.__positions_end)
+            return Posting(self.document_id, self.term_frequency)
+
+        def __decode_block(self) -> bool:
+            # Decode the rest of the current block in bulk, if it's worth it. The gaps and the term
+            # frequencies alternate, and the block ends where the next one starts.
+            if self.__positional:
+                return False
+            end = self.__end
+            if self.__block_offsets is not None:
+                block = self.__count // CompressedInMemoryPostingList._block_size + 1
+                if block < len(self.__block_offsets):
+                    end = self.__block_offsets[block]
+            if self.__where >= end or end - self.__where < self._bulk_threshold:
+                return False
+            (numbers, _) = VariableByteCodec.decode_many(memoryview(self.__data)[self.__where:end])
+            document_ids = np.cumsum(numbers[0::2]) + (self.document_id if self.__count else 0)
+            self.__document_ids = document_ids.tolist()
+            self.__term_frequencies = numbers[1::2].tolist()
+            self.__next = 0
+            self.__where = end
+            return True
+
+    class CompressedInMemoryPostingListIterator(PostingCursorIterator):
+        """
+        An iterator over compressed posting data, backed by a cursor. See the cursor for details.
+        """
+
+        def __init__(self, data: bytearray, start: int = 0, end: Optional[int] = None,
+                     block_offsets: Optional[array] = None, block_last_document_ids: Optional[array] = None,
+                     positional: bool = False):
+            super().__init__(CompressedInMemoryPostingList.CompressedInMemoryPostingListCursor(
+                data, start, end, block_offsets, block_last_document_ids, positional))
+
+    class BlockIterator(Iterator[Posting]):
+        """
+        A custom iterator over a posting list that is compressed using a PostingCodec. Decodes one
+        block at a time, and uses the block headers as skip pointers. Postings that have not yet been
+        encoded into a block are emitted after the last block.
+        """
+
+        def __init__(self, data: bytearray, block_offsets: array, block_last_document_ids: array,
+                     codec: PostingCodec, positional: bool, pending: Optional[List[Posting]]):
+            self.__data = data  # The buffer holding all the encoded blocks.
+            self.__block_offsets = block_offsets  # Where each block starts in the buffer.
+            self.__block_last_document_ids = block_last_document_ids  # The last document identifier in each block.
+            self.__codec = codec  # How the full blocks are encoded.
+            self.__fallback = PostingCodec.create("vb")  # How the other blocks are encoded.
+            self.__positional = positional  # Are there positions embedded in the blocks?
+            self.__pending = pending or []  # Postings not yet encoded, if any.
+            self.__block = -1  # The block we've currently decoded. The pending postings count as the last block.
+            self.__postings: List[Posting] = []  # The postings in the current block.
+            self.__where = 0  # The index of the posting we'll emit next from the current block.
+
+        def __next__(self) -> Posting:
+            while self.__where >= len(self.__postings):
+                if self.__block >= len(self.__block_offsets):
+                    raise StopIteration
+                self.__load(self.__block + 1)
+            self.__where += 1
+            return self.__postings[self.__where - 1]
+
+        def advance_to(self, document_id: int) -> Optional[Posting]:
+            """
+            Advances the iterator to the first remaining posting whose document identifier is equal to or
+            larger than the given one, and returns that posting. Returns None if no such posting exists.
+            The iterator never moves backwards.
+
+            Whole blocks of postings that cannot contain the given document identifier are skipped
+            without being decoded.
+            """
+            target = bisect_left(self.__block_last_document_ids, document_id, max(0, self.__block))
+            if target > self.__block:
+                self.__load(target)
+            posting = next(self, None)
+            while posting and posting.document_id < document_id:
+                posting = next(self, None)
+            return posting
+
+        def __load(self, block: int) -> None:
+            # Decode the given block in its entirety. The gaps are continuous across blocks, so the
+            # block's base document identifier is the last document identifier in the preceding block.
+            self.__block = block
+            self.__where = 0
+            if block >= len(self.__block_offsets):
+                self.__postings = self.__pending
+                return
+            data = self.__data
+            where = self.__block_offsets[block]
+            count = data[where]
+            where += 1
+            codec = self.__codec if count == CompressedInMemoryPostingList._block_size else self.__fallback
+            (gaps, used) = codec.decode(data, count, where)
+            where += used
+            (term_frequencies, used) = codec.decode(data, count, where)
+            where += used
+            base = self.__block_last_document_ids[block - 1] if block > 0 else 0
+            document_ids = (np.cumsum(gaps) + base).tolist()
+            term_frequencies = term_frequencies.tolist()
+            if self.__positional:
+                (lengths, used) = codec.decode(data, count, where)
+                ends = (np.cumsum(lengths) + where + used).tolist()
+                starts = [where + used] + ends[:-1]
+                self.__postings = [PositionalPosting(d, f, data, s, e)
+                                   for (d, f, s, e) in zip(document_ids, term_frequencies, starts, ends)]
             else:
-                raise StopIteration
+                self.__postings = [Posting(d, f) for (d, f) in zip(document_ids, term_frequencies)]
 
-    def __init__(self):
+    def __init__(self, positional: bool = False, codec: Optional[str] = None):
+        self.__positional = positional  # If set, all appended postings must be positional.
+        self.__codec = PostingCodec.create(codec) if codec else None  # If set, we encode whole blocks.
+        self.__pending = None  # If we encode whole blocks, the postings that don't yet fill a block.
         self.__logical_length = 0  # The number of posting entries encoded in the byte array.
-        self.__previous_document_id = 0  # So that we can gap encode.
         self.__data = bytearray()  # All posting entries, compressed.
+        self.__block_offsets = array("I")  # Skip pointers: Where in the byte array each block starts.
+        self.__block_last_document_ids = array("I")  # Skip pointers: The last document identifier in each block.
 
     def get_length(self) -> int:
         return self.__logical_length
 
     def get_iterator(self) -> Iterator[Posting]:
-        return __class__.CompressedInMemoryPostingListIterator(self.__data)
+        if self.__codec:
+            return __class__.BlockIterator(self.__data, self.__block_offsets, self.__block_last_document_ids,
+                                           self.__codec, self.__positional, self.__pending)
+        return __class__.CompressedInMemoryPostingListIterator(self.__data, 0, None, self.__block_offsets,
+                                                               self.__block_last_document_ids, self.__positional)
+
+    def get_cursor(self) -> PostingCursor:
+        if self.__codec:
+            return super().get_cursor()
+        return __class__.CompressedInMemoryPostingListCursor(self.__data, 0, None, self.__block_offsets,
+                                                             self.__block_last_document_ids, self.__positional)
+
+    def get_byte_size(self) -> int:
+        """
+        Returns the number of bytes that the compressed postings occupy. If a codec is used, this
+        includes the byte at the start of each block that holds the block's posting count. It
+        doesn't include the skip pointers kept alongside, nor postings not yet encoded.
+        """
+        return len(self.__data)
 
     def append_posting(self, posting: Posting) -> None:
-        assert self.__logical_length == 0 or posting.document_id > self.__previous_document_id
-        gap = posting.document_id - self.__previous_document_id
+        if isinstance(self.__data, bytes):
+            self.__thaw()
+
+        # The last document identifier in the last block doubles as the previous document identifier,
+        # so that we can gap encode. Pending postings, if any, come after it.
+        previous_document_id = self.__block_last_document_ids[-1] if self.__block_last_document_ids else 0
+        if self.__pending:
+            previous_document_id = self.__pending[-1].document_id
+        assert self.__logical_length == 0 or posting.document_id > previous_document_id
+        if self.__codec:
+            self.__pending = self.__pending or []
+            self.__pending.append(posting)
+            self.__logical_length += 1
+            if len(self.__pending) == self._block_size:
+                self.__flush()
+            return
+        if self.__logical_length % self._block_size == 0:
+            self.__block_offsets.append(len(self.__data))
+            self.__block_last_document_ids.append(posting.document_id)
+        gap = posting.document_id - previous_document_id
         VariableByteCodec.encode(gap, self.__data)
         VariableByteCodec.encode(posting.term_frequency, self.__data)
+        if self.__positional:
+            positions = posting.get_encoded_positions()
+            VariableByteCodec.encode(len(positions), self.__data)
+            self.__data.extend(positions)
         self.__logical_length += 1
-        self.__previous_document_id = posting.document_id
+        self.__block_last_document_ids[-1] = posting.document_id
 
     def finalize_postings(self) -> None:
-        pass
+        # Trim the byte array. Most posting lists are short, and with a single block we have no use for
+        # skip pointers either. If more postings are appended later, we'll have to undo this.
+        if self.__codec and self.__pending:
+            self.__flush()
+        self.__data = bytes(self.__data)
+        if not self.__codec and len(self.__block_offsets) == 1:
+            self.__block_offsets = None
+            self.__block_last_document_ids = None
+
+    def __thaw(self) -> None:
+        self.__data = bytearray(self.__data)
+        if self.__block_offsets is None:
+            *_, last = __class__.CompressedInMemoryPostingListIterator(self.__data, positional=self.__positional)
+            self.__block_offsets = array("I", [0])
+            self.__block_last_document_ids = array("I", [last.document_id])
+
+    def __flush(self) -> None:
+        # Encode the pending postings as a block. Blocks can be smaller than the block size, e.g., if
+        # more postings are appended after the posting list has been finalized.
+        postings = self.__pending
+        codec = self.__codec if len(postings) == self._block_size else PostingCodec.create("vb")
+        base = self.__block_last_document_ids[-1] if self.__block_last_document_ids else 0
+        document_ids = np.array([p.document_id for p in postings], dtype=np.int64)
+        self.__block_offsets.append(len(self.__data))
+        self.__block_last_document_ids.append(postings[-1].document_id)
+        self.__data.append(len(postings))
+        self.__data.extend(codec.encode(np.diff(document_ids, prepend=base)))
+        self.__data.extend(codec.encode(np.array([p.term_frequency for p in postings], dtype=np.int64)))
+        if self.__positional:
+            positions = [p.get_encoded_positions() for p in postings]
+            self.__data.extend(codec.encode(np.array([len(p) for p in positions], dtype=np.int64)))
+            for encoded in positions:
+                self.__data.extend(encoded)
+        self.__pending = None
+
+
+class ImpactOrderedPostingList:
+    """
+    A read-only posting list where the postings are grouped into segments by their impacts, i.e., by how
+    much they contribute to a document's score. The impacts are precomputed and quantized into small integers,
+    so lots of postings share the same impact. The segments are ordered by decreasing impact, and within a
+    segment the postings are ordered by document identifier. Postings without any impact are left out.
+
+    That's the layout needed for score-at-a-time query evaluation, where the most important postings across
+    all the query terms get processed first. See "Vector-Space Ranking with Effective Early Termination" by
+    Anh et al.
+    """
+
+    def __init__(self, document_ids: Sequence[int], impacts: Sequence[int]):
+        document_ids = np.asarray(document_ids, dtype=np.int64)
+        impacts = np.asarray(impacts, dtype=np.int64)
+        assert len(document_ids) == len(impacts)
+        assert np.all(document_ids[1:] > document_ids[:-1]), "Postings must be sorted"
+        assert np.all(impacts >= 0)
+
+        # The document identifiers are already sorted, so a stable sort on the impacts does the job.
+        keep = impacts > 0
+        (document_ids, impacts) = (document_ids[keep], impacts[keep])
+        order = np.argsort(-impacts, kind="stable")
+        (document_ids, impacts) = (document_ids[order], impacts[order])
+        starts = np.flatnonzero(np.diff(impacts, prepend=-1))
+        self.__document_ids = document_ids
+        self.__impacts = impacts[starts]
+        self.__offsets = np.append(starts, len(document_ids))
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        return (self.get_segment(i) for i in range(self.get_segment_count()))
+
+    def __len__(self):
+        return self.get_length()
+
+    def get_length(self) -> int:
+        """
+        Returns the length of the posting list, i.e., the number of postings it contains.
+        """
+        return len(self.__document_ids)
+
+    def get_segment_count(self) -> int:
+        """
+        Returns the number of distinct impacts.
+        """
+        return len(self.__impacts)
+
+    def get_segment(self, i: int) -> Tuple[int, np.ndarray]:
+        """
+        Returns the i-th segment as an (impact, document identifiers) pair. The segments are ordered by
+        decreasing impact, and the document identifiers are sorted.
+        """
+        return (int(self.__impacts[i]), self.__document_ids[self.__offsets[i]:self.__offsets[i + 1]])
+
+    def get_impact(self, i: int) -> int:
+        """
+        Returns the impact of the i-th segment, or 0 if there is no such segment.
+        """
+        return int(self.__impacts[i]) if i < len(self.__impacts) else 0
@@ -1,8 +1,9 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from typing import Iterator
+from typing import Iterator, List, Optional
 from .posting import Posting
+from .postingcursor import PostingCursor
 
 
 class PostingsMerger:
@@ -16,6 +17,25 @@ class PostingsMerger:
     a new one that produces an averaged value, or something else.
     """
 
+    @staticmethod
+    def advance(iterator: Iterator[Posting], document_id: int) -> Optional[Posting]:
+        """
+        Advances the given iterator to the first remaining posting whose document identifier
+        is equal to or larger than the given one, and returns that posting. Returns None if the
+        iterator is exhausted before such a posting is found.
+
+        If the iterator knows how to skip ahead efficiently, e.g., by making use of skip
+        pointers, it can expose this through an advance_to/1 method. Otherwise we simply
+        scan forward one posting at a time.
+        """
+        advance_to = getattr(iterator, "advance_to", None)
+        if advance_to:
+            return advance_to(document_id)
+        posting = next(iterator, None)
+        while posting and posting.document_id < document_id:
+            posting = next(iterator, None)
+        return posting
+
     @staticmethod
     def intersection(p1: Iterator[Posting], p2: Iterator[Posting]) -> Iterator[Posting]:
         """
@@ -26,23 +46,99 @@ class PostingsMerger:
         to the document identifiers.
         """
 
+        # Traverse using cursors, so that we only allocate Posting objects for what we yield.
+        cursor1 = PostingCursor.of(p1)
+        cursor2 = PostingCursor.of(p2)
+
         # Start at the head.
-        current1 = next(p1, None)
-        current2 = next(p2, None)
+        cursor1.next()
+        cursor2.next()
 
         # We're doing an AND, so we can abort as soon as we exhaust one of
         # the posting lists.
-        while current1 and current2:
-
-            # Increment the smallest one. Yield if we have a match.
-            if current1.document_id == current2.document_id:
-                yield current1
-                current1 = next(p1, None)
-                current2 = next(p2, None)
-            elif current1.document_id < current2.document_id:
-                current1 = next(p1, None)
+        while cursor1.document_id is not None and cursor2.document_id is not None:
+
+            # Advance the smallest one. Yield if we have a match. When advancing, we
+            # know what we're looking for, so the cursors might be able to skip ahead.
+            if cursor1.document_id == cursor2.document_id:
+                yield cursor1.get_posting()
+                cursor1.next()
+                cursor2.next()
+            elif cursor1.document_id < cursor2.document_id:
+                cursor1.advance_to(cursor2.document_id)
+            else:
+                cursor2.advance_to(cursor1.document_id)
+
+    @staticmethod
+    def intersection_many(iterators: List[Iterator[Posting]],
+                          document_frequencies: Optional[List[int]] = None) -> Iterator[Posting]:
+        """
+        A generator that yields a simple AND of N posting lists, given iterators over these.
+        The yielded postings are taken from the shortest posting list.
+
+        The posting lists are assumed sorted in increasing order according to the document
+        identifiers. If the lengths of the posting lists (i.e., the document frequencies) are
+        supplied, these are used to drive the merge from the shortest list. Otherwise, the
+        first posting list is assumed to be the shortest one.
+
+        Each candidate from the shortest list is looked up in the other lists by advancing
+        these. If the iterators support efficient skipping (e.g., via galloping search or skip
+        pointers) then the cost is roughly proportional to the length of the shortest posting
+        list times the logarithm of the length of the longest one, and not to the sum of all
+        the lengths.
+        """
+        cursors = PostingsMerger.__get_cursors(iterators, document_frequencies)
+        for _ in PostingsMerger.__align(cursors):
+            yield cursors[0].get_posting()
+
+    @staticmethod
+    def intersection_many_postings(iterators: List[Iterator[Posting]],
+                                   document_frequencies: Optional[List[int]] = None) -> Iterator[List[Posting]]:
+        """
+        As intersection_many/2, but yields, for each document that occurs in all the posting lists,
+        the list of postings for that document. The postings are listed in the same order as the
+        posting lists they are taken from, so that clients can look at, e.g., the positions per list.
+        """
+        cursors = PostingsMerger.__get_cursors(iterators, None)
+        ordered = PostingsMerger.__get_cursors(cursors, document_frequencies)
+        for _ in PostingsMerger.__align(ordered):
+            yield [cursor.get_posting() for cursor in cursors]
+
+    @staticmethod
+    def __get_cursors(iterators: List[Iterator[Posting]],
+                      document_frequencies: Optional[List[int]]) -> List[PostingCursor]:
+        # Order the lists so that the shortest one comes first, if we know their lengths. Traverse using
+        # cursors, so that we only allocate Posting objects for what we yield.
+        if document_frequencies is not None:
+            assert len(document_frequencies) == len(iterators)
+            iterators = [iterators[i] for i in sorted(range(len(iterators)), key=lambda i: document_frequencies[i])]
+        return [PostingCursor.of(iterator) for iterator in iterators]
+
+    @staticmethod
+    def __align(cursors: List[PostingCursor]) -> Iterator[None]:
+        # Nothing to do? Otherwise, yields each time all the cursors rest on the same document. We move
+        # the cursors over the other lists lazily, only when we have a candidate to look for.
+        if not cursors:
+            return
+        candidates = cursors[0]
+
+        # Candidates are drawn from the shortest list. We're doing an AND, so we can abort as soon
+        # as we exhaust any of the posting lists.
+        candidates.next()
+        while candidates.document_id is not None:
+            for cursor in cursors[1:]:
+                if not cursor.advance_to(candidates.document_id):
+                    return
+                if cursor.document_id > candidates.document_id:
+
+                    # No match. The next candidate cannot precede what we just found, so skip ahead.
+                    candidates.advance_to(cursor.document_id)
+                    break
             else:
-                current2 = next(p2, None)
+
+                # All the lists mention the candidate. Move on to the next one.
+                yield
+                candidates.next()
 
     @staticmethod
     def union(p1: Iterator[Posting], p2: Iterator[Posting]) -> Iterator[Posting]:
@@ -54,30 +150,32 @@ class PostingsMerger:
         to the document identifiers.
         """
 
+        # Traverse using cursors, so that we only allocate Posting objects for what we yield.
+        cursor1 = PostingCursor.of(p1)
+        cursor2 = PostingCursor.of(p2)
+
         # Start at the head.
-        current1 = next(p1, None)
-        current2 = next(p2, None)
+        cursor1.next()
+        cursor2.next()
 
         # We're doing an OR. First handle the case where neither posting
         # list is exhausted.
-        while current1 and current2:
+        while cursor1.document_id is not None and cursor2.document_id is not None:
 
             # Yield the smallest one.
-            if current1.document_id == current2.document_id:
-                yield current1
-                current1 = next(p1, None)
-                current2 = next(p2, None)
-            elif current1.document_id < current2.document_id:
-                yield current1
-                current1 = next(p1, None)
+            if cursor1.document_id == cursor2.document_id:
+                yield cursor1.get_posting()
+                cursor1.next()
+                cursor2.next()
+            elif cursor1.document_id < cursor2.document_id:
+                yield cursor1.get_posting()
+                cursor1.next()
             else:
-                yield current2
-                current2 = next(p2, None)
+                yield cursor2.get_posting()
+                cursor2.next()
 
         # At least one of the lists are exhausted. Yield the remaining tail(s), if any.
-        if current1:
-            yield current1
-            yield from p1
-        if current2:
-            yield current2
-            yield from p2
+        for cursor in (cursor1, cursor2):
+            while cursor.document_id is not None:
+                yield cursor.get_posting()
+                cursor.next()
@@ -0,0 +1,127 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+import weakref
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class QueryCache:
+    """
+    A cache for query results that can be put in front of a search engine, so that repeated queries
+    don't need to be evaluated over and over again. This is useful if, e.g., queries are evaluated on a
+    per keypress basis and users keep retyping the same prefixes. Since the engines sift the results
+    before emitting them anyway, we cache the final, ranked results.
+
+    The cache holds at most a given number of entries, and evicts the least recently used entry when
+    it overflows. Optionally, entries also expire after a given number of seconds. If the cached results
+    are derived from data that can change, e.g., an updatable inverted index, the client can supply the
+    generation of that data when looking up and storing entries. Each entry remembers the generation it was
+    stored with, and is invalidated if it's looked up with another generation.
+
+    The cache is safe to share between threads, e.g., the request handlers of a threaded web server. It
+    can also be shared between engines, as long as the engines make themselves part of the keys.
+    """
+
+    def __init__(self, capacity: int = 1000, ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        assert capacity > 0
+        assert ttl is None or ttl > 0
+        self.__capacity = capacity  # The maximum number of entries.
+        self.__ttl = ttl  # How many seconds an entry lives, if entries expire.
+        self.__clock = clock  # Tells the time, in seconds.
+        self.__entries: OrderedDict[Hashable, Tuple[float, Optional[int], List[Dict[str, Any]]]] = OrderedDict()  # Oldest first.
+        self.__statistics = Counter()
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @staticmethod
+    def make_key(terms: Iterable[str], options: Dict[str, Any], *others: object) -> Optional[Hashable]:
+        """
+        Makes a cache key from the given normalized query terms and query evaluation options. The objects
+        whose identities affect the results, e.g., the engine and the ranker, must be included too. These
+        are compared by identity and referenced weakly, so that the cache doesn't keep them alive. Entries
+        whose objects have been garbage collected are never hit again, and are eventually evicted.
+
+        Option values that are lists, sets or dictionaries are frozen recursively, so that they can be part
+        of the key. Returns None if some option value is unhashable in some other way, in which case the
+        query shouldn't be cached.
+        """
+        try:
+            key = (tuple(terms), QueryCache.__freeze(options), *(weakref.ref(other) for other in others))
+            hash(key)  # Weak references can only be hashed while their objects are alive, but remember their hashes.
+        except TypeError:
+            return None
+        return key
+
+    @staticmethod
+    def __freeze(value: Any) -> Hashable:
+        # Produces a hashable equivalent of the given value. Dictionaries and sets don't care about order,
+        # and neither do their frozen counterparts, so keys of mixed types needn't be sortable.
+        if isinstance(value, dict):
+            return (dict, frozenset((QueryCache.__freeze(k), QueryCache.__freeze(v)) for (k, v) in value.items()))
+        if isinstance(value, (set, frozenset)):
+            return (frozenset, frozenset(QueryCache.__freeze(v) for v in value))
+        if isinstance(value, (list, tuple)):
+            return (tuple, tuple(QueryCache.__freeze(v) for v in value))
+        return value
+
+    def get(self, key: Hashable, generation: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Looks up the results cached for the given key. Returns None if there are none, or if they
+        have expired or are from a different generation.
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[1] != generation:
+                del self.__entries[key]
+                self.__statistics.update(invalidations=1)
+                entry = None
+            if entry is not None and self.__ttl is not None and entry[0] <= self.__clock():
+                del self.__entries[key]
+                self.__statistics.update(expirations=1)
+                entry = None
+            if entry is None:
+                self.__statistics.update(misses=1)
+                return None
+            self.__entries.move_to_end(key)
+            self.__statistics.update(hits=1)
+
+        # The results are dictionaries, so hand out copies in case the client modifies them.
+        return [dict(result) for result in entry[2]]
+
+    def put(self, key: Hashable, results: Iterable[Dict[str, Any]], generation: Optional[int] = None) -> None:
+        """
+        Caches the given results for the given key. Evicts the least recently used entry, if needed.
+        """
+        results = [dict(result) for result in results]
+        with self.__lock:
+            expires = self.__clock() + self.__ttl if self.__ttl is not None else 0.0
+            self.__entries[key] = (expires, generation, results)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__capacity:
+                self.__entries.popitem(last=False)
+                self.__statistics.update(evictions=1)
+
+    def clear(self) -> None:
+        """
+        Removes all entries from the cache. The statistics are retained.
+        """
+        with self.__lock:
+            self.__entries.clear()
+
+    def get_statistics(self) -> Dict[str, int]:
+        """
+        Returns some simple counters, accumulated over the lifetime of the cache: The number of "hits" and
+        "misses", how many entries were "evicted" to make room for new ones, how many entries "expired", and
+        how many entries were "invalidated" because the generation changed. The current number of
+        entries is returned as "size".
+        """
+        with self.__lock:
+            statistics = {k: 0 for k in ["hits", "misses", "evictions", "expirations", "invalidations"]}
+            statistics.update(self.__statistics)
+            statistics["size"] = len(self.__entries)
+            return statistics
@@ -1,7 +1,9 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import numpy as np
 from abc import ABC, abstractmethod
+from typing import Optional
 from .posting import Posting
 
 
@@ -14,6 +16,10 @@ class Ranker(ABC):
     def reset(self, document_id: int) -> None:
         """
         Resets the ranker, i.e., prepares it for evaluating another document.
+
+        Within a query, document-at-a-time evaluators score the documents in order of increasing
+        document identifiers. Rankers may exploit that to be faster, but must give the same scores
+        if the documents are scored in any other order, e.g., because a new query is evaluated.
         """
         pass
 
@@ -36,6 +42,46 @@ class Ranker(ABC):
         """
         pass
 
+    def get_upper_bound(self, term: str, multiplicity: int, maximum_term_frequency: int) -> Optional[float]:
+        """
+        Returns an upper bound on how much a single update invocation for the given query term can
+        contribute to a document's score, given that no posting for the term has a term frequency
+        larger than the one supplied. Returns None if no such bound can be given.
+
+        Query evaluators that do dynamic pruning (e.g., WAND) rely on these bounds to skip documents
+        that cannot possibly make it into the result set. Rankers that don't provide bounds simply
+        don't get pruned.
+        """
+        return None
+
+    def get_static_upper_bound(self) -> float:
+        """
+        Returns an upper bound on the query-independent part of a document's score, i.e., what
+        evaluate/0 adds on top of the contributions from the update invocations.
+        """
+        return 0.0
+
+    def get_term_score(self, term: str, multiplicity: int, term_frequency: int) -> Optional[float]:
+        """
+        Returns how much a single update invocation for the given query term adds to the accumulated
+        score, given a posting with the supplied term frequency. Returns None if the ranker doesn't
+        accumulate its score that way, i.e., as a sum that starts at 0.0 and that gets one term added
+        per update invocation in the order of the invocations.
+
+        Query evaluators that do term-at-a-time traversal rely on this to accumulate scores for many
+        documents at once, without going through reset/update/evaluate for every document. Rankers that
+        return None here simply don't get evaluated that way.
+        """
+        return None
+
+    def evaluate_many(self, document_ids: np.ndarray, scores: np.ndarray) -> np.ndarray:
+        """
+        The vectorized counterpart to evaluate/0, for use together with get_term_score/3. Given the
+        accumulated scores for the given documents, returns the documents' relevancy scores. Rankers
+        whose evaluate/0 does more than just return the accumulated score must override this.
+        """
+        return scores
+
 
 class SimpleRanker(Ranker):
     """
@@ -56,3 +102,9 @@ class SimpleRanker(Ranker):
 
     def evaluate(self) -> float:
         return self.__score
+
+    def get_upper_bound(self, term: str, multiplicity: int, maximum_term_frequency: int) -> Optional[float]:
+        return float(multiplicity * maximum_term_frequency)
+
+    def get_term_score(self, term: str, multiplicity: int, term_frequency: int) -> Optional[float]:
+        return float(multiplicity * term_frequency)
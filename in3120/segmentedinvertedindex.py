@@ -0,0 +1,260 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import math
+from bisect import bisect_right
+from typing import Iterable, Iterator, List, Optional, Tuple
+from .corpus import Corpus, InMemoryCorpus
+from .document import Document
+from .normalizer import Normalizer
+from .tokenizer import Tokenizer
+from .posting import Posting
+from .invertedindex import InvertedIndex, InMemoryInvertedIndex
+from .postingsmerger import PostingsMerger
+
+
+class _Segment:
+    """
+    One segment of a SegmentedInvertedIndex: An in-memory inverted index over a range of documents,
+    together with a bitmap of tombstones that flags which of these documents have been deleted. Bit i
+    in the bitmap corresponds to the document with identifier first + i.
+    """
+
+    __slots__ = ("index", "first", "last", "tombstones", "deleted", "size")
+
+    def __init__(self, index: InMemoryInvertedIndex):
+        self.index = index
+        self.first = None
+        self.last = None
+        self.tombstones = bytearray()
+        self.deleted = 0
+        self.size = 0
+        for document_id in index.get_document_ids():
+            self.add(document_id)
+
+    def add(self, document_id: int) -> None:
+        if self.first is None:
+            self.first = document_id
+        self.last = document_id
+        self.size += 1
+        needed = (document_id - self.first) // 8 + 1
+        if needed > len(self.tombstones):
+            self.tombstones.extend(bytes(needed - len(self.tombstones)))
+
+    def is_deleted(self, document_id: int) -> bool:
+        i = document_id - self.first
+        return bool(self.tombstones[i >> 3] & (1 << (i & 7)))
+
+    def delete(self, document_id: int) -> bool:
+        i = document_id - self.first
+        if self.tombstones[i >> 3] & (1 << (i & 7)):
+            return False
+        self.tombstones[i >> 3] |= 1 << (i & 7)
+        self.deleted += 1
+        return True
+
+
+class SegmentedInvertedIndex(InvertedIndex):
+    """
+    An updatable inverted index, where documents can be added and deleted without rebuilding the
+    index from scratch. The index is a sequence of segments, each of which is an InMemoryInvertedIndex
+    over a range of documents. Queries span all the segments.
+
+    New documents go into a small mutable segment at the end. When that segment has grown large
+    enough it is sealed, and a fresh mutable segment is started when the next document arrives.
+    Deleted documents are not removed from the segments right away. Instead, they are flagged in a
+    per-segment bitmap of tombstones, and skipped when traversing the posting lists.
+
+    To keep the number of segments logarithmic in the size of the index, a tiered merge policy kicks
+    in whenever a segment is sealed: Segments are grouped into tiers according to their sizes, and
+    whenever enough adjacent segments end up in the same tier they are merged into one segment in
+    the next tier. Merging is also when tombstoned documents are finally purged. Clients can also
+    force everything to be merged into a single segment. Merges work directly on the posting lists,
+    so no documents are reprocessed.
+
+    Until they are purged, deleted documents are still counted by get_document_frequency/1 and the
+    other statistics, as in Lucene. This keeps the statistics cheap to compute, and only affects ranking
+    slightly. The posting lists never contain deleted documents.
+
+    Document identifiers must be added in ascending order, so that the segments cover disjoint and
+    ascending ranges of documents.
+    """
+
+    # How many documents before the mutable segment gets sealed, and how many segments in
+    # a tier before they get merged.
+    _segment_size = 1000
+    _merge_factor = 4
+
+    class SegmentedPostingsIterator(Iterator[Posting]):
+        """
+        Iterates over the posting lists for a term across all segments, in order, skipping
+        postings for deleted documents. Supports skipping ahead, as the segments' posting lists do.
+        """
+
+        def __init__(self, segments: List[_Segment], term: str):
+            self.__segments = [s for s in segments if term in s.index]
+            self.__term = term
+            self.__current = 0
+            self.__iterator = self.__segments[0].index[term] if self.__segments else None
+
+        def __next__(self) -> Posting:
+            while self.__iterator is not None:
+                posting = next(self.__iterator, None)
+                if posting is None:
+                    self.__next_segment()
+                elif not self.__segments[self.__current].deleted:
+                    return posting
+                elif not self.__segments[self.__current].is_deleted(posting.document_id):
+                    return posting
+            raise StopIteration
+
+        def advance_to(self, document_id: int) -> Optional[Posting]:
+            """
+            Returns the first posting for a non-deleted document with an identifier that is at
+            least as large as the given one, or None if we run out of postings.
+            """
+            while self.__iterator is not None:
+                segment = self.__segments[self.__current]
+                if segment.last < document_id:
+                    self.__next_segment()
+                    continue
+                posting = PostingsMerger.advance(self.__iterator, document_id)
+                if posting is None:
+                    self.__next_segment()
+                elif not segment.deleted or not segment.is_deleted(posting.document_id):
+                    return posting
+                else:
+                    return next(self, None)
+            return None
+
+        def __next_segment(self) -> None:
+            self.__current += 1
+            self.__iterator = self.__segments[self.__current].index[self.__term] if self.__current < len(self.__segments) else None
+
+    def __init__(self, corpus: Corpus, fields: Iterable[str], normalizer: Normalizer, tokenizer: Tokenizer,
+                 compressed: bool = False):
+        self.__fields = list(fields)
+        self.__normalizer = normalizer
+        self.__tokenizer = tokenizer
+        self.__compressed = compressed
+        self.__segments: List[_Segment] = []
+        self.__mutable: Optional[_Segment] = None
+        self.__generation = 0
+        if corpus.size() > 0:
+            self.__segments.append(_Segment(self.__new_index(corpus)))
+
+    def __new_index(self, corpus: Corpus) -> InMemoryInvertedIndex:
+        return InMemoryInvertedIndex(corpus, self.__fields, self.__normalizer, self.__tokenizer, self.__compressed)
+
+    def add_document(self, document: Document) -> None:
+        """
+        Indexes the given document. The document's identifier must be larger than those of all
+        previously added documents. The document is not added to the corpus.
+        """
+        assert not self.__segments or document.document_id > self.__segments[-1].last, "Documents must be sorted"
+        if self.__mutable is None:
+            self.__mutable = _Segment(self.__new_index(InMemoryCorpus()))
+            self.__segments.append(self.__mutable)
+        self.__mutable.index.add_document(document)
+        self.__mutable.add(document.document_id)
+        self.__generation += 1
+        if self.__mutable.size >= self._segment_size:
+            self.__mutable = None
+            self.__merge_tiers()
+
+    def delete_document(self, document_id: int) -> bool:
+        """
+        Deletes the given document from the index. Returns False if the document isn't in the
+        index, or if it has already been deleted.
+        """
+        i = bisect_right([s.first for s in self.__segments], document_id) - 1
+        if i < 0 or document_id > self.__segments[i].last:
+            return False
+        segment = self.__segments[i]
+        if not segment.index.has_document(document_id) or not segment.delete(document_id):
+            return False
+        self.__generation += 1
+        return True
+
+    def merge(self) -> None:
+        """
+        Forces all segments to be merged into a single segment, purging all deleted documents.
+        """
+        self.__mutable = None
+        if len(self.__segments) > 1 or any(s.deleted for s in self.__segments):
+            self.__merge(0, len(self.__segments))
+
+    def get_segment_count(self) -> int:
+        """
+        Returns the number of segments that the index currently consists of.
+        """
+        return len(self.__segments)
+
+    def __tier(self, segment: _Segment) -> int:
+        live = max(1, segment.size - segment.deleted)
+        return max(0, int(math.log(live / self._segment_size, self._merge_factor) + 1e-9))
+
+    def __merge_tiers(self) -> None:
+        # Look for a window of adjacent sealed segments that all belong to the same tier, merge them,
+        # and repeat until there are none.
+        sealed = len(self.__segments) - (1 if self.__mutable else 0)
+        i = 0
+        while i + self._merge_factor <= sealed:
+            tiers = {self.__tier(s) for s in self.__segments[i:i + self._merge_factor]}
+            if len(tiers) == 1:
+                self.__merge(i, i + self._merge_factor)
+                sealed -= self._merge_factor - 1
+                i = 0
+            else:
+                i += 1
+
+    def __merge(self, start: int, end: int) -> None:
+        segments = self.__segments[start:end]
+        firsts = [s.first for s in segments]
+
+        def deleted(document_id: int) -> bool:
+            return segments[bisect_right(firsts, document_id) - 1].is_deleted(document_id)
+
+        segment = _Segment(InMemoryInvertedIndex.merge([s.index for s in segments], deleted))
+        self.__segments[start:end] = [segment] if segment.size else []
+        self.__generation += 1
+
+    def get_terms(self, buffer: str) -> Iterator[str]:
+        tokens = self.__tokenizer.strings(self.__normalizer.canonicalize(buffer))
+        return (self.__normalizer.normalize(t) for t in tokens)
+
+    def get_term_ranges(self, buffer: str) -> Tuple[str, List[Tuple[str, Tuple[int, int]]]]:
+        buffer = self.__normalizer.canonicalize(buffer)
+        return (buffer, [(self.__normalizer.normalize(t), r) for (t, r) in self.__tokenizer.tokens(buffer)])
+
+    def get_indexed_terms(self) -> Iterator[str]:
+        """
+        Yields all the terms in the index. The terms are emitted back in arbitrary order.
+        """
+        seen = set()
+        for segment in self.__segments:
+            for term in segment.index.get_indexed_terms():
+                if term not in seen:
+                    seen.add(term)
+                    yield term
+
+    def get_postings_iterator(self, term: str) -> Iterator[Posting]:
+        return self.SegmentedPostingsIterator(self.__segments, term)
+
+    def get_document_frequency(self, term: str) -> int:
+        return sum(s.index.get_document_frequency(term) for s in self.__segments)
+
+    def get_maximum_term_frequency(self, term: str) -> Optional[int]:
+        return max((s.index.get_maximum_term_frequency(term) for s in self.__segments), default=0)
+
+    def get_document_length(self, document_id: int, field: Optional[str] = None) -> Optional[int]:
+        i = bisect_right([s.first for s in self.__segments], document_id) - 1
+        return self.__segments[i].index.get_document_length(document_id, field) if i >= 0 else 0
+
+    def get_average_document_length(self, field: Optional[str] = None) -> Optional[float]:
+        total = sum(s.size for s in self.__segments)
+        lengths = sum(s.index.get_average_document_length(field) * s.size for s in self.__segments)
+        return lengths / total if total else 0.0
+
+    def get_generation(self) -> int:
+        return self.__generation
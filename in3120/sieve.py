@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import heapq
-from typing import Iterator, Any, Union, Tuple
+from typing import Iterator, Any, Optional, Union, Tuple
 
 # Not strictly needed, but left for clarity. PEP 484 explcitly specifies that
 # "when an argument is annotated as having type float, an argument of type int
@@ -29,6 +29,12 @@ class Sieve:
         self.__size = size
         self.__heap = []
 
+    def size(self) -> int:
+        """
+        Returns the maximum number of items that the sieve retains.
+        """
+        return self.__size
+
     def sift(self, score: Number, item: Any) -> None:
         """
         Sifts a scored item through the sieve.
@@ -40,6 +46,16 @@ class Sieve:
             if root_score < score:
                 heapq.heapreplace(self.__heap, (score, item))
 
+    def threshold(self) -> Optional[Number]:
+        """
+        Returns the score that a candidate item needs to exceed in order to make it
+        through the sieve, i.e., "the worst of the best". Returns None if the sieve is
+        not yet full, in which case any candidate makes the cut.
+        """
+        if len(self.__heap) < self.__size:
+            return None
+        return self.__heap[0][0]
+
     def winners(self) -> Iterator[Tuple[Number, Any]]:
         """
         Returns the highest-scoring items that have been sifted through the sieve, sorted
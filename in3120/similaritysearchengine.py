@@ -1,13 +1,15 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from typing import Iterator, Iterable, Dict, Any
+from typing import Iterator, Iterable, Dict, Any, Optional
 import faiss
 import spacy
 import numpy as np
 from .corpus import Corpus
 from .normalizer import Normalizer
 from .tokenizer import Tokenizer
+from .querycache import QueryCache
+from .tracer import Tracer
 
 
 class SimilaritySearchEngine:
@@ -36,7 +38,8 @@ class SimilaritySearchEngine:
     # Shared across instances, initialized on demand below.
     __nlp : spacy.Language = None
 
-    def __init__(self, corpus: Corpus, fields: Iterable[str], normalizer: Normalizer, tokenizer: Tokenizer):
+    def __init__(self, corpus: Corpus, fields: Iterable[str], normalizer: Normalizer, tokenizer: Tokenizer,
+                 cache: Optional[QueryCache] = None, tracer: Optional[Tracer] = None):
 
         # FAISS barfs on an empty corpus.
         assert len(corpus or []) > 0
@@ -45,6 +48,8 @@ class SimilaritySearchEngine:
         self.__corpus = corpus
         self.__normalizer = normalizer
         self.__tokenizer = tokenizer
+        self.__cache = cache  # If set, where we look for the results of previously evaluated queries.
+        self.__tracer = tracer or Tracer()  # Keeps track of where the time goes, if anyone cares.
 
         # The machinery for generating embedding vectors from text buffers. Assume English.
         if SimilaritySearchEngine.__nlp is None:
@@ -117,23 +122,56 @@ class SimilaritySearchEngine:
         The client can supply a dictionary of options that controls the query evaluation
         process: The maximum number of documents to return to the client is controlled via
         the "hit_count" (int) option.
+
+        If the engine has a cache, the results are looked up there first.
+
+        If the engine has a tracer, the query is traced with the stages "normalize", "embed", "traverse"
+        and "materialize".
+        """
+        tracer = self.__tracer
+        with tracer.trace("SimilaritySearchEngine", query):
+
+            # Empty query?
+            with tracer.span("normalize"):
+                query = self.__normalize(query or "")
+            if not query:
+                return
+
+            # Have we seen this query before?
+            key = QueryCache.make_key([query], options, self) if self.__cache is not None else None
+            cache = self.__cache if key is not None else None
+            results = cache.get(key) if cache is not None else None
+            if cache is not None:
+                tracer.count("cache_hits" if results is not None else "cache_misses")
+            if results is None:
+                results = self.__evaluate(query, options)
+                if cache is not None or tracer.is_recording():
+                    results = list(results)
+                if cache is not None:
+                    cache.put(key, results)
+
+        yield from results
+
+    def __evaluate(self, query: str, options: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Evaluates the given normalized query. See evaluate/2.
         """
-        # Empty query?
-        query = self.__normalize(query or "")
-        if not query:
-            return
+        tracer = self.__tracer
 
         # Place the normalized query string in embedding space. Normalize the embedding.
-        embedding = np.array([self.__embed(query)], dtype=np.float32, copy=False)
-        faiss.normalize_L2(embedding)
+        with tracer.span("embed"):
+            embedding = np.array([self.__embed(query)], dtype=np.float32, copy=False)
+            faiss.normalize_L2(embedding)
 
         # Lookup! See, e.g., https://github.com/facebookresearch/faiss/wiki/Faster-search for options.
-        distances, indices = self.__index.search(embedding, min(100, max(1, int(options.get("hit_count", 5)))))
+        with tracer.span("traverse"):
+            distances, indices = self.__index.search(embedding, min(100, max(1, int(options.get("hit_count", 5)))))
 
         # With METRIC_INNER_PRODUCT as our metric and normalized vectors, the emitted scores are cosine
         # similarity scores and are emitted back in descending order. With another metric where scores
         # would be distances and emitted back in ascending order, we might want to negate the scores
         # before emitting them in order to keep to the convention that "<" for scores means "ranks below".
         # See, e.g., https://github.com/facebookresearch/faiss/wiki/MetricType-and-distances for more.
-        for i in range(len(indices[0])):
-            yield {"score": distances[0][i], "document": self.__corpus[self.__mappings[indices[0][i]]]}
+        with tracer.span("materialize"):
+            for i in range(len(indices[0])):
+                yield {"score": distances[0][i], "document": self.__corpus[self.__mappings[indices[0][i]]]}
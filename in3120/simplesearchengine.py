@@ -1,12 +1,22 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import re
+import heapq
+import numpy as np
 from collections import Counter
-from typing import Iterator, Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from .sieve import Sieve
 from .ranker import Ranker
 from .corpus import Corpus
+from .posting import Posting
+from .postingcursor import PostingCursor
 from .invertedindex import InvertedIndex
+from .wildcardexpander import WildcardExpander
+from .querycache import QueryCache
+from .postinglist import InMemoryPostingList
+from .tracer import Tracer
 
 
 class SimpleSearchEngine:
@@ -28,9 +38,40 @@ class SimpleSearchEngine:
     document.
     """
 
-    def __init__(self, corpus: Corpus, inverted_index: InvertedIndex):
+    # When pruning, allow for a tiny bit of slack in the score upper bounds to be robust to rounding errors.
+    _slack = 1e-9
+
+    def __init__(self, corpus: Corpus, inverted_index: InvertedIndex, cache: Optional[QueryCache] = None,
+                 tracer: Optional[Tracer] = None):
         self.__corpus = corpus
         self.__inverted_index = inverted_index
+        self.__cache = cache  # If set, where we look for the results of previously evaluated queries.
+        self.__tracer = tracer or Tracer()  # Keeps track of where the time goes, if anyone cares.
+        self.__statistics = Counter()  # Accumulated across all evaluated queries.
+        self.__expander: Optional[WildcardExpander] = None  # Built on demand, and rebuilt if the index changes.
+        self.__expander_generation = None  # The generation of the index when the expander was built.
+
+    def __getstate__(self):
+        # What gets sent to the worker processes in evaluate_batch/4. The cache and the tracer stay behind, and
+        # the expander is cheap enough to rebuild if needed.
+        state = self.__dict__.copy()
+        state["_SimpleSearchEngine__cache"] = None
+        state["_SimpleSearchEngine__tracer"] = Tracer()
+        state["_SimpleSearchEngine__expander"] = None
+        state["_SimpleSearchEngine__expander_generation"] = None
+        return state
+
+    def get_statistics(self) -> Dict[str, int]:
+        """
+        Returns some simple counters, accumulated across all queries evaluated so far. The "queries" counter
+        is the number of evaluated queries, and the "postings" counter is the total number of postings that
+        were touched while traversing posting lists. Postings that were skipped over are not counted.
+
+        If queries are evaluated using champion lists, the "champion_hits" and "champion_misses" counters say how
+        many queries could be answered from the champion lists alone, and how many had to fall back to the full
+        posting lists.
+        """
+        return dict(self.__statistics)
 
     def evaluate(self, query: str, options: dict, ranker: Ranker) -> Iterator[Dict[str, Any]]:
         """
@@ -43,35 +84,326 @@ class SimpleSearchEngine:
         The client can supply a dictionary of options that controls the query evaluation process: The value of
         N is inferred from the query via the "match_threshold" (float) option, and the maximum number of documents
         to return to the client is controlled via the "hit_count" (int) option.
+
+        How the posting lists are traversed is controlled via the "strategy" (str) option. The default, "daat",
+        does exhaustive document-at-a-time traversal and scores every matching document. Alternatively, "wand"
+        does document-at-a-time traversal with dynamic pruning as described in the paper "Efficient Query
+        Evaluation using a Two-Level Retrieval Process" by Broder et al. Documents that cannot possibly make it
+        into the result set are then skipped without being scored. Lastly, "taat" does term-at-a-time traversal,
+        where the posting lists are processed one at a time and scores are accumulated for all documents at once
+        using NumPy. That's typically much faster for broad queries with a low match threshold. All strategies
+        produce identical results, but WAND requires that both the inverted index and the ranker can provide
+        score upper bounds, and term-at-a-time traversal requires that the ranker can score the query terms
+        independently of each other. If they can't, we fall back to exhaustive document-at-a-time traversal.
+
+        The query can contain wildcard patterns like 'aero*' or 'aero*foil', where '*' matches any sequence of
+        zero or more symbols. Each pattern is expanded into the indexed terms that match it, and a document
+        then contains the pattern if it contains any of these. I.e., the pattern counts as a single query term
+        when doing N-of-M matching, but each of the matching terms contributes to a document's score. The
+        maximum number of terms that a pattern expands into is controlled via the "expansion_limit" (int)
+        option. If more terms than that match, the ones that occur in the most documents are kept.
+
+        If the inverted index is fielded, a query term can be restricted to a field using the syntax 'field:term',
+        e.g., 'name:oslo' or 'name:aero*'. The field-qualified terms are then looked up in the index as is, and
+        whether a hit in one field should count more than a hit in another is up to the ranker.
+
+        If the "champions" (bool) option is set and the inverted index keeps track of champion lists, the query
+        is first evaluated over the query terms' champion lists only. These hold the most promising postings,
+        so if that yields enough documents to fill the result set, we're done. If not, the query is evaluated
+        again over the full posting lists. Using champion lists is faster, but the results are approximate.
+
+        If the engine has a cache, the results are looked up there first. The cache is keyed on the normalized
+        query, the options, the engine and the ranker, so it can be shared with other engines. Cached results
+        are invalidated whenever the inverted index changes.
+
+        If the engine has a tracer, the query is traced with the stages "normalize", "expand", "fetch", "traverse",
+        "sieve" and "materialize". With document-at-a-time traversal the documents are scored and sifted as we go
+        along, so that time is included in the "traverse" stage. The "postings" and "candidates" counters say how
+        many postings were touched and how many documents were scored.
+        """
+        tracer = self.__tracer
+        with tracer.trace("SimpleSearchEngine", query):
+
+            # Produce the query terms. We must use the same string processing here as we used when
+            # building up the inverted index. Some terms might be duplicated (e.g., as in the query
+            # "to be or not to be"). Wildcard patterns are kept as they are for now.
+            with tracer.span("normalize"):
+                items = self.__normalize_query(query)
+
+            # Have we seen this query before? If we're debugging we want to see what's going on, so evaluate anyway.
+            cache = self.__cache if not options.get("debug", False) else None
+            key = QueryCache.make_key(items, options, self, ranker) if cache is not None else None
+            cache = cache if key is not None else None
+            generation = self.__inverted_index.get_generation()
+            results = cache.get(key, generation) if cache is not None else None
+            if cache is not None:
+                tracer.count("cache_hits" if results is not None else "cache_misses")
+
+            if results is None:
+
+                # If the query contains wildcard patterns, some query terms fill the same slot.
+                with tracer.span("expand"):
+                    (unique_query_terms, slots, slot_count) = self.__get_query_terms(items, options)
+
+                # Traverse the posting lists. Keep track of how much work we did.
+                (winners, statistics) = self._evaluate_terms(unique_query_terms, slots, slot_count, options, ranker)
+                self.__statistics.update(statistics, queries=1)
+
+                # Alert the client about the best-matching documents, using the supplied callback function.
+                # Emit documents sorted according to their relevancy scores. The documents are looked up as
+                # they are consumed, unless we have to hold on to the results.
+                results = ({"score": score, "document": self.__corpus[document_id]} for (score, document_id) in winners)
+                if cache is not None or tracer.is_recording():
+                    with tracer.span("materialize"):
+                        results = list(results)
+                if cache is not None:
+                    cache.put(key, results, generation)
+
+        yield from results
+
+    def evaluate_batch(self, queries: Iterable[str], options: dict, ranker_factory: Callable[[], Ranker],
+                       workers: int = 1) -> List[List[Dict[str, Any]]]:
+        """
+        Evaluates all the given queries, and returns the results for each query in the same order as the
+        queries were given. The results for a query are the same as what evaluate/3 would have yielded.
+
+        Rankers keep track of the document being scored, so each worker needs a ranker of its own. These
+        are created using the supplied factory. Identical queries, after normalization, are only evaluated
+        once. If some query terms occur in several queries, their posting lists are only decoded once and
+        are then shared between the queries.
+
+        If more than one worker is requested, the queries are distributed across that many processes, started
+        using the default start method. Each process gets a copy of the engine and the ranker factory, so these
+        have to be picklable. E.g., use functools.partial(BM25Ranker, corpus, index) rather than a lambda as the
+        factory. The engine's cache and tracer are not copied along, so the queries evaluated in the worker
+        processes are neither cached nor traced. Batches don't start traces of their own in this process either.
+        """
+        assert workers > 0
+        queries = list(queries)
+
+        # Normalize and deduplicate the queries, and expand any wildcards up front. The workers then only need
+        # to traverse the posting lists.
+        unique_queries: Dict[Tuple[str, ...], int] = {}
+        positions = [unique_queries.setdefault(tuple(self.__normalize_query(q)), len(unique_queries)) for q in queries]
+        tasks = [self.__get_query_terms(list(items), options) for items in unique_queries]
+
+        # Decode the posting lists that are shared between queries, once and for all.
+        counts = Counter(term for (unique_query_terms, _, _) in tasks for (term, _) in unique_query_terms)
+        shared = {term: self.__decode(term) for (term, count) in counts.items() if count > 1}
+
+        # Evaluate, possibly in parallel. Each worker process gets an interleaved share of the queries, and only
+        # the decoded posting lists that its share needs. Copying the engine is what's expensive, so that's done
+        # once per process. Nothing is kept in global state, so batches evaluated concurrently by different
+        # threads don't get in each other's way.
+        if workers == 1 or len(tasks) < 2:
+            outcomes = _evaluate_tasks(self, options, ranker_factory, tasks, shared)
+        else:
+            workers = min(workers, len(tasks))
+            shares = [tasks[i::workers] for i in range(workers)]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_evaluate_tasks, self, options, ranker_factory, share,
+                                           {t: shared[t] for (terms, _, _) in share for (t, _) in terms if t in shared})
+                           for share in shares]
+                outcomes = [None] * len(tasks)
+                for (i, future) in enumerate(futures):
+                    outcomes[i::workers] = future.result()
+
+        # Keep track of how much work we did, and emit the results in order.
+        self.__statistics.update(sum((statistics for (_, statistics) in outcomes), Counter()), queries=len(tasks))
+        results = [[{"score": score, "document": self.__corpus[document_id]} for (score, document_id) in winners]
+                   for (winners, _) in outcomes]
+        return [[dict(result) for result in results[i]] for i in positions]
+
+    def __decode(self, term: str) -> np.ndarray:
+        """
+        Decodes the given term's posting list into a 2D array, having one row of document identifiers and one
+        row of term frequencies.
+        """
+        cursor = self.__inverted_index.get_postings_cursor(term)
+        read_remaining = getattr(cursor, "read_remaining", None)
+        if read_remaining:
+            return np.vstack(read_remaining())
+        pairs = []
+        while cursor.next():
+            pairs.append((cursor.document_id, cursor.term_frequency))
+        return np.array(pairs, dtype=np.int64).reshape(-1, 2).T.copy()
+
+    def _evaluate_terms(self, unique_query_terms: List[Tuple[str, int]], slots: Optional[List[int]], slot_count: int,
+                        options: dict, ranker: Ranker,
+                        shared: Optional[Dict[str, np.ndarray]] = None) -> Tuple[List[Tuple[float, int]], Counter]:
+        """
+        Evaluates the query having the given unique query terms. Returns the winning (score, document
+        identifier) pairs, and some statistics, e.g., the number of postings touched. Posting lists that have
+        already been decoded, as done by evaluate_batch/4, can be supplied.
         """
         # Print verbose debug information?
         debug = options.get("debug", False)
 
-        # Produce the query terms. We must use the same string processing here as we used when
-        # building up the inverted index. Some terms might be duplicated (e.g., as in the query
-        # "to be or not to be").
-        query_terms = self.__inverted_index.get_terms(query)
-        unique_query_terms = list(Counter(query_terms).items())
-
-        # Get the posting lists for the unique query terms.
-        posting_lists = [self.__inverted_index[term] for (term, _) in unique_query_terms]
+        # Get cursors over the posting lists for the unique query terms. We move these along the posting
+        # lists as we go, rather than having a new Posting object allocated for each entry we touch.
+        shared = shared or {}
+        with self.__tracer.span("fetch"):
+            cursors = [InMemoryPostingList.InMemoryPostingListCursor(shared[term]) if term in shared
+                       else self.__inverted_index.get_postings_cursor(term) for (term, _) in unique_query_terms]
 
         # We require that at least N of the M query terms are present in the document,
         # for the document to be considered part of the result set. What should the minimum
         # value of N be?
         # TODO: Take multiplicity into account, and not just uniqueness.
         match_threshold = max(0.0, min(1.0, options.get("match_threshold", 0.5)))
-        required_minimum = max(1, min(len(unique_query_terms), int(match_threshold * len(unique_query_terms))))
-
-        # When traversing the posting lists using document-at-a-time traversal, we need to keep track
-        # of where we are in each of the posting lists. Initially, all the cursors "point to" the first entry
-        # in each posting list. Keep track of which posting lists that remain to be fully traversed.
-        all_cursors = [next(p, None) for p in posting_lists]
-        remaining_cursor_ids = [i for i in range(len(all_cursors)) if all_cursors[i]]
+        required_minimum = max(1, min(slot_count, int(match_threshold * slot_count)))
 
         # We're doing ranked retrieval. Assess relevance scores per document as we go along, as we're doing
         # document-at-a-time traversal. Keep track of the K highest-scoring documents.
-        sieve = Sieve(max(1, min(100, options.get("hit_count", 10))))
+        hit_count = max(1, min(100, options.get("hit_count", 10)))
+        strategy = options.get("strategy", "daat")
+        assert strategy in ("daat", "wand", "taat")
+
+        # Try the champion lists first, if asked to. If we find enough documents there, we're done.
+        statistics = Counter()
+        if options.get("champions", False):
+            with self.__tracer.span("fetch"):
+                champions = [self.__inverted_index.get_champion_postings_cursor(term) for (term, _) in unique_query_terms]
+            if all(cursor is not None for cursor in champions):
+                sieve = Sieve(hit_count)
+                statistics.update(postings=self.__traverse(unique_query_terms, slots, champions, required_minimum,
+                                                           sieve, ranker, strategy, debug))
+                with self.__tracer.span("sieve"):
+                    winners = list(sieve.winners())
+                if len(winners) == hit_count:
+                    statistics.update(champion_hits=1)
+                    return (winners, statistics)
+                statistics.update(champion_misses=1)
+                if debug:
+                    print("*** FALLING BACK")
+
+        # Traverse the full posting lists, sifting scored documents through the sieve as we go along.
+        sieve = Sieve(hit_count)
+        statistics.update(postings=self.__traverse(unique_query_terms, slots, cursors, required_minimum,
+                                                   sieve, ranker, strategy, debug))
+        with self.__tracer.span("sieve"):
+            winners = list(sieve.winners())
+        return (winners, statistics)
+
+    def __traverse(self, unique_query_terms: List[Tuple[str, int]], slots: Optional[List[int]], cursors: List[PostingCursor],
+                   required_minimum: int, sieve: Sieve, ranker: Ranker, strategy: str, debug: bool) -> int:
+        """
+        Traverses the given posting lists using the given strategy, and sifts matching documents through the
+        given sieve. Returns the number of postings touched.
+        """
+        with self.__tracer.span("traverse"):
+            upper_bounds = self.__get_upper_bounds(unique_query_terms, ranker) if strategy == "wand" else None
+            if strategy == "taat" and self.__has_term_scores(unique_query_terms, ranker):
+                (postings, candidates) = self.__evaluate_taat(unique_query_terms, slots, cursors, required_minimum,
+                                                              sieve, ranker, debug)
+            elif upper_bounds is not None:
+                (postings, candidates) = self.__evaluate_wand(unique_query_terms, slots, cursors, upper_bounds,
+                                                              ranker.get_static_upper_bound(), required_minimum,
+                                                              sieve, ranker, debug)
+            else:
+                (postings, candidates) = self.__evaluate_daat(unique_query_terms, slots, cursors, required_minimum,
+                                                              sieve, ranker, debug)
+        self.__tracer.count("postings", postings)
+        self.__tracer.count("candidates", candidates)
+        if debug:
+            print("*** DONE")
+            print("postings =", postings)
+        return postings
+
+    def __normalize_query(self, query: str) -> List[str]:
+        """
+        Produces the normalized query terms and wildcard patterns, in order of appearance. If the index is
+        fielded, query terms and patterns of the form 'field:term' are qualified by the field.
+        """
+        # Tokenize once. The query syntax is found between the tokens, so look there afterwards if needed.
+        (buffer, tokens) = self.__inverted_index.get_term_ranges(query)
+        fields = self.__inverted_index.get_indexed_fields()
+        if "*" not in buffer and not (fields and ":" in buffer):
+            return [term for (term, _) in tokens]
+
+        # Go through the query chunk by chunk, where chunks are separated by whitespace. A chunk is qualified
+        # by a field if its first token is the field's name, followed by a colon.
+        items = []
+        i = 0
+        for chunk in re.finditer(r"\S+", buffer):
+            (begin, end) = chunk.span()
+            j = i
+            while j < len(tokens) and tokens[j][1][0] < end:
+                j += 1
+            (chunk_tokens, i) = (tokens[i:j], j)
+            field = None
+            if chunk_tokens and chunk_tokens[0][1][0] == begin and buffer[chunk_tokens[0][1][1]:].startswith(":"):
+                (first, last) = chunk_tokens[0][1]
+                if buffer[first:last] in fields:
+                    (field, begin, chunk_tokens) = (buffer[first:last], last + 1, chunk_tokens[1:])
+
+            # The wildcards survive as they are, glued to the adjacent terms. Terms separated by something else
+            # are kept apart, e.g., 'new-yo*' becomes 'new' and 'yo*' rather than 'newyo*'. A wildcard next to
+            # such a separator sticks to the term on its side of it.
+            if "*" in buffer[begin:end]:
+                terms = [""]
+                for (term, (first, last)) in chunk_tokens + [("", (end, end))]:
+                    gap = buffer[begin:first]
+                    if gap.strip("*"):
+                        terms[-1] += "*" * (len(gap) - len(gap.lstrip("*")))
+                        terms.append("*" * (len(gap) - len(gap.rstrip("*"))))
+                    else:
+                        terms[-1] += gap
+                    terms[-1] += term
+                    begin = last
+                terms = [t for t in terms if t.strip("*")] or [t for t in terms if t]
+            else:
+                terms = [term for (term, _) in chunk_tokens]
+            items.extend(term if field is None else self.__inverted_index.qualify(field, term) for term in terms)
+        return items
+
+    def __get_query_terms(self, items: List[str], options: dict) -> Tuple[List[Tuple[str, int]], Optional[List[int]], int]:
+        """
+        Produces the unique query terms as (term, multiplicity) pairs. Wildcard patterns are expanded into
+        the terms that match them, and these then share a slot. Returns the query terms, which slot each
+        query term belongs to, and the number of slots. If there are no wildcard patterns, then each query
+        term fills a slot of its own, and None is returned instead of the slot assignments.
+        """
+        if not any("*" in item for item in items):
+            unique_query_terms = list(Counter(items).items())
+            return (unique_query_terms, None, len(unique_query_terms))
+
+        # Build the expander on demand. The vocabulary might have changed since we last built it.
+        if self.__expander is None or self.__expander_generation != self.__inverted_index.get_generation():
+            self.__expander = WildcardExpander(self.__inverted_index)
+            self.__expander_generation = self.__inverted_index.get_generation()
+        limit = max(1, options.get("expansion_limit", 50))
+        unique_query_terms = []
+        slots = []
+        unique_items = list(Counter(items).items())
+        for (slot, (item, multiplicity)) in enumerate(unique_items):
+            for term in (self.__expander.expand(item, limit) if "*" in item else [item]):
+                unique_query_terms.append((term, multiplicity))
+                slots.append(slot)
+        return (unique_query_terms, slots, len(unique_items))
+
+    @staticmethod
+    def __count_slots(cursor_ids: List[int], slots: Optional[List[int]]) -> int:
+        """
+        Returns how many distinct slots the given query terms fill.
+        """
+        return len(cursor_ids) if slots is None else len({slots[i] for i in cursor_ids})
+
+    def __evaluate_daat(self, unique_query_terms: List[Tuple[str, int]], slots: Optional[List[int]],
+                        all_cursors: List[PostingCursor], required_minimum: int, sieve: Sieve, ranker: Ranker, debug: bool) -> Tuple[int, int]:
+        """
+        Does exhaustive document-at-a-time traversal of the given posting lists, and sifts every
+        matching document through the given sieve. Returns the number of postings touched, and the
+        number of documents scored.
+        """
+        # When traversing the posting lists using document-at-a-time traversal, we need to keep track
+        # of where we are in each of the posting lists. Initially, all the cursors "point to" the first entry
+        # in each posting list. Keep track of which posting lists that remain to be fully traversed, using
+        # a min-heap of (document identifier, cursor identifier) pairs.
+        remaining_cursor_ids = [(cursor.document_id, i) for (i, cursor) in enumerate(all_cursors) if cursor.next()]
+        heapq.heapify(remaining_cursor_ids)
+        postings = len(remaining_cursor_ids)
+        candidates = 0
 
         # We're doing at least N-of-M matching. As we reach the end of the posting lists, we can abort when
         # the number of non-exhausted lists drops below the required minimum N.
@@ -80,33 +412,220 @@ class SimpleSearchEngine:
             # The posting lists are sorted by the document identifiers in ascending order. Define the
             # "frontier" as the subset of non-exhausted posting lists that mention the lowest document
             # identifier. In a sense, if we imagine scanning the posting lists from left to right, the
-            # frontier is the subset that has the "leftmost" cursors.
-            # TODO: This can easily be done in a single pass over the remaining lists.
-            document_id = min(all_cursors[i].document_id for i in remaining_cursor_ids)
-            frontier_cursor_ids = [i for i in remaining_cursor_ids if all_cursors[i].document_id == document_id]
+            # frontier is the subset that has the "leftmost" cursors. These are at the top of the heap,
+            # and they pop off in the order of their cursor identifiers. Each pop is O(log M), so for a query
+            # with M unique terms we avoid the O(M) scans per step.
+            document_id = remaining_cursor_ids[0][0]
+            frontier_cursor_ids = []
+            while remaining_cursor_ids and remaining_cursor_ids[0][0] == document_id:
+                frontier_cursor_ids.append(heapq.heappop(remaining_cursor_ids)[1])
 
             # The number of elements on the "frontier" needs to be at least N. Otherwise, these documents
             # don't contain enough of the query terms, and aren't part of the result set.
-            if len(frontier_cursor_ids) >= required_minimum:
-                ranker.reset(document_id)
-                for i in frontier_cursor_ids:
-                    ranker.update(unique_query_terms[i][0], unique_query_terms[i][1], all_cursors[i])
-                score = ranker.evaluate()
-                sieve.sift(score, document_id)
-                if debug:
-                    print("*** MATCH")
-                    print("document =", self.__corpus[document_id])
-                    print("matches  =", {unique_query_terms[i][0]: all_cursors[i] for i in frontier_cursor_ids})
-                    print("score    =", score)
+            if self.__count_slots(frontier_cursor_ids, slots) >= required_minimum:
+                self.__score(document_id, [(i, all_cursors[i]) for i in frontier_cursor_ids],
+                             unique_query_terms, sieve, ranker, debug)
+                candidates += 1
 
             # Move along the cursors on the frontier. The cursors not on the frontier remain where they
             # are. We may or may not reach the end of some posting lists when we advance, so the set of
             # remaining non-exhausted lists might shrink.
             for i in frontier_cursor_ids:
-                all_cursors[i] = next(posting_lists[i], None)
-            remaining_cursor_ids = [i for i in range(len(all_cursors)) if all_cursors[i]]
+                if all_cursors[i].next():
+                    heapq.heappush(remaining_cursor_ids, (all_cursors[i].document_id, i))
+                    postings += 1
+
+        return (postings, candidates)
+
+    def __evaluate_wand(self, unique_query_terms: List[Tuple[str, int]], slots: Optional[List[int]],
+                        all_cursors: List[PostingCursor], upper_bounds: List[float], static_upper_bound: float,
+                        required_minimum: int, sieve: Sieve, ranker: Ranker, debug: bool) -> Tuple[int, int]:
+        """
+        Does document-at-a-time traversal of the given posting lists using the WAND algorithm, and
+        sifts the matching documents that might make it into the result set through the given sieve.
+        Returns the number of postings touched, and the number of documents scored.
+
+        The sieve's threshold tells us what score a document needs to beat, and the supplied upper
+        bounds tell us how much each query term can at most contribute to a document's score. If we
+        order the cursors by their current document identifiers, we can locate the "pivot", i.e., the
+        first cursor where the accumulated upper bounds exceed the threshold and where at least N cursors
+        have been passed. No document before the pivot's document can contain enough of the query terms to
+        be either a match or a winner, so all cursors can safely skip ahead to the pivot's document.
+        """
+        # Keep only the cursors whose posting lists remain to be fully traversed, as (cursor, i) pairs where
+        # i identifies the query term.
+        cursors = [(cursor, i) for (i, cursor) in enumerate(all_cursors) if cursor.next()]
+        postings = len(cursors)
+        candidates = 0
+
+        # We're doing at least N-of-M matching. As we reach the end of the posting lists, we can abort when
+        # the number of non-exhausted lists drops below the required minimum N.
+        while len(cursors) >= required_minimum:
+
+            # Locate the pivot. If there is no pivot then no remaining document can make it into the result
+            # set, and we're done. Allow for a tiny bit of slack in the bounds, so that rounding errors
+            # don't make us prune documents that the exhaustive evaluation would have kept.
+            cursors.sort(key=lambda c: c[0].document_id)
+            threshold = sieve.threshold()
+            bound = static_upper_bound
+            pivot = None
+            covered = set()
+            for (j, (_, i)) in enumerate(cursors):
+                bound += upper_bounds[i]
+                if slots is not None:
+                    covered.add(slots[i])
+                if (j + 1 if slots is None else len(covered)) >= required_minimum and (threshold is None or bound + self._slack * (1.0 + abs(bound)) > threshold):
+                    pivot = j
+                    break
+            if pivot is None:
+                break
+            document_id = cursors[pivot][0].document_id
+
+            # If the cursors up to and including the pivot all point to the pivot's document, then that
+            # document has enough of the query terms to be considered a match. Score it, and move along.
+            # Otherwise, skip the lagging cursors ahead to the pivot's document. These might be able to
+            # jump over large parts of their posting lists without decoding them.
+            if cursors[0][0].document_id == document_id:
+                frontier = sorted((c for c in cursors if c[0].document_id == document_id), key=lambda c: c[1])
+                self.__score(document_id, [(i, posting) for (posting, i) in frontier],
+                             unique_query_terms, sieve, ranker, debug)
+                candidates += 1
+                for (cursor, _) in frontier:
+                    if cursor.next():
+                        postings += 1
+            else:
+                for (cursor, _) in cursors[:pivot]:
+                    if cursor.document_id < document_id and cursor.advance_to(document_id):
+                        postings += 1
+            cursors = [c for c in cursors if c[0].document_id is not None]
+
+        return (postings, candidates)
+
+    def __evaluate_taat(self, unique_query_terms: List[Tuple[str, int]], slots: Optional[List[int]],
+                        cursors: List[PostingCursor], required_minimum: int, sieve: Sieve, ranker: Ranker, debug: bool) -> Tuple[int, int]:
+        """
+        Does term-at-a-time traversal of the given posting lists, and sifts the documents that might
+        make it into the result set through the given sieve. Returns the number of postings touched,
+        and the number of documents scored.
+
+        Each posting list is decoded into NumPy arrays in one go, and its contributions are added to a
+        dense array of score accumulators, one per document. A parallel array counts how many of the query
+        terms each document contains. The ranker is never invoked per document. Instead, it tells us how
+        much each (term, term frequency) pair contributes to the score, and it turns the accumulated scores
+        into final scores for all matching documents at once.
+
+        The scores are added up in the same order as document-at-a-time traversal would have fed them to the
+        ranker, and in double precision. The scores are therefore identical, down to the last bit, to what
+        the ranker would have produced.
+        """
+        # Decode the posting lists. We need to know their extents before allocating the accumulators. If
+        # the cursor can hand us the posting list's columns directly, there's no need to step through them.
+        decoded = []
+        for cursor in cursors:
+            read_remaining = getattr(cursor, "read_remaining", None)
+            if read_remaining:
+                decoded.append(read_remaining())
+                continue
+            document_ids = []
+            term_frequencies = []
+            while cursor.next():
+                document_ids.append(cursor.document_id)
+                term_frequencies.append(cursor.term_frequency)
+            decoded.append((np.array(document_ids, dtype=np.int64), np.array(term_frequencies, dtype=np.int64)))
+        postings = sum(len(document_ids) for (document_ids, _) in decoded)
+        size = 1 + max((int(document_ids[-1]) for (document_ids, _) in decoded if len(document_ids)), default=-1)
+
+        # Accumulate, one query term at a time. The term frequencies are small integers with lots of
+        # repetition, so look up the score contributions once per distinct term frequency. Within a
+        # single posting list the document identifiers are unique, so plain fancy indexing does the job.
+        scores = np.zeros(size, dtype=np.float64)
+        hits = np.zeros(size, dtype=np.uint8 if len(unique_query_terms) < 256 else np.int32)
+        for (i, (document_ids, term_frequencies)) in enumerate(decoded):
+            if len(document_ids) == 0:
+                continue
+            (term, multiplicity) = unique_query_terms[i]
+            (distinct, inverse) = np.unique(term_frequencies, return_inverse=True)
+            contributions = np.array([ranker.get_term_score(term, multiplicity, int(f)) for f in distinct])
+            scores[document_ids] += contributions[inverse]
+
+        # Count how many slots each document fills. Query terms that share a slot can overlap.
+        groups = {}
+        for (i, (document_ids, _)) in enumerate(decoded):
+            groups.setdefault(i if slots is None else slots[i], []).append(document_ids)
+        for members in groups.values():
+            hits[members[0] if len(members) == 1 else np.unique(np.concatenate(members))] += 1
+
+        # Which documents contain enough of the query terms? Compute their final scores.
+        matches = np.flatnonzero(hits >= required_minimum)
+        candidates = len(matches)
+        final_scores = ranker.evaluate_many(matches, scores[matches])
+
+        # Only the top K scores can make it into the result set. Locate the K-th largest score, and
+        # sift every document that ties or beats it through the sieve. Sifting in the order of the document
+        # identifiers makes ties resolve exactly as with document-at-a-time traversal.
+        k = sieve.size()
+        if len(matches) > k:
+            cutoff = final_scores[np.argpartition(final_scores, len(matches) - k)[len(matches) - k]]
+            survivors = final_scores >= cutoff
+            matches = matches[survivors]
+            final_scores = final_scores[survivors]
+        for (document_id, score) in zip(matches.tolist(), final_scores.tolist()):
+            sieve.sift(score, document_id)
+            if debug:
+                print("*** MATCH")
+                print("document =", self.__corpus[document_id])
+                print("score    =", score)
+
+        return (postings, candidates)
+
+    def __has_term_scores(self, unique_query_terms: List[Tuple[str, int]], ranker: Ranker) -> bool:
+        """
+        Checks if the ranker can tell us how much each of the unique query terms contributes to a
+        document's score. Terms that don't occur in the index never contribute anything.
+        """
+        return all(ranker.get_term_score(term, multiplicity, 1) is not None
+                   for (term, multiplicity) in unique_query_terms
+                   if self.__inverted_index.get_document_frequency(term) > 0)
+
+    def __get_upper_bounds(self, unique_query_terms: List[Tuple[str, int]], ranker: Ranker) -> Optional[List[float]]:
+        """
+        Computes how much each of the unique query terms can at most contribute to a document's score.
+        Returns None if either the inverted index or the ranker can't help us compute such bounds.
+        """
+        upper_bounds = []
+        for (term, multiplicity) in unique_query_terms:
+            maximum_term_frequency = self.__inverted_index.get_maximum_term_frequency(term)
+            if maximum_term_frequency is None:
+                return None
+            upper_bound = ranker.get_upper_bound(term, multiplicity, maximum_term_frequency)
+            if upper_bound is None:
+                return None
+            upper_bounds.append(upper_bound)
+        return upper_bounds
+
+    def __score(self, document_id: int, matches: List[Tuple[int, Posting]], unique_query_terms: List[Tuple[str, int]],
+                sieve: Sieve, ranker: Ranker, debug: bool) -> None:
+        """
+        Scores the given document using the supplied ranker, and sifts it through the sieve. The
+        matches are (i, posting) pairs, where i identifies the query term. The ranker is updated
+        in the order given by the matches.
+        """
+        ranker.reset(document_id)
+        for (i, posting) in matches:
+            ranker.update(unique_query_terms[i][0], unique_query_terms[i][1], posting)
+        score = ranker.evaluate()
+        sieve.sift(score, document_id)
+        if debug:
+            print("*** MATCH")
+            print("document =", self.__corpus[document_id])
+            print("matches  =", {unique_query_terms[i][0]: posting for (i, posting) in matches})
+            print("score    =", score)
+
 
-        # Alert the client about the best-matching documents, using the supplied callback function.
-        # Emit documents sorted according to their relevancy scores.
-        for (score, document_id) in sieve.winners():
-            yield {"score": score, "document": self.__corpus[document_id]}
+def _evaluate_tasks(engine: SimpleSearchEngine, options: dict, ranker_factory: Callable[[], Ranker],
+                    tasks: List[Tuple[List[Tuple[str, int]], Optional[List[int]], int]],
+                    shared: Dict[str, np.ndarray]) -> List[Tuple[List[Tuple[float, int]], Counter]]:
+    # Evaluates some of the queries in a batch, possibly in a worker process. The ranker is reused across the
+    # queries. The shared posting lists have already been decoded.
+    ranker = ranker_factory()
+    return [engine._evaluate_terms(*task, options, ranker, shared) for task in tasks]
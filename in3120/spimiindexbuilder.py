@@ -0,0 +1,134 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import heapq
+import itertools
+import os
+import struct
+import tempfile
+from array import array
+from collections import Counter
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Tuple
+from .corpus import Corpus
+from .normalizer import Normalizer
+from .tokenizer import Tokenizer
+from .posting import Posting
+from .mappedinvertedindex import MappedInvertedIndex
+
+
+class SpimiIndexBuilder:
+    """
+    Builds an inverted index using single-pass in-memory indexing (SPIMI), so that we can index
+    corpora that are much larger than what fits in memory. See Section 4.3 in the textbook at
+    https://nlp.stanford.edu/IR-book/pdf/irbookonlinereading.pdf.
+
+    The documents are processed one at a time, and postings are accumulated in memory until an
+    approximate memory budget is exhausted. The accumulated postings are then sorted by term and
+    spilled to a temporary "run" file, and we start afresh. Finally, the runs are combined using a
+    heap-based k-way merge and streamed into an index file that can be opened as a MappedInvertedIndex.
+
+    Peak memory is governed by the budget during the first phase, and by the number of runs during
+    the merge, where only one term's postings per run need to be held in memory at a time.
+    """
+
+    # Rough estimates of what things cost in memory, in bytes. A posting is two array entries, while
+    # a new term costs a dictionary slot, a string object and two array objects.
+    _posting_cost = 8
+    _term_cost = 300
+
+    # The layout of a run record header: The length of the encoded term, and the number of postings.
+    _header = struct.Struct("<II")
+
+    def __init__(self, fields: Iterable[str], normalizer: Normalizer, tokenizer: Tokenizer,
+                 memory_budget: int = 64 * 1024 * 1024):
+        assert memory_budget > 0
+        self.__fields = list(fields)
+        self.__normalizer = normalizer
+        self.__tokenizer = tokenizer
+        self.__memory_budget = memory_budget
+
+    def build(self, corpus: Corpus, filename: str) -> int:
+        """
+        Indexes the given corpus and writes the index to the named file. The documents are processed
+        in the order that the corpus yields them, and this order must match their document identifiers.
+        Returns the number of runs that were spilled to disk along the way.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            runs = []
+            postings: Dict[str, Tuple[array, array]] = {}
+            cost = 0
+            previous_document_id = -1
+            for document in corpus:
+                assert document.document_id > previous_document_id, "Documents must be sorted"
+                previous_document_id = document.document_id
+                all_terms = itertools.chain.from_iterable(self.__get_terms(document.get_field(f, "")) for f in self.__fields)
+                for (term, term_frequency) in Counter(all_terms).items():
+                    if term not in postings:
+                        postings[term] = (array("I"), array("I"))
+                        cost += self._term_cost
+                    postings[term][0].append(document.document_id)
+                    postings[term][1].append(term_frequency)
+                    cost += self._posting_cost
+
+                # Memory budget exhausted? Spill a run to disk, and start over.
+                if cost >= self.__memory_budget:
+                    runs.append(self.__spill(postings, os.path.join(directory, f"run{len(runs)}")))
+                    postings = {}
+                    cost = 0
+            if postings:
+                runs.append(self.__spill(postings, os.path.join(directory, f"run{len(runs)}")))
+
+            # Merge the runs into the final index.
+            files = [open(run, mode="rb") for run in runs]
+            try:
+                MappedInvertedIndex.write(filename, self.__merge(files))
+            finally:
+                for file in files:
+                    file.close()
+            return len(runs)
+
+    def __get_terms(self, buffer: str) -> Iterator[str]:
+        # Mirrors what an inverted index does, so that queries are processed the same way.
+        tokens = self.__tokenizer.strings(self.__normalizer.canonicalize(buffer))
+        return (self.__normalizer.normalize(t) for t in tokens)
+
+    def __spill(self, postings: Dict[str, Tuple[array, array]], filename: str) -> str:
+        """
+        Writes the given postings to a run file, sorted by term. The terms are sorted according to
+        their UTF-8 encodings, same as in the final index.
+        """
+        with open(filename, mode="wb") as file:
+            for (term, (document_ids, term_frequencies)) in sorted((t.encode("utf-8"), p) for (t, p) in postings.items()):
+                file.write(self._header.pack(len(term), len(document_ids)))
+                file.write(term)
+                document_ids.tofile(file)
+                term_frequencies.tofile(file)
+        return filename
+
+    def __read(self, file: BinaryIO, run: int) -> Iterator[Tuple[bytes, int, array, array]]:
+        """
+        Reads back a run file, one record at a time. The run's sequence number is included in the
+        yielded tuples, so that records for the same term are merged in the order the runs were made.
+        """
+        while True:
+            header = file.read(self._header.size)
+            if not header:
+                break
+            (length, count) = self._header.unpack(header)
+            term = file.read(length)
+            document_ids = array("I")
+            document_ids.fromfile(file, count)
+            term_frequencies = array("I")
+            term_frequencies.fromfile(file, count)
+            yield term, run, document_ids, term_frequencies
+
+    def __merge(self, files: List[BinaryIO]) -> Iterator[Tuple[str, Iterator[Posting]]]:
+        """
+        Does a k-way merge of the given run files, and yields each term together with its complete
+        posting list. The runs cover consecutive ranges of documents, so concatenating a term's postings
+        in run order keeps them sorted by document identifier.
+        """
+        records = heapq.merge(*(self.__read(file, run) for (run, file) in enumerate(files)))
+        for (term, group) in itertools.groupby(records, key=lambda record: record[0]):
+            postings = (Posting(d, f) for (_, _, ds, fs) in group for (d, f) in zip(ds, fs))
+            yield term.decode("utf-8"), postings
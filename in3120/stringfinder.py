@@ -1,9 +1,10 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from typing import Iterator, Dict, Any, List, Tuple
+from typing import Iterator, Dict, Any, List, Optional, Tuple
 from .tokenizer import Tokenizer
 from .trie import Trie
+from .tracer import Tracer
 
 
 class StringFinder:
@@ -20,9 +21,10 @@ class StringFinder:
     when adding strings to the trie.
     """
 
-    def __init__(self, trie: Trie, tokenizer: Tokenizer):
+    def __init__(self, trie: Trie, tokenizer: Tokenizer, tracer: Optional[Tracer] = None):
         self.__trie = trie
         self.__tokenizer = tokenizer
+        self.__tracer = tracer or Tracer()  # Keeps track of where the time goes, if anyone cares.
 
     def scan(self, buffer: str) -> Iterator[Dict[str, Any]]:
         """
@@ -35,6 +37,21 @@ class StringFinder:
         In a serious application we'd add more lookup/evaluation features, e.g., support for prefix matching,
         support for leftmost-longest matching (instead of reporting all matches), and support for lemmatization
         or similar linguistic variations.
+
+        If the finder has a tracer, the scan is traced with the stage "traverse". The "trie_nodes" counter says
+        how many times a state was advanced in the trie, and the "candidates" counter says how many matches
+        were found.
+        """
+        with self.__tracer.trace("StringFinder", buffer):
+            matches = self.__scan(buffer)
+            if self.__tracer.is_recording():
+                with self.__tracer.span("traverse"):
+                    matches = list(matches)
+        yield from matches
+
+    def __scan(self, buffer: str) -> Iterator[Dict[str, Any]]:
+        """
+        Scans the given buffer. See scan/1.
         """
         # The set of currently explored states. We represent a state as a node in the trie (that
         # represents where in the trie we are after having consumed zero or more characters) plus
@@ -47,6 +64,10 @@ class StringFinder:
         # order.
         previous_end = -1
 
+        # Keep track of how much work we did.
+        candidates = 0
+        steps = 0
+
         # Only consider matches that start on token boundaries.
         for (string, (begin, end)) in self.__tokenizer.tokens(buffer):
 
@@ -55,16 +76,22 @@ class StringFinder:
             is_connected, previous_end = (previous_end > 0) and (begin == previous_end), end
             if not is_connected:
                 live_states = [(s.consume(" "), b) for (s, b) in live_states]
+                steps += len(live_states)
 
             # Consider this token a potential start for a match. Advance all
             # currently live states. Then prune, since consuming more characters has
             # probably killed off some states.
             live_states.append((self.__trie, begin))
             live_states = [(s.consume(string), b) for (s, b) in live_states if s]
+            steps += len(live_states)
             live_states = [(s, b) for (s, b) in live_states if s]
 
             # Report matches, if any, that end on the token we just consumed. Use the
             # tokenizer to somewhat normalize the matches we emit.
             for match_begin in (b for (s, b) in live_states if s.is_final()):
+                candidates += 1
                 yield {"match": " ".join(self.__tokenizer.strings(buffer[match_begin:end])),
                        "range": (match_begin, end)}
+
+        self.__tracer.count("trie_nodes", steps)
+        self.__tracer.count("candidates", candidates)
@@ -4,11 +4,13 @@
 import itertools
 import sys
 from bisect import bisect_left
-from typing import Any, Dict, Iterator, Iterable, Tuple, List
+from typing import Any, Dict, Iterator, Iterable, Optional, Tuple, List
 from collections import Counter
 from .corpus import Corpus
 from .normalizer import Normalizer
 from .tokenizer import Tokenizer
+from .querycache import QueryCache
+from .tracer import Tracer
 
 
 class SuffixArray:
@@ -20,8 +22,11 @@ class SuffixArray:
     to memory usage, and add more lookup/evaluation features.
     """
 
-    def __init__(self, corpus: Corpus, fields: Iterable[str], normalizer: Normalizer, tokenizer: Tokenizer):
+    def __init__(self, corpus: Corpus, fields: Iterable[str], normalizer: Normalizer, tokenizer: Tokenizer,
+                 cache: Optional[QueryCache] = None, tracer: Optional[Tracer] = None):
         self.__corpus = corpus
+        self.__cache = cache  # If set, where we look for the results of previously evaluated queries.
+        self.__tracer = tracer or Tracer()  # Keeps track of where the time goes, if anyone cares.
         self.__normalizer = normalizer
         self.__tokenizer = tokenizer
         self.__haystack: List[Tuple[int, str]] = []  # The (<document identifier>, <searchable content>) pairs.
@@ -108,13 +113,46 @@ class SuffixArray:
 
         The results yielded back to the client are dictionaries having the keys "score" (int) and
         "document" (Document).
+
+        If the suffix array has a cache, the results are looked up there first.
+
+        If the suffix array has a tracer, the query is traced with the stages "normalize", "traverse", "score"
+        and "materialize". The "candidates" counter says how many occurrences of the query were found.
+        """
+        tracer = self.__tracer
+        with tracer.trace("SuffixArray", query):
+
+            # Search for the needle in the haystack, using binary search. Define that the empty query matches
+            # nothing, not everything.
+            with tracer.span("normalize"):
+                needle = self.__normalize(query)
+            if not needle:
+                return
+
+            # Have we seen this query before? If we're debugging we want to see what's going on, so evaluate anyway.
+            debug = options.get("debug", False)
+            cache = self.__cache if not debug else None
+            key = QueryCache.make_key([needle], options, self) if cache is not None else None
+            cache = cache if key is not None else None
+            results = cache.get(key) if cache is not None else None
+            if cache is not None:
+                tracer.count("cache_hits" if results is not None else "cache_misses")
+            if results is None:
+                results = self.__evaluate(needle, options, debug)
+                if cache is not None or tracer.is_recording():
+                    results = list(results)
+                if cache is not None:
+                    cache.put(key, results)
+
+        yield from results
+
+    def __evaluate(self, needle: str, options: dict, debug: bool) -> Iterator[Dict[str, Any]]:
+        """
+        Evaluates the given normalized query. See evaluate/2.
         """
-        # Search for the needle in the haystack, using binary search. Define that the empty query matches
-        # nothing, not everything.
-        needle = self.__normalize(query)
-        if not needle:
-            return
-        where_start = self.__binary_search(needle)
+        tracer = self.__tracer
+        with tracer.span("traverse"):
+            where_start = self.__binary_search(needle)
 
         # Helper predicate. Checks if the identified suffix starts with the needle. Since slicing implies copying,
         # cap the length of the slice to the length of the needle. The starts-with relation then becomes the same
@@ -127,16 +165,19 @@ class SuffixArray:
         # we no longer get a match. We expect a low number of matches for typical queries, and we process all the
         # matches below anyway. If we just wanted to count the number of matches without processing them, we
         # could instead of a linear scan do another binary search to locate where the range ends.
-        matches = itertools.takewhile(_is_match, range(where_start, len(self.__suffixes)))
+        with tracer.span("traverse"):
+            matches = itertools.takewhile(_is_match, range(where_start, len(self.__suffixes)))
+            pairs = [self.__suffixes[i] for i in matches]
+        tracer.count("candidates", len(pairs))
+        if debug:
+            for pair in pairs:
+                print("*** MATCH", pair, self.__get_suffix2(pair))
 
         # Deduplicate. A document in the haystack might contain multiple occurrences of the needle.
         # Rank according to occurrence count, and emit in ranked order.
-        if matches:
-            debug = options.get("debug", False)
-            pairs = [self.__suffixes[i] for i in matches]
-            if debug:
-                for pair in pairs:
-                    print("*** MATCH", pair, self.__get_suffix2(pair))
+        with tracer.span("score"):
             counter = Counter([i for (i, _) in pairs])
-            for (index, count) in counter.most_common(max(1, min(100, options.get("hit_count", 10)))):
+            winners = counter.most_common(max(1, min(100, options.get("hit_count", 10))))
+        with tracer.span("materialize"):
+            for (index, count) in winners:
                 yield {"score": count, "document": self.__corpus[self.__haystack[index][0]]}
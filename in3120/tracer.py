@@ -0,0 +1,125 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterator, TextIO
+
+
+class Tracer:
+    """
+    Keeps track of where the time goes when queries are evaluated. Engines that accept a tracer wrap the
+    evaluation of each query in a trace, and the stages of the evaluation (e.g., "normalize", "fetch",
+    "traverse", "score", "sieve" and "materialize") in spans within the trace. Engines can also bump
+    counters on the trace, e.g., the number of postings they touched. Spans can nest, in which case the
+    time spent in the inner span is also included in the outer span's time.
+
+    This base class doesn't keep track of anything, and is what the engines use if no tracer is supplied.
+    Tracing then adds next to nothing to the cost of evaluating a query. Engines only trace per query and
+    per stage, never per posting or per document, so that this holds also when tracing is enabled.
+
+    Engines that yield their results lazily would otherwise have the trace include whatever the client
+    does between the results. If the tracer is recording, such engines therefore collect their results
+    before yielding them. If not, they stay lazy.
+    """
+
+    # Reusable, and does nothing.
+    _nothing = nullcontext()
+
+    def is_recording(self) -> bool:
+        """
+        Returns True if the tracer keeps track of the traces, i.e., if it matters where the time goes.
+        """
+        return False
+
+    def trace(self, engine: str, query: str) -> ContextManager:
+        """
+        Returns a context manager that wraps the evaluation of the given query by the named engine. If a
+        trace is already in progress, e.g., because one engine uses another, the spans and counters of the
+        inner trace are added to the outer one.
+        """
+        return self._nothing
+
+    def span(self, stage: str) -> ContextManager:
+        """
+        Returns a context manager that wraps the named stage of the query evaluation that is currently being
+        traced. If the same stage occurs several times within a trace, the time spent is summed up.
+        """
+        return self._nothing
+
+    def count(self, counter: str, value: int = 1) -> None:
+        """
+        Adds the given value to the named counter of the query evaluation that is currently being traced.
+        """
+        pass
+
+
+class RecordingTracer(Tracer):
+    """
+    A tracer that records each trace, and hands the finished traces over to an exporter, e.g., a
+    JsonLinesExporter. A trace is a dictionary having the keys "engine" (str), "query" (str), "start"
+    (float, seconds since the epoch), "duration" (float, seconds), "spans" (Dict[str, float], seconds
+    per stage) and "counters" (Dict[str, int]).
+
+    Traces are kept track of per thread, so the tracer can be shared between the threads of, e.g., a
+    threaded web server.
+    """
+
+    def __init__(self, exporter: Callable[[Dict[str, Any]], None], clock: Callable[[], float] = time.perf_counter):
+        self.__exporter = exporter  # Receives the finished traces.
+        self.__clock = clock  # Tells the time, in seconds, for measuring durations.
+        self.__local = threading.local()  # The trace in progress, per thread.
+
+    def is_recording(self) -> bool:
+        return True
+
+    @contextmanager
+    def trace(self, engine: str, query: str) -> Iterator[None]:
+        if getattr(self.__local, "trace", None) is not None:
+            yield
+            return
+        trace = {"engine": engine, "query": query, "start": time.time(), "duration": 0.0, "spans": {}, "counters": {}}
+        self.__local.trace = trace
+        start = self.__clock()
+        try:
+            yield
+        finally:
+            trace["duration"] = self.__clock() - start
+            self.__local.trace = None
+            self.__exporter(trace)
+
+    def span(self, stage: str) -> ContextManager:
+        trace = getattr(self.__local, "trace", None)
+        return self._nothing if trace is None else self.__span(trace["spans"], stage)
+
+    @contextmanager
+    def __span(self, spans: Dict[str, float], stage: str) -> Iterator[None]:
+        start = self.__clock()
+        try:
+            yield
+        finally:
+            spans[stage] = spans.get(stage, 0.0) + (self.__clock() - start)
+
+    def count(self, counter: str, value: int = 1) -> None:
+        trace = getattr(self.__local, "trace", None)
+        if trace is not None:
+            counters = trace["counters"]
+            counters[counter] = counters.get(counter, 0) + value
+
+
+class JsonLinesExporter:
+    """
+    Writes traces to a text stream, one JSON object per line. Safe to share between threads.
+    """
+
+    def __init__(self, stream: TextIO):
+        self.__stream = stream
+        self.__lock = threading.Lock()
+
+    def __call__(self, trace: Dict[str, Any]) -> None:
+        line = json.dumps(trace, ensure_ascii=False, default=str)
+        with self.__lock:
+            self.__stream.write(line + "\n")
+            self.__stream.flush()
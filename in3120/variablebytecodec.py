@@ -1,16 +1,24 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import numpy as np
 from struct import pack
-from typing import Tuple
+from typing import Iterable, Optional, Tuple
 
 
 class VariableByteCodec:
     """
     A simple encoder/decoder for variable-byte encoding. See Figure 5.8 in
     https://nlp.stanford.edu/IR-book/pdf/05comp.pdf for details.
+
+    Besides the per-number API, there is a bulk API that encodes or decodes many numbers
+    at once. The bulk API is vectorized using NumPy, and is much faster when there are many
+    numbers to process. The two APIs produce and consume identical byte streams.
     """
 
+    # A 64-bit number needs at most this many 7-bit groups.
+    _max_length = 10
+
     @staticmethod
     def encode(number: int, destination: bytearray) -> int:
         """
@@ -50,3 +58,84 @@ class VariableByteCodec:
             else:
                 number = 128 * number + (byte - 128)
                 return (number, where - start)
+
+    @staticmethod
+    def encode_many(numbers: Iterable[int]) -> bytes:
+        """
+        Encodes the given numbers, and returns the concatenation of their encodings. Equivalent
+        to, but much faster than, invoking encode/2 for each number.
+        """
+        numbers = np.asarray(numbers if isinstance(numbers, (np.ndarray, list)) else list(numbers), dtype=np.int64)
+        assert numbers.ndim == 1
+        assert not numbers.size or numbers.min() >= 0
+        numbers = numbers.astype(np.uint64)
+
+        # Split the numbers into 7-bit groups, most significant first. No need to consider more groups
+        # than the largest number needs.
+        width = 1
+        while width < VariableByteCodec._max_length and int(numbers.max(initial=0)) >= (1 << (7 * width)):
+            width += 1
+        shifts = np.arange(7 * (width - 1), -1, -7, dtype=np.uint64)
+        groups = ((numbers[:, None] >> shifts[None, :]) & np.uint64(127)).astype(np.uint8)
+
+        # The least significant group comes last and has its high bit set. How many groups does each
+        # number need? Keep only those, in row-major order.
+        groups[:, -1] += 128
+        lengths = 1 + (numbers[:, None] >= (np.uint64(1) << shifts[:-1])[None, :]).sum(axis=1)
+        return groups[np.arange(width)[None, :] >= (width - lengths)[:, None]].tobytes()
+
+    @staticmethod
+    def decode_many(source: bytearray, count: Optional[int] = None, start: int = 0) -> Tuple[np.ndarray, int]:
+        """
+        Starting at the given position in the source buffer, decodes the given number of numbers,
+        or all remaining numbers if no count is given. Returns a pair comprised of the decoded numbers
+        as a NumPy array, and the number of bytes read from the source buffer. Equivalent to, but much
+        faster than, invoking decode/2 repeatedly.
+        """
+        (groups, starts, _, used) = VariableByteCodec.__decode_groups(source, count, start)
+        if not used:
+            return np.zeros(0, dtype=np.int64), 0
+        return np.add.reduceat(groups, starts).astype(np.int64), used
+
+    @staticmethod
+    def decode_gaps(source: bytearray, count: Optional[int] = None, start: int = 0, base: int = 0) -> Tuple[np.ndarray, int]:
+        """
+        As decode_many/3, but treats the decoded numbers as gaps, i.e., as the differences between
+        consecutive numbers in an ascending sequence that starts at the given base. Returns the
+        reconstructed sequence, and the number of bytes read from the source buffer.
+        """
+        # No need to sum the groups per number first: A running sum over all the groups passes through
+        # each number in the sequence at the end of the number's encoding.
+        (groups, _, ends, used) = VariableByteCodec.__decode_groups(source, count, start)
+        if not used:
+            return np.zeros(0, dtype=np.int64), 0
+        return np.cumsum(groups)[ends].astype(np.int64) + base, used
+
+    @staticmethod
+    def __decode_groups(source: bytearray, count: Optional[int],
+                        start: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+        # Returns the 7-bit groups shifted into place, where each number's groups start and end, and the
+        # number of bytes read from the source buffer.
+        assert source is not None
+        assert start >= 0
+        assert start == 0 or source[start - 1] >= 128
+        assert count is None or count >= 0
+        data = np.frombuffer(source, dtype=np.uint8, offset=start)
+        if count is not None:
+            data = data[:count * VariableByteCodec._max_length]
+
+        # The last byte of each encoding has its high bit set.
+        ends = np.flatnonzero(data >= 128)
+        if count is not None:
+            if len(ends) < count:
+                raise IndexError("Not enough numbers in buffer")
+            ends = ends[:count]
+        if not len(ends):
+            return np.zeros(0, dtype=np.uint64), ends, ends, 0
+        used = int(ends[-1]) + 1
+        data = data[:used]
+
+        # Shift each 7-bit group into place according to its distance from the end of its encoding.
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        shifts = (np.repeat(ends, ends - starts + 1) - np.arange(used)) * 7
+        return (data & 127).astype(np.uint64) << shifts.astype(np.uint64), starts, ends, used
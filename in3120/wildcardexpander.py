@@ -0,0 +1,130 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import heapq
+import itertools
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterator, List
+from .invertedindex import InvertedIndex
+
+
+class WildcardExpander:
+    """
+    Expands wildcard patterns like 'aero*', '*foil' or 'aero*foil' into the indexed terms that match them,
+    using a permuterm index over the vocabulary. See Section 3.2.1 in https://nlp.stanford.edu/IR-book/pdf/03dict.pdf
+    for details.
+
+    For each term we conceptually index all rotations of the term with an end marker appended, e.g.,
+    'ab$', 'b$a' and '$ab' for the term 'ab'. The pattern 'X*Y' then matches exactly those terms having a
+    rotation that starts with 'Y$X', and these rotations are adjacent in sorted order. So we can locate
+    them via binary search. Patterns with more than one wildcard are handled by looking up the outermost parts
+    and then filtering. Plain prefix patterns need no special treatment, since the pattern 'X*' is looked up
+    as '$X'.
+
+    Only the most frequent matching terms are of interest, and a short pattern might match a large part of
+    the vocabulary. So we don't go through all the matching rotations, but keep a segment tree over them that
+    tells which rotation in a given range belongs to the most frequent term. The matches are then streamed
+    in order of decreasing document frequency, and the cost of expanding a pattern is logarithmic in the size
+    of the vocabulary per term produced, or rejected by the filtering.
+
+    The rotations aren't stored as strings. Instead, we store (term, offset) pairs sorted by the rotation
+    they represent, and produce the rotations on the fly while searching.
+
+    If the index is fielded, the field-qualified terms only match patterns that are qualified by a field
+    themselves. E.g., '*port' doesn't match 'name:airport', but 'name:*port' does.
+    """
+
+    # Marks the end of a term. Sorts before everything else, and can't occur in a term.
+    _marker = "\0"
+
+    def __init__(self, inverted_index: InvertedIndex):
+        self.__terms = sorted(inverted_index.get_indexed_terms())
+        self.__prefixes = tuple(inverted_index.qualify(f, "") for f in inverted_index.get_indexed_fields())
+        assert all(self._marker not in term for term in self.__terms)
+        self.__document_frequencies = array("I", (inverted_index.get_document_frequency(t) for t in self.__terms))
+        rotations = sorted((self.__rotate(i, offset), i, offset)
+                           for (i, term) in enumerate(self.__terms) for offset in range(len(term) + 1))
+        self.__rotation_terms = array("I", (i for (_, i, _) in rotations))
+        self.__rotation_offsets = array("I", (offset for (_, _, offset) in rotations))
+
+        # Rank the rotations by their terms' document frequencies, breaking ties alphabetically. The leaves
+        # of the segment tree are the rotations, and each inner node holds the best rotation below it.
+        count = len(self.__terms)
+        frequencies = self.__document_frequencies
+        self.__ranks = array("q", (frequencies[i] * count + (count - 1 - i) for i in self.__rotation_terms))
+        size = len(self.__rotation_terms)
+        self.__tree = array("I", bytes(4 * size)) + array("I", range(size))
+        for node in range(size - 1, 0, -1):
+            (left, right) = (self.__tree[2 * node], self.__tree[2 * node + 1])
+            self.__tree[node] = left if self.__ranks[left] >= self.__ranks[right] else right
+
+    def __rotate(self, i: int, offset: int) -> str:
+        # Returns the given rotation of the i-th term, with the marker appended before rotating.
+        term = self.__terms[i] + self._marker
+        return term[offset:] + term[:offset]
+
+    def __rotation(self, j: int) -> str:
+        # Returns the j-th rotation, in sorted order.
+        return self.__rotate(self.__rotation_terms[j], self.__rotation_offsets[j])
+
+    def __best(self, start: int, end: int) -> int:
+        # Returns the rotation in the given range whose term ranks the highest. The range can't be empty.
+        (ranks, tree) = (self.__ranks, self.__tree)
+        best = -1
+        (start, end) = (start + len(ranks), end + len(ranks))
+        while start < end:
+            if start & 1:
+                if best < 0 or ranks[tree[start]] > ranks[best]:
+                    best = tree[start]
+                start += 1
+            if end & 1:
+                end -= 1
+                if best < 0 or ranks[tree[end]] > ranks[best]:
+                    best = tree[end]
+            (start, end) = (start // 2, end // 2)
+        return best
+
+    def __stream(self, start: int, end: int) -> Iterator[int]:
+        # Yields the terms having rotations in the given range, highest ranking first. Pick the best rotation,
+        # and split the rest of the range around it.
+        ranges = [(-self.__ranks[best], best, start, end) for best in [self.__best(start, end)] if start < end]
+        while ranges:
+            (_, best, start, end) = heapq.heappop(ranges)
+            yield self.__rotation_terms[best]
+            for (first, last) in ((start, best), (best + 1, end)):
+                if first < last:
+                    j = self.__best(first, last)
+                    heapq.heappush(ranges, (-self.__ranks[j], j, first, last))
+
+    def expand(self, pattern: str, limit: int = 50) -> List[str]:
+        """
+        Returns the indexed terms that match the given pattern, where '*' matches any sequence of zero
+        or more symbols. The pattern is assumed to be normalized the same way as the indexed terms. If
+        more than the given number of terms match, the ones that occur in the most documents are kept.
+        The terms are returned sorted by their document frequencies, most frequent first.
+        """
+        assert limit > 0
+        if "*" not in pattern:
+            i = bisect_left(self.__terms, pattern)
+            return [pattern] if i < len(self.__terms) and self.__terms[i] == pattern else []
+
+        # Locate all rotations that start with the outermost parts of the pattern.
+        parts = pattern.split("*")
+        key = parts[-1] + self._marker + parts[0]
+        start = bisect_left(range(len(self.__rotation_terms)), key, key=self.__rotation)
+        end = bisect_right(range(len(self.__rotation_terms)), key, start, key=lambda j: self.__rotation(j)[:len(key)])
+        matches = self.__stream(start, end)
+
+        # Any inner parts have to be checked separately.
+        if len(parts) > 2:
+            regex = re.compile(".*".join(re.escape(part) for part in parts), re.DOTALL)
+            matches = (i for i in matches if regex.fullmatch(self.__terms[i]))
+
+        # Unqualified patterns only match unqualified terms.
+        if self.__prefixes and not pattern.startswith(self.__prefixes):
+            matches = (i for i in matches if not self.__terms[i].startswith(self.__prefixes))
+
+        # Keep only the most frequent terms. These come first.
+        return [self.__terms[i] for i in itertools.islice(matches, limit)]
@@ -41,7 +41,13 @@ def assignment_x_suite() -> unittest.TestSuite:
                              "TestInMemoryInvertedIndexWithCompression", "TestExpressionComposer",
                              "TestShallowCaseExtractor", "TestDocumentPipeline", "TestSimpleRanker",
                              "TestSoundexNormalizer", "TestPorterNormalizer",
-                             "TestSimilaritySearchEngine", "TestEditTable", "TestEditSearchEngine"])
+                             "TestSimilaritySearchEngine", "TestEditTable", "TestEditSearchEngine",
+                             "TestMappedInvertedIndex", "TestBM25Ranker",
+                             "TestSpimiIndexBuilder", "TestSegmentedInvertedIndex",
+                             "TestPhraseSearchEngine", "TestPostingCodec", "TestPostingCursor",
+                             "TestFrontCodedDictionary", "TestPerfectHashDictionary",
+                             "TestWildcardExpander", "TestQueryCache", "TestImpactSearchEngine",
+                             "TestTracer"])
 
 
 def main():
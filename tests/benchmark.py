@@ -0,0 +1,125 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import numpy as np
+from timeit import default_timer as timer
+from typing import Dict, List
+from context import in3120
+
+
+# Define a small helper so that we get a full absolute path to the named file.
+def data_path(filename: str) -> str:
+    here = os.path.dirname(__file__)
+    data = os.path.join(here, "..", "data")
+    full = os.path.abspath(os.path.join(data, filename))
+    return full
+
+
+# Compares the posting list codecs on the given corpus. For each codec we report the total size of
+# the compressed posting lists, and how fast we can traverse all of them. The latter includes the
+# overhead of creating the Posting objects, so we also report how fast the codec alone can decode the
+# document identifier gaps.
+def benchmark_codecs(filename: str, fields: List[str]) -> None:
+    print(f"Indexing {filename} ...")
+    corpus = in3120.InMemoryCorpus(data_path(filename))
+    normalizer = in3120.SimpleNormalizer()
+    tokenizer = in3120.SimpleTokenizer()
+    reference = in3120.InMemoryInvertedIndex(corpus, fields, normalizer, tokenizer)
+    postings = {term: list(reference[term]) for term in reference.get_indexed_terms()}
+    total = sum(len(p) for p in postings.values())
+    print(f"{len(postings)} terms, {total} postings")
+    results: Dict[str, List[float]] = {}
+    for name in ["default"] + in3120.PostingCodec.get_names():
+        posting_lists = []
+        for term_postings in postings.values():
+            posting_list = in3120.CompressedInMemoryPostingList(False, None if name == "default" else name)
+            for posting in term_postings:
+                posting_list.append_posting(posting)
+            posting_list.finalize_postings()
+            posting_lists.append(posting_list)
+        size = sum(p.get_byte_size() for p in posting_lists)
+        start = timer()
+        for posting_list in posting_lists:
+            for _ in posting_list:
+                pass
+        end = timer()
+        results[name] = [size, 8 * size / total, total / (end - start) / 1e6]
+    blocks = [np.diff([p.document_id for p in term_postings[i:i + 128]], prepend=0)
+              for term_postings in postings.values() for i in range(0, len(term_postings), 128)]
+    for name in in3120.PostingCodec.get_names():
+        codec = in3120.PostingCodec.create(name)
+        encoded = [(codec.encode(block), len(block)) for block in blocks]
+        start = timer()
+        for (data, count) in encoded:
+            codec.decode(data, count)
+        end = timer()
+        results[name].append(total / (end - start) / 1e6)
+    print(f"{'codec':<12}{'bytes':>12}{'bits/posting':>14}{'Mpostings/s':>13}{'Mgaps/s':>10}")
+    for (name, row) in results.items():
+        print(f"{name:<12}{row[0]:>12}{row[1]:>14.2f}{row[2]:>13.2f}" + (f"{row[3]:>10.2f}" if len(row) > 3 else ""))
+
+
+# Compares traversing the default variable-byte encoded posting lists via cursors, with and without decoding
+# whole blocks in bulk. We traverse the posting lists having at least a block of postings, and also look up
+# every 10th document in each of them. Shorter lists are mostly decoded one integer at a time anyway. Then
+# compares the fused delta decoding of a block's gaps to decoding the gaps and summing them up.
+def benchmark_cursors(filename: str, fields: List[str]) -> None:
+    print(f"Indexing {filename} ...")
+    corpus = in3120.InMemoryCorpus(data_path(filename))
+    normalizer = in3120.SimpleNormalizer()
+    tokenizer = in3120.SimpleTokenizer()
+    index = in3120.InMemoryInvertedIndex(corpus, fields, normalizer, tokenizer, True)
+    terms = [term for term in index.get_indexed_terms() if index.get_document_frequency(term) >= 128]
+    targets = {term: [p.document_id for p in index[term]][::10] for term in terms}
+    cursor_type = in3120.CompressedInMemoryPostingList.CompressedInMemoryPostingListCursor
+    threshold = cursor_type._bulk_threshold
+    results: Dict[str, List[float]] = {}
+    for (name, bulk_threshold) in [("per-integer", sys.maxsize), ("bulk", threshold)]:
+        cursor_type._bulk_threshold = bulk_threshold
+        start = timer()
+        for term in terms:
+            cursor = index.get_postings_cursor(term)
+            while cursor.next():
+                pass
+        middle = timer()
+        for term in terms:
+            cursor = index.get_postings_cursor(term)
+            for target in targets[term]:
+                cursor.advance_to(target)
+        end = timer()
+        results[name] = [middle - start, end - middle]
+    cursor_type._bulk_threshold = threshold
+    print(f"{'cursor':<12}{'next (s)':>12}{'advance_to (s)':>16}")
+    for (name, row) in results.items():
+        print(f"{name:<12}{row[0]:>12.3f}{row[1]:>16.3f}")
+    blocks = [in3120.VariableByteCodec.encode_many(np.random.default_rng(i).integers(1, 1000, 128)) for i in range(1000)]
+    start = timer()
+    for block in blocks:
+        np.cumsum(in3120.VariableByteCodec.decode_many(block)[0])
+    middle = timer()
+    for block in blocks:
+        in3120.VariableByteCodec.decode_gaps(block)
+    end = timer()
+    print(f"decode_many + cumsum: {middle - start:.3f}s, decode_gaps: {end - middle:.3f}s")
+
+
+def main():
+    corpora = {
+        "cran": ("cran.xml", ["body"]),
+        "mesh": ("mesh.txt", ["body"]),
+        "en": ("en.txt", ["body"]),
+    }
+    targets = sys.argv[1:]
+    if not targets:
+        print(f"{sys.argv[0]} [{'|'.join(key for key in corpora.keys())}]")
+    else:
+        for target in (target.lower() for target in targets):
+            if target in corpora:
+                benchmark_codecs(*corpora[target])
+                benchmark_cursors(*corpora[target])
+
+
+if __name__ == "__main__":
+    main()
@@ -150,7 +150,7 @@ def repl_b_4():
     normalizer = in3120.SimpleNormalizer()
     tokenizer = in3120.SimpleTokenizer()
     corpus = in3120.InMemoryCorpus(data_path("pantheon.tsv"))
-    engine = in3120.SuffixArray(corpus, ["name"], normalizer, tokenizer)
+    engine = in3120.SuffixArray(corpus, ["name"], normalizer, tokenizer, in3120.QueryCache(1000, 3600))
     options = {"debug": False, "hit_count": 5}
     print("Enter a prefix phrase query and find matching people.")
     print(f"Lookup options are {options}.")
@@ -20,6 +20,7 @@ class TestBetterRanker(unittest.TestCase):
         corpus.add_document(in3120.InMemoryDocument(6, {"title": "the baz"}))
         corpus.add_document(in3120.InMemoryDocument(7, {"title": "the baz baz"}))
         index = in3120.InMemoryInvertedIndex(corpus, ["title"], normalizer, tokenizer)
+        self.__corpus = corpus
         self.__ranker = in3120.BetterRanker(corpus, index)
 
     def test_term_frequency(self):
@@ -63,6 +64,36 @@ class TestBetterRanker(unittest.TestCase):
         self.assertGreater(score2, 0.0)
         self.assertGreater(score1, score2)
 
+    def test_scoring_touches_no_documents(self):
+        class NoLookupsCorpus(in3120.InMemoryCorpus):
+            def get_document(self, document_id: int) -> in3120.Document:
+                raise AssertionError("Unexpected document lookup")
+
+        corpus = NoLookupsCorpus()
+        for document in self.__corpus:
+            corpus.add_document(document)
+        ranker = in3120.BetterRanker(corpus, in3120.InMemoryInvertedIndex(corpus, ["title"],
+                                                                           in3120.SimpleNormalizer(),
+                                                                           in3120.SimpleTokenizer()))
+        for ranker_ in (ranker, self.__ranker):
+            ranker_.reset(2)
+            ranker_.update("foo", 1, in3120.Posting(2, 2))
+            ranker_.update("the", 2, in3120.Posting(2, 1))
+        self.assertEqual(ranker.evaluate(), self.__ranker.evaluate())
+
+    def test_invalidation(self):
+        self.__ranker.reset(0)
+        self.__ranker.update("foo", 1, in3120.Posting(0, 1))
+        score1 = self.__ranker.evaluate()
+        self.__corpus.add_document(in3120.InMemoryDocument(8, {"title": "the xyzzy", "static_quality_score": 0.5}))
+        self.__ranker.reset(0)
+        self.__ranker.update("foo", 1, in3120.Posting(0, 1))
+        score2 = self.__ranker.evaluate()
+        self.assertGreater(score2, score1)  # More documents, so larger IDF.
+        self.assertEqual(self.__ranker.get_static_upper_bound(), 0.9)
+        self.__ranker.reset(8)
+        self.assertEqual(self.__ranker.evaluate(), 0.5)
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
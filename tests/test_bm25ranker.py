@@ -0,0 +1,126 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import unittest
+from context import in3120
+
+
+class TestBM25Ranker(unittest.TestCase):
+
+    def setUp(self):
+        self.__normalizer = in3120.SimpleNormalizer()
+        self.__tokenizer = in3120.SimpleTokenizer()
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"title": "foo", "body": "the foo"}))
+        corpus.add_document(in3120.InMemoryDocument(1, {"title": "bar", "body": "the foo and some more words"}))
+        corpus.add_document(in3120.InMemoryDocument(2, {"title": "foo bar baz", "body": "the foo foo"}))
+        corpus.add_document(in3120.InMemoryDocument(3, {"title": "bar", "body": "the bar"}))
+        corpus.add_document(in3120.InMemoryDocument(4, {"title": "baz", "body": "the baz"}))
+        self.__corpus = corpus
+        self.__index = in3120.InMemoryInvertedIndex(corpus, ["title", "body"], self.__normalizer, self.__tokenizer)
+
+    def __score(self, ranker, document_id, term, term_frequency, multiplicity=1):
+        ranker.reset(document_id)
+        ranker.update(term, multiplicity, in3120.Posting(document_id, term_frequency))
+        return ranker.evaluate()
+
+    def test_document_length(self):
+        ranker = in3120.BM25Ranker(self.__corpus, self.__index)
+        self.assertGreater(self.__score(ranker, 0, "foo", 2), self.__score(ranker, 1, "foo", 2))
+
+    def test_no_length_normalization(self):
+        ranker = in3120.BM25Ranker(self.__corpus, self.__index, b=0.0)
+        self.assertEqual(self.__score(ranker, 0, "foo", 2), self.__score(ranker, 1, "foo", 2))
+
+    def test_term_frequency_saturates(self):
+        ranker = in3120.BM25Ranker(self.__corpus, self.__index)
+        scores = [self.__score(ranker, 0, "foo", tf) for tf in range(1, 100)]
+        for i in range(1, len(scores)):
+            self.assertGreater(scores[i], scores[i - 1])
+        self.assertLess(scores[-1], 2.2 * self.__score(ranker, 0, "foo", 1))
+
+    def test_inverse_document_frequency(self):
+        ranker = in3120.BM25Ranker(self.__corpus, self.__index)
+        self.assertGreater(self.__score(ranker, 4, "baz", 1), self.__score(ranker, 4, "the", 1))
+        self.assertGreater(self.__score(ranker, 4, "the", 1), 0.0)
+
+    def test_multiplicity(self):
+        ranker = in3120.BM25Ranker(self.__corpus, self.__index)
+        self.assertAlmostEqual(self.__score(ranker, 3, "bar", 1, 2), 2.0 * self.__score(ranker, 3, "bar", 1), 8)
+
+    def test_upper_bounds(self):
+        for ranker in [in3120.BM25Ranker(self.__corpus, self.__index),
+                       in3120.BM25FRanker(self.__corpus, self.__index, {"title": 3.0, "body": 1.0})]:
+            for term in ["foo", "bar", "baz", "the"]:
+                maximum_term_frequency = self.__index.get_maximum_term_frequency(term)
+                bound = ranker.get_upper_bound(term, 1, maximum_term_frequency)
+                for posting in self.__index[term]:
+                    self.assertLessEqual(self.__score(ranker, posting.document_id, term, posting.term_frequency), bound)
+
+    def test_fielded_length_normalization(self):
+        # Document 1 has a short title but a long body. When the title dominates, that matters less.
+        ranker1 = in3120.BM25FRanker(self.__corpus, self.__index, {"title": 1.0, "body": 1.0})
+        ranker2 = in3120.BM25FRanker(self.__corpus, self.__index, {"title": 10.0, "body": 1.0})
+        self.assertGreater(self.__score(ranker2, 1, "foo", 1), self.__score(ranker1, 1, "foo", 1))
+        ranker3 = in3120.BM25FRanker(self.__corpus, self.__index, {"title": 1.0, "body": 1.0},
+                                     b={"title": 0.0, "body": 0.0})
+        self.assertEqual(self.__score(ranker3, 0, "foo", 1), self.__score(ranker3, 1, "foo", 1))
+
+    def test_fielded_term_frequencies(self):
+        index = in3120.InMemoryInvertedIndex(self.__corpus, ["title", "body"], self.__normalizer, self.__tokenizer,
+                                             fielded=True)
+        ranker1 = in3120.BM25FRanker(self.__corpus, index, {"title": 1.0, "body": 1.0})
+        ranker2 = in3120.BM25FRanker(self.__corpus, index, {"title": 5.0, "body": 1.0})
+
+        # Document 0 has 'foo' in the title, document 1 doesn't. Boosting the title makes more of a difference
+        # for document 0.
+        self.assertGreater(self.__score(ranker2, 0, "foo", 2) / self.__score(ranker1, 0, "foo", 2),
+                           self.__score(ranker2, 1, "foo", 1) / self.__score(ranker1, 1, "foo", 1))
+
+        # A field-qualified term only gets contributions from its field.
+        ranker3 = in3120.BM25FRanker(self.__corpus, index, {"title": 5.0, "body": 100.0})
+        self.assertGreater(self.__score(ranker2, 0, "title:foo", 1), 0.0)
+        self.assertGreater(self.__score(ranker2, 0, "title:foo", 1), self.__score(ranker1, 0, "title:foo", 1))
+        self.assertAlmostEqual(self.__score(ranker2, 0, "title:foo", 1), self.__score(ranker3, 0, "title:foo", 1))
+
+        # The order in which the documents are scored doesn't matter, also if some per-field term frequencies
+        # have to be looked up in the index.
+        ranker4 = in3120.BM25FRanker(self.__corpus, index, {"title": 1.0})
+        for ranker in [ranker2, ranker4]:
+            for term in ["foo", "bar", "the", "title:foo"]:
+                postings = list(index[term])
+                scores = [self.__score(ranker, p.document_id, term, p.term_frequency) for p in postings]
+                self.assertListEqual(scores[::-1], [self.__score(ranker, p.document_id, term, p.term_frequency)
+                                                    for p in reversed(postings)])
+                self.assertListEqual(scores, [self.__score(ranker, p.document_id, term, p.term_frequency)
+                                              for p in postings])
+        self.assertEqual(self.__score(ranker4, 1, "foo", 1), 0.0)
+
+        # A term qualified by a field that isn't weighted isn't qualified again, but scored as if the index
+        # weren't fielded.
+        self.assertGreater(self.__score(ranker4, 1, "body:foo", 1), 0.0)
+        self.assertGreater(self.__score(ranker4, 2, "body:foo", 2), self.__score(ranker4, 2, "body:foo", 1))
+        self.assertLessEqual(self.__score(ranker4, 2, "body:foo", 2), ranker4.get_upper_bound("body:foo", 1, 2))
+
+        # The upper bounds hold.
+        for term in ["foo", "bar", "baz", "the", "title:foo", "body:foo"]:
+            bound = ranker2.get_upper_bound(term, 1, index.get_maximum_term_frequency(term))
+            for posting in index[term]:
+                self.assertLessEqual(self.__score(ranker2, posting.document_id, term, posting.term_frequency), bound)
+
+    def test_search_engine(self):
+        corpus = in3120.InMemoryCorpus("../data/cran.xml")
+        index = in3120.InMemoryInvertedIndex(corpus, ["body"], self.__normalizer, self.__tokenizer)
+        engine = in3120.SimpleSearchEngine(corpus, index)
+        options = {"match_threshold": 0.0, "hit_count": 10}
+        for ranker in [in3120.BM25Ranker(corpus, index), in3120.BM25FRanker(corpus, index, {"body": 1.0})]:
+            for query in ["viscous flow", "the boundary layer of the wing"]:
+                matches1 = [(m["score"], m["document"].document_id) for m in engine.evaluate(query, options, ranker)]
+                matches2 = [(m["score"], m["document"].document_id)
+                            for m in engine.evaluate(query, dict(options, strategy="wand"), ranker)]
+                self.assertEqual(len(matches1), 10)
+                self.assertListEqual(matches1, matches2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -18,12 +18,94 @@ class TestCompressedInMemoryPostingList(unittest.TestCase):
     def test_append_and_iterate(self):
         self._tester1._test_append_and_iterate(in3120.CompressedInMemoryPostingList())
 
+    def test_advance_to_basics(self):
+        self._tester1._test_advance_to(in3120.CompressedInMemoryPostingList())
+
     def test_invalid_append(self):
         self._tester1._test_invalid_append(in3120.CompressedInMemoryPostingList())
 
+    def test_advance_to(self):
+        import random
+        rng = random.Random(42)
+        document_ids = sorted(rng.sample(range(1, 100000), 1000))
+        postings = in3120.CompressedInMemoryPostingList()
+        for document_id in document_ids:
+            postings.append_posting(in3120.Posting(document_id, document_id % 7 + 1))
+        postings.finalize_postings()
+        iterator = postings.get_iterator()
+        for target in sorted(rng.sample(range(0, 100100), 200)):
+            expected = next((d for d in document_ids if d >= target), None)
+            posting = iterator.advance_to(target)
+            self.assertEqual(posting.document_id if posting else None, expected)
+            if posting:
+                self.assertEqual(posting.term_frequency, expected % 7 + 1)
+                document_ids = [d for d in document_ids if d > expected]
+        self.assertIsNone(iterator.advance_to(100000))
+        self.assertIsNone(next(iterator, None))
+
+    def test_advance_to_interleaved_with_next(self):
+        postings = in3120.CompressedInMemoryPostingList()
+        for document_id in range(0, 1000, 2):
+            postings.append_posting(in3120.Posting(document_id, 1))
+        iterator = iter(postings)
+        self.assertEqual(next(iterator).document_id, 0)
+        self.assertEqual(iterator.advance_to(301).document_id, 302)
+        self.assertEqual(next(iterator).document_id, 304)
+        self.assertEqual(iterator.advance_to(0).document_id, 306)  # Never moves backwards.
+        self.assertEqual(iterator.advance_to(998).document_id, 998)
+        self.assertIsNone(next(iterator, None))
+
+    def test_bulk_decoding(self):
+        # Long enough that the blocks are decoded in bulk, and embedded in a larger buffer without block headers.
+        document_ids = list(range(5, 1000, 3))
+        postings = in3120.CompressedInMemoryPostingList()
+        for document_id in document_ids:
+            postings.append_posting(in3120.Posting(document_id, 1 + document_id % 200))
+        cursor = postings.get_cursor()
+        self.assertTrue(cursor.advance_to(500))
+        postings.append_posting(in3120.Posting(1000, 1))  # The cursor doesn't hold on to the buffer.
+        data = in3120.VariableByteCodec.encode_many([n for (d, p) in zip(document_ids + [1000], [0] + document_ids)
+                                                     for n in (d - p, 1 + d % 200 if d < 1000 else 1)])
+        buffer = b"\x00\x81" + data + b"\x02"
+        cursor = in3120.CompressedInMemoryPostingList.CompressedInMemoryPostingListCursor(buffer, 2, 2 + len(data))
+        self.assertTrue(cursor.next())
+        self.assertEqual((cursor.document_id, cursor.term_frequency), (5, 6))
+        for target in [6, 8, 9, 500, 998, 999, 1000]:
+            expected = next(d for d in document_ids + [1000] if d >= target)
+            self.assertTrue(cursor.advance_to(target))
+            self.assertEqual(cursor.document_id, expected)
+            self.assertEqual(cursor.term_frequency, 1 + expected % 200 if expected < 1000 else 1)
+        self.assertFalse(cursor.next())
+        self.assertFalse(cursor.advance_to(1001))
+
     def test_mesh_corpus(self):
         self._tester2._test_mesh_corpus(True)
 
+    def test_codecs(self):
+        for codec in in3120.PostingCodec.get_names():
+            with self.subTest(codec=codec):
+                self._tester1._test_append_and_iterate(in3120.CompressedInMemoryPostingList(False, codec))
+                self._tester1._test_advance_to(in3120.CompressedInMemoryPostingList(False, codec))
+                self._tester1._test_invalid_append(in3120.CompressedInMemoryPostingList(False, codec))
+
+    def test_codec_with_partial_blocks(self):
+        postings = in3120.CompressedInMemoryPostingList(True, "pfordelta")
+        for document_id in range(0, 300, 2):
+            positions = in3120.PositionalPosting.encode_positions(range(0, document_id, 7))
+            postings.append_posting(in3120.PositionalPosting(document_id, document_id % 5, positions))
+        self.assertEqual([p.document_id for p in postings], list(range(0, 300, 2)))
+        postings.finalize_postings()
+        postings.append_posting(in3120.PositionalPosting(301, 1, in3120.PositionalPosting.encode_positions([3])))
+        postings.finalize_postings()
+        self.assertEqual(len(postings), 151)
+        iterator = iter(postings)
+        posting = iterator.advance_to(257)
+        self.assertEqual(posting.document_id, 258)
+        self.assertEqual(posting.term_frequency, 3)
+        self.assertListEqual(list(posting.get_positions()), list(range(0, 258, 7)))
+        self.assertListEqual(list(iterator.advance_to(299).get_positions()), [3])
+        self.assertIsNone(next(iterator, None))
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
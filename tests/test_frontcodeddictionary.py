@@ -0,0 +1,98 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import unittest
+from context import in3120
+
+
+class TestFrontCodedDictionary(unittest.TestCase):
+
+    def setUp(self):
+        self._terms = ["automata", "automate", "automatic", "automation", "", "a", "ab", "b", "zebra",
+                       "blåbær", "blå", "bl", "東京", "東", "x" * 300] + [f"term{i:04d}" for i in range(100)]
+        self._vocabulary = in3120.InMemoryDictionary()
+        for term in self._terms:
+            self._vocabulary.add_if_absent(term)
+
+    def test_access_vocabulary(self):
+        vocabulary = self._vocabulary.freeze()
+        self.assertIsInstance(vocabulary, in3120.FrontCodedDictionary)
+        self.assertEqual(len(vocabulary), len(self._terms))
+        for (term_id, term) in enumerate(self._terms):
+            self.assertEqual(vocabulary.get_term_id(term), term_id)
+            self.assertEqual(vocabulary[term], term_id)
+            self.assertEqual(vocabulary.get_term(term_id), term)
+        for term in ["automat", "automations", "aa", "c", "zz", "term", "term00999", "東西", "x" * 299]:
+            self.assertNotIn(term, vocabulary)
+            self.assertIsNone(vocabulary.get_term_id(term))
+        self.assertIsNone(vocabulary.get_term(len(self._terms)))
+        self.assertIsNone(vocabulary.get_term(-1))
+
+    def test_iteration_is_sorted(self):
+        vocabulary = self._vocabulary.freeze()
+        items = list(vocabulary)
+        self.assertListEqual([term for (term, _) in items], sorted(self._terms))
+        self.assertListEqual(sorted(items), sorted(self._vocabulary))
+
+    def test_is_read_only(self):
+        vocabulary = self._vocabulary.freeze()
+        self.assertEqual(vocabulary.add_if_absent("zebra"), self._terms.index("zebra"))
+        with self.assertRaises(AssertionError):
+            vocabulary.add_if_absent("zebras")
+
+    def test_thaw(self):
+        vocabulary = self._vocabulary.freeze().thaw()
+        self.assertIsInstance(vocabulary, in3120.InMemoryDictionary)
+        self.assertListEqual(list(vocabulary), list(self._vocabulary))
+        self.assertEqual(vocabulary.add_if_absent("zebras"), len(self._terms))
+
+    def test_empty(self):
+        vocabulary = in3120.InMemoryDictionary().freeze()
+        self.assertEqual(len(vocabulary), 0)
+        self.assertIsNone(vocabulary.get_term_id("foo"))
+        self.assertListEqual(list(vocabulary), [])
+
+    def test_memory_usage(self):
+        import tracemalloc
+        corpus = in3120.InMemoryCorpus("../data/mesh.txt")
+        shingler = in3120.ShingleGenerator(3)
+        normalizer = in3120.SimpleNormalizer()
+        terms = list(dict.fromkeys(s for d in corpus for s in shingler.strings(normalizer.canonicalize(d["body"]))))
+        tracemalloc.start()
+        snapshot_before = tracemalloc.take_snapshot()
+        vocabulary = in3120.InMemoryDictionary()
+        for term in terms:
+            vocabulary.add_if_absent(term.encode("utf-8").decode("utf-8"))  # Fresh string objects.
+        snapshot_middle = tracemalloc.take_snapshot()
+        frozen = vocabulary.freeze()
+        snapshot_after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        size_dict = sum(s.size_diff for s in snapshot_middle.compare_to(snapshot_before, "filename"))
+        size_frozen = sum(s.size_diff for s in snapshot_after.compare_to(snapshot_middle, "filename"))
+        self.assertGreater(size_dict / size_frozen, 3)
+        self.assertGreater(size_dict / frozen.get_byte_size(), 3)
+        for term in terms[::97]:
+            self.assertEqual(frozen.get_term_id(term), vocabulary.get_term_id(term))
+
+    def test_inverted_index_freezes_and_thaws(self):
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"body": "a b c"}))
+        corpus.add_document(in3120.InMemoryDocument(1, {"body": "b c d"}))
+        index = in3120.InMemoryInvertedIndex(corpus, ["body"], in3120.SimpleNormalizer(), in3120.SimpleTokenizer())
+        index.freeze()
+        self.assertListEqual(sorted(index.get_indexed_terms()), ["a", "b", "c", "d"])
+        self.assertEqual(index.get_document_frequency("c"), 2)
+        index.add_document(in3120.InMemoryDocument(2, {"body": "d c"}))
+        self.assertEqual(index.get_document_frequency("c"), 3)
+        index.add_document(in3120.InMemoryDocument(3, {"body": "d e"}))
+        self.assertListEqual(sorted(index.get_indexed_terms()), ["a", "b", "c", "d", "e"])
+        self.assertListEqual([p.document_id for p in index["d"]], [1, 2, 3])
+        self.assertListEqual([p.document_id for p in index["e"]], [3])
+        index.freeze()
+        index.freeze()
+        self.assertListEqual(sorted(index.get_indexed_terms()), ["a", "b", "c", "d", "e"])
+        self.assertEqual(index.get_document_frequency("e"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,96 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import unittest
+from collections import Counter
+from context import in3120
+
+
+class TestImpactSearchEngine(unittest.TestCase):
+
+    def setUp(self):
+        self._corpus = in3120.InMemoryCorpus("../data/cran.xml")
+        self._index = in3120.InMemoryInvertedIndex(self._corpus, ["body"], in3120.SimpleNormalizer(),
+                                                   in3120.SimpleTokenizer())
+        self._engine = in3120.ImpactSearchEngine(self._corpus, self._index)
+
+    def _evaluate_by_brute_force(self, query, hit_count):
+        scores = {}
+        for (term, multiplicity) in Counter(self._index.get_terms(query)).items():
+            for (impact, document_ids) in self._index.get_impact_ordered_postings(term):
+                for document_id in document_ids.tolist():
+                    scores[document_id] = scores.get(document_id, 0) + impact * multiplicity
+        sieve = in3120.Sieve(hit_count)
+        for document_id in sorted(scores):
+            sieve.sift(float(scores[document_id]), document_id)
+        return list(sieve.winners())
+
+    def test_layout(self):
+        posting_list = in3120.ImpactOrderedPostingList([1, 3, 4, 7, 9, 12], [2, 5, 0, 2, 5, 1])
+        self.assertEqual(len(posting_list), 5)
+        self.assertEqual(posting_list.get_segment_count(), 3)
+        self.assertListEqual([(impact, list(document_ids)) for (impact, document_ids) in posting_list],
+                             [(5, [3, 9]), (2, [1, 7]), (1, [12])])
+        self.assertEqual(posting_list.get_impact(0), 5)
+        self.assertEqual(posting_list.get_impact(3), 0)
+        self.assertEqual(len(in3120.ImpactOrderedPostingList([], [])), 0)
+
+    def test_impacts(self):
+        frequent = self._index.get_impact_ordered_postings("flow")
+        rare = self._index.get_impact_ordered_postings("hypersonic")
+        self.assertEqual(len(frequent), self._index.get_document_frequency("flow"))
+        self.assertGreater(rare.get_impact(0), frequent.get_impact(0))
+        self.assertLessEqual(max(self._index.get_impact_ordered_postings(t).get_impact(0)
+                                 for t in list(self._index.get_indexed_terms())[::11]), 255)
+        self.assertEqual(len(self._index.get_impact_ordered_postings("wtf")), 0)
+
+    def test_exact(self):
+        queries = ["viscous flow", "the boundary layer of the wing", "supersonic supersonic flow", "hypersonic",
+                   "heat transfer in a slender body of revolution", "xyzzy", ""]
+        for query in queries:
+            for hit_count in [1, 10, 100]:
+                with self.subTest(query=query, hit_count=hit_count):
+                    matches = [(m["score"], m["document"].document_id)
+                               for m in self._engine.evaluate(query, {"hit_count": hit_count})]
+                    self.assertListEqual(matches, self._evaluate_by_brute_force(query, hit_count))
+
+    def test_early_termination(self):
+        query = "the boundary layer of the wing"
+        total = sum(len(self._index.get_impact_ordered_postings(t)) for t in set(self._index.get_terms(query)))
+        list(self._engine.evaluate(query, {"hit_count": 5}))
+        statistics = self._engine.get_statistics()
+        self.assertEqual(statistics["terminations"], 1)
+        self.assertLess(statistics["postings"], total)
+
+    def test_budget(self):
+        query = "the boundary layer of the wing"
+        exact = [m["document"].document_id for m in self._engine.evaluate(query, {"hit_count": 10})]
+        previous = 0
+        for budget in [0, 100, 1000, 10000]:
+            with self.subTest(budget=budget):
+                matches = [m["document"].document_id for m in self._engine.evaluate(query, {"hit_count": 10, "budget": budget})]
+                processed = self._engine.get_statistics()["postings"] - previous
+                previous += processed
+                self.assertLessEqual(len(matches), 10)
+                if budget == 0:
+                    self.assertListEqual(matches, [])
+                else:
+                    self.assertLessEqual(processed, budget)  # The last segment is cut short, if needed.
+                    if budget == 100:
+                        self.assertEqual(processed, budget)
+        self.assertListEqual(matches, exact)
+
+    def test_index_changes(self):
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"body": "a b"}))
+        corpus.add_document(in3120.InMemoryDocument(1, {"body": "b c"}))
+        index = in3120.InMemoryInvertedIndex(corpus, ["body"], in3120.SimpleNormalizer(), in3120.SimpleTokenizer())
+        engine = in3120.ImpactSearchEngine(corpus, index)
+        self.assertListEqual([m["document"].document_id for m in engine.evaluate("b", {})], [])
+        corpus.add_document(in3120.InMemoryDocument(2, {"body": "c"}))
+        index.add_document(corpus[2])
+        self.assertListEqual([m["document"].document_id for m in engine.evaluate("b", {})], [1, 0])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import unittest
-from test_inmemoryinvertedindexwithoutcompression import TestInMemoryInvertedIndexWithoutCompression
+from test_inmemoryinvertedindexwithoutcompression import TestInMemoryInvertedIndexWithoutCompression, measure_posting_lists
 from context import in3120
 
 
@@ -22,27 +22,31 @@ class TestInMemoryInvertedIndexWithCompression(unittest.TestCase):
     def test_multiple_fields(self):
         self._tester.test_multiple_fields()
 
+    def test_parallel_build(self):
+        self._tester.test_parallel_build()
+
+    def test_fielded(self):
+        self._tester.test_fielded()
+
+    def test_champion_lists(self):
+        self._tester.test_champion_lists()
+
+    def test_champion_lists_after_updates_and_merges(self):
+        self._tester.test_champion_lists_after_updates_and_merges()
+
     def test_memory_usage(self):
-        import tracemalloc
-        import inspect
-        corpus = in3120.InMemoryCorpus("../data/cran.xml")
-        tracemalloc.start()
-        snapshot_baseline = tracemalloc.take_snapshot()
-        index_uncompressed = in3120.InMemoryInvertedIndex(corpus, ["body"], self._tester._normalizer, self._tester._tokenizer, False)
-        self.assertIsNotNone(index_uncompressed)
-        snapshot_uncompressed = tracemalloc.take_snapshot()
-        index_compressed = in3120.InMemoryInvertedIndex(corpus, ["body"], self._tester._normalizer, self._tester._tokenizer, True)
-        self.assertIsNotNone(index_compressed)
-        snapshot_compressed = tracemalloc.take_snapshot()
-        tracemalloc.stop()
-        for statistic in snapshot_uncompressed.compare_to(snapshot_baseline, "filename"):
-            if statistic.traceback[0].filename == inspect.getfile(in3120.InMemoryInvertedIndex):
-                size_uncompressed = statistic.size_diff
-        for statistic in snapshot_compressed.compare_to(snapshot_uncompressed, "filename"):
-            if statistic.traceback[0].filename == inspect.getfile(in3120.InMemoryInvertedIndex):
-                size_compressed = statistic.size_diff
-        compression_ratio = size_uncompressed / size_compressed
-        self.assertGreater(compression_ratio, 14)
+        # Most posting lists are very short, so the fixed per-list costs weigh in heavily. Compared to how the
+        # postings were originally represented, we still save almost an order of magnitude.
+        (size_objects, _) = measure_posting_lists(None)
+        (size_uncompressed, _) = measure_posting_lists(in3120.InMemoryPostingList)
+        (size_compressed, posting_lists) = measure_posting_lists(in3120.CompressedInMemoryPostingList)
+        self.assertGreater(size_objects / size_compressed, 8)
+        self.assertGreater(size_uncompressed / size_compressed, 1.5)
+
+        # The postings themselves take several times less space than the 8 bytes per posting that the
+        # uncompressed columns need.
+        postings = sum(posting_list.get_length() for posting_list in posting_lists)
+        self.assertGreater(8 * postings / sum(posting_list.get_byte_size() for posting_list in posting_lists), 3)
 
 
 if __name__ == '__main__':
@@ -2,9 +2,49 @@
 # -*- coding: utf-8 -*-
 
 import unittest
+from typing import Any, List, Tuple
 from context import in3120
 
 
+class _Posting:
+    """
+    A posting as originally represented, i.e., as an object with a dictionary of attributes. The baseline
+    that the memory usage of the posting lists is measured against.
+    """
+
+    def __init__(self, document_id: int, term_frequency: int):
+        self.document_id = document_id
+        self.term_frequency = term_frequency
+
+
+def measure_posting_lists(posting_list_type) -> Tuple[int, List[Any]]:
+    """
+    Returns how much memory it takes to hold the posting lists for the Cranfield corpus, using posting lists
+    of the given type, together with the posting lists themselves. If no type is given, the posting lists are
+    plain lists of posting objects, as they originally were.
+    """
+    import tracemalloc
+    corpus = in3120.InMemoryCorpus("../data/cran.xml")
+    index = in3120.InMemoryInvertedIndex(corpus, ["body"], in3120.SimpleNormalizer(), in3120.SimpleTokenizer())
+    postings = [[(p.document_id, p.term_frequency) for p in index[term]] for term in index.get_indexed_terms()]
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    posting_lists = []
+    for term_postings in postings:
+        if posting_list_type:
+            posting_list = posting_list_type()
+            for (document_id, term_frequency) in term_postings:
+                posting_list.append_posting(in3120.Posting(document_id, term_frequency))
+            posting_list.finalize_postings()
+        else:
+            posting_list = [_Posting(document_id, term_frequency) for (document_id, term_frequency) in term_postings]
+        posting_lists.append(posting_list)
+    snapshot_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return (sum(statistic.size_diff for statistic in snapshot_after.compare_to(snapshot_before, "filename")),
+            posting_lists)
+
+
 class TestInMemoryInvertedIndexWithoutCompression(unittest.TestCase):
 
     def setUp(self):
@@ -24,6 +64,9 @@ class TestInMemoryInvertedIndexWithoutCompression(unittest.TestCase):
         self.assertEqual(index.get_document_frequency("wtf"), 0)
         self.assertEqual(index.get_document_frequency("prøve"), 1)
         self.assertEqual(index.get_document_frequency("test"), 2)
+        self.assertEqual(index.get_maximum_term_frequency("wtf"), 0)
+        self.assertEqual(index.get_maximum_term_frequency("prøve"), 1)
+        self.assertEqual(index.get_maximum_term_frequency("test"), 2)
 
     def test_mesh_corpus(self):
         corpus = in3120.InMemoryCorpus("../data/mesh.txt")
@@ -43,6 +86,124 @@ class TestInMemoryInvertedIndexWithoutCompression(unittest.TestCase):
         posting = next(index.get_postings_iterator('test'))
         self.assertEqual(posting.document_id, 0)
         self.assertEqual(posting.term_frequency, 5)
+        self.assertEqual(index.get_document_length(0, 'felt1'), 8)
+        self.assertEqual(index.get_document_length(0, 'felt3'), 2)
+        self.assertEqual(index.get_document_length(0), 10)
+        self.assertEqual(index.get_document_length(1), 0)
+        self.assertEqual(index.get_average_document_length('felt1'), 8.0)
+        self.assertEqual(index.get_average_document_length(), 10.0)
+
+    def test_parallel_build(self):
+        corpus = in3120.InMemoryCorpus("../data/cran.xml")
+        normalizer = in3120.PorterNormalizer()
+        index1 = in3120.InMemoryInvertedIndex(corpus, ["title", "body"], normalizer, self._tokenizer, self._compressed)
+        index2 = in3120.InMemoryInvertedIndex(corpus, ["title", "body"], normalizer, self._tokenizer, self._compressed, 3)
+        terms = list(index1.get_indexed_terms())
+        self.assertListEqual(terms, list(index2.get_indexed_terms()))
+        for term in terms:
+            self.assertEqual(index1.get_maximum_term_frequency(term), index2.get_maximum_term_frequency(term))
+            self.assertListEqual([(p.document_id, p.term_frequency) for p in index1[term]],
+                                 [(p.document_id, p.term_frequency) for p in index2[term]])
+        for document in corpus:
+            self.assertEqual(index1.get_document_length(document.document_id, "title"),
+                             index2.get_document_length(document.document_id, "title"))
+            self.assertEqual(index1.get_document_length(document.document_id),
+                             index2.get_document_length(document.document_id))
+
+    def test_fielded(self):
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"title": "foo", "body": "foo bar foo"}))
+        corpus.add_document(in3120.InMemoryDocument(1, {"title": "bar", "body": "baz"}))
+        index = in3120.InMemoryInvertedIndex(corpus, ["title", "body"], self._normalizer, self._tokenizer,
+                                             self._compressed, fielded=True)
+        self.assertListEqual(index.get_indexed_fields(), ["title", "body"])
+        self.assertEqual(index.qualify("title", "foo"), "title:foo")
+        self.assertListEqual([(p.document_id, p.term_frequency) for p in index["foo"]], [(0, 3)])
+        self.assertListEqual([(p.document_id, p.term_frequency) for p in index["title:foo"]], [(0, 1)])
+        self.assertListEqual([(p.document_id, p.term_frequency) for p in index["body:foo"]], [(0, 2)])
+        self.assertEqual(index.get_document_frequency("bar"), 2)
+        self.assertEqual(index.get_document_frequency("title:bar"), 1)
+        self.assertEqual(index.get_maximum_term_frequency("body:foo"), 2)
+        self.assertEqual(index.get_document_frequency("title:baz"), 0)
+        unfielded = in3120.InMemoryInvertedIndex(corpus, ["title", "body"], self._normalizer, self._tokenizer)
+        self.assertListEqual(unfielded.get_indexed_fields(), [])
+        self.assertEqual(unfielded.get_document_frequency("title:foo"), 0)
+
+    def test_fielded_builds_agree(self):
+        corpus = in3120.InMemoryCorpus("../data/cran.xml")
+        fields = ["title", "body"]
+        index1 = in3120.InMemoryInvertedIndex(corpus, fields, self._normalizer, self._tokenizer, self._compressed,
+                                              fielded=True)
+        index2 = in3120.InMemoryInvertedIndex(corpus, fields, self._normalizer, self._tokenizer, self._compressed, 3,
+                                              fielded=True)
+        index3 = in3120.InMemoryInvertedIndex.merge([index1], lambda document_id: False)
+        terms = list(index1.get_indexed_terms())
+        self.assertListEqual(terms, list(index2.get_indexed_terms()))
+        self.assertListEqual(terms, list(index3.get_indexed_terms()))
+        self.assertListEqual(index3.get_indexed_fields(), fields)
+        for term in terms[::7]:
+            postings = [(p.document_id, p.term_frequency) for p in index1[term]]
+            self.assertListEqual(postings, [(p.document_id, p.term_frequency) for p in index2[term]])
+            self.assertListEqual(postings, [(p.document_id, p.term_frequency) for p in index3[term]])
+        for term in ["flow", "wing", "the"]:
+            per_field = [dict((p.document_id, p.term_frequency) for p in index1[index1.qualify(f, term)]) for f in fields]
+            for posting in index1[term]:
+                self.assertEqual(posting.term_frequency, sum(p.get(posting.document_id, 0) for p in per_field))
+
+    def test_champion_lists(self):
+        corpus = in3120.InMemoryCorpus("../data/imdb.csv")
+        fields = ["title", "description"]
+        index = in3120.InMemoryInvertedIndex(corpus, fields, self._normalizer, self._tokenizer, self._compressed,
+                                             champions=10)
+        self.assertIsNone(in3120.InMemoryInvertedIndex(corpus, fields, self._normalizer, self._tokenizer,
+                                                       self._compressed).get_champion_postings_cursor("love"))
+        for term in ["the", "love", "family", "bruce", "xyzzy"]:
+            postings = [(p.document_id, p.term_frequency) for p in index[term]]
+            cursor = index.get_champion_postings_cursor(term)
+            champions = []
+            while cursor.next():
+                champions.append((cursor.document_id, cursor.term_frequency))
+            self.assertEqual(len(champions), min(10, len(postings)))
+            self.assertListEqual(champions, sorted(champions))
+            self.assertTrue(set(champions) <= set(postings))
+
+        # The champions are chosen by TF score and static quality score.
+        cursor = index.get_champion_postings_cursor("the")
+        champions = set()
+        while cursor.next():
+            champions.add(cursor.document_id)
+        best = max(corpus, key=lambda d: float(d["static_quality_score"] or 0.0))
+        self.assertIn(best.document_id, champions)
+
+    def test_champion_lists_after_updates_and_merges(self):
+        corpus = in3120.InMemoryCorpus("../data/imdb.csv")
+        fields = ["title", "description"]
+        index1 = in3120.InMemoryInvertedIndex(corpus, fields, self._normalizer, self._tokenizer, self._compressed,
+                                              champions=5)
+        index2 = in3120.InMemoryInvertedIndex(in3120.InMemoryCorpus(), fields, self._normalizer, self._tokenizer,
+                                              self._compressed, champions=5)
+        for document in corpus:
+            index2.add_document(document)
+        index3 = in3120.InMemoryInvertedIndex.merge([index1], lambda document_id: False)
+        for term in ["the", "love", "family", "bruce"]:
+            champions = [self._read_cursor(index.get_champion_postings_cursor(term)) for index in [index1, index2, index3]]
+            self.assertEqual(len(champions[0]), min(5, index1.get_document_frequency(term)))
+            self.assertListEqual(champions[0], champions[1])
+            self.assertListEqual(champions[0], champions[2])
+            self.assertListEqual([(p.document_id, p.term_frequency) for p in index1[term]],
+                                 [(p.document_id, p.term_frequency) for p in index2[term]])
+
+    @staticmethod
+    def _read_cursor(cursor):
+        pairs = []
+        while cursor.next():
+            pairs.append((cursor.document_id, cursor.term_frequency))
+        return pairs
+
+    def test_memory_usage(self):
+        (size_objects, _) = measure_posting_lists(None)
+        (size_columns, _) = measure_posting_lists(in3120.InMemoryPostingList)
+        self.assertGreater(size_objects / size_columns, 4)
 
 
 if __name__ == '__main__':
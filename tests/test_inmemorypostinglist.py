@@ -42,12 +42,67 @@ class TestInMemoryPostingList(unittest.TestCase):
             with self.assertRaises(AssertionError):
                 postings.append_posting(in3120.Posting(21 - i, 2))
 
+    def _test_advance_to(self, postings: in3120.PostingList):
+        for document_id in range(0, 1000, 3):
+            postings.append_posting(in3120.Posting(document_id, document_id + 1))
+        postings.finalize_postings()
+        iterator = iter(postings)
+        self.assertEqual(next(iterator).document_id, 0)
+        for target in [1, 4, 100, 103, 500, 502]:
+            expected = target + (3 - target % 3) % 3
+            posting = iterator.advance_to(target)
+            self.assertEqual(posting.document_id, expected)
+            self.assertEqual(posting.term_frequency, expected + 1)
+        self.assertEqual(iterator.advance_to(0).document_id, 507)  # Never moves backwards.
+        self.assertEqual(iterator.advance_to(998).document_id, 999)
+        self.assertIsNone(iterator.advance_to(1000))
+        self.assertIsNone(next(iterator, None))
+
     def test_append_and_iterate(self):
         self._test_append_and_iterate(in3120.InMemoryPostingList())
 
+    def test_advance_to(self):
+        self._test_advance_to(in3120.InMemoryPostingList())
+
     def test_invalid_append(self):
         self._test_invalid_append(in3120.InMemoryPostingList())
 
+    def test_columns(self):
+        postings = in3120.InMemoryPostingList()
+        for document_id in range(0, 100, 10):
+            postings.append_posting(in3120.Posting(document_id, document_id // 10 + 1))
+        self.assertListEqual(list(postings.get_document_ids()), list(range(0, 100, 10)))
+        postings.finalize_postings()
+        self.assertListEqual(list(postings.get_term_frequencies()), list(range(1, 11)))
+        with self.assertRaises(ValueError):
+            postings.get_document_ids()[0] = 1  # Read-only.
+        iterator = iter(postings)
+        self.assertEqual(iterator.advance_to(35).document_id, 40)
+        (document_ids, term_frequencies) = iterator.read_remaining()
+        self.assertListEqual(list(document_ids), [50, 60, 70, 80, 90])
+        self.assertListEqual(list(term_frequencies), [6, 7, 8, 9, 10])
+        self.assertIsNone(next(iterator, None))
+        self.assertIsInstance(next(iter(postings)).document_id, int)
+
+    def test_append_after_finalize(self):
+        postings = in3120.InMemoryPostingList()
+        postings.append_posting(in3120.Posting(3, 1))
+        postings.finalize_postings()
+        postings.append_posting(in3120.Posting(7, 2))
+        with self.assertRaises(AssertionError):
+            postings.append_posting(in3120.Posting(5, 1))
+        postings.finalize_postings()
+        self.assertListEqual([(p.document_id, p.term_frequency) for p in postings], [(3, 1), (7, 2)])
+
+    def test_positional(self):
+        postings = in3120.InMemoryPostingList(True)
+        for document_id in range(1, 5):
+            positions = in3120.PositionalPosting.encode_positions(range(0, document_id * 3, 3))
+            postings.append_posting(in3120.PositionalPosting(document_id, document_id, positions))
+        postings.finalize_postings()
+        for posting in postings:
+            self.assertListEqual(list(posting.get_positions()), list(range(0, posting.document_id * 3, 3)))
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
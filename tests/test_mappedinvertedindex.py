@@ -0,0 +1,80 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from context import in3120
+
+
+class TestMappedInvertedIndex(unittest.TestCase):
+
+    def setUp(self):
+        self._normalizer = in3120.SimpleNormalizer()
+        self._tokenizer = in3120.SimpleTokenizer()
+        self._directory = tempfile.TemporaryDirectory()
+        self._filename = os.path.join(self._directory.name, "index.bin")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def _write(self, index):
+        in3120.MappedInvertedIndex.write(self._filename, ((t, index[t]) for t in sorted(index.get_indexed_terms())))
+        return in3120.MappedInvertedIndex(self._filename, self._normalizer, self._tokenizer)
+
+    def test_access_postings(self):
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"body": "this is a Test"}))
+        corpus.add_document(in3120.InMemoryDocument(1, {"body": "test TEST prØve"}))
+        with self._write(in3120.InMemoryInvertedIndex(corpus, ["body"], self._normalizer, self._tokenizer)) as index:
+            self.assertListEqual(list(index.get_terms("PRøvE wtf tesT")), ["prøve", "wtf", "test"])
+            self.assertListEqual([(p.document_id, p.term_frequency) for p in index["prøve"]], [(1, 1)])
+            self.assertListEqual([(p.document_id, p.term_frequency) for p in index["wtf"]], [])
+            self.assertListEqual([(p.document_id, p.term_frequency) for p in index["test"]], [(0, 1), (1, 2)])
+            self.assertEqual(index.get_document_frequency("wtf"), 0)
+            self.assertEqual(index.get_document_frequency("prøve"), 1)
+            self.assertEqual(index.get_document_frequency("test"), 2)
+            self.assertEqual(index.get_maximum_term_frequency("wtf"), 0)
+            self.assertEqual(index.get_maximum_term_frequency("test"), 2)
+            self.assertListEqual(list(index.get_indexed_terms()), ["a", "is", "prøve", "test", "this"])
+
+    def test_empty_index(self):
+        in3120.MappedInvertedIndex.write(self._filename, [])
+        with in3120.MappedInvertedIndex(self._filename, self._normalizer, self._tokenizer) as index:
+            self.assertListEqual(list(index["foo"]), [])
+            self.assertEqual(index.get_document_frequency("foo"), 0)
+            self.assertListEqual(list(index.get_indexed_terms()), [])
+
+    def test_invalid_file(self):
+        with open(self._filename, "wb") as file:
+            file.write(b"This is not an index file, not by any stretch of the imagination.")
+        with self.assertRaises(IOError):
+            in3120.MappedInvertedIndex(self._filename, self._normalizer, self._tokenizer)
+
+    def test_unsorted_terms(self):
+        postings = [in3120.Posting(1, 1)]
+        with self.assertRaises(AssertionError):
+            in3120.MappedInvertedIndex.write(self._filename, [("foo", postings), ("bar", postings)])
+
+    def test_mesh_corpus(self):
+        corpus = in3120.InMemoryCorpus("../data/mesh.txt")
+        index1 = in3120.InMemoryInvertedIndex(corpus, ["body"], self._normalizer, self._tokenizer)
+        with self._write(index1) as index2:
+            self.assertEqual(sorted(index1.get_indexed_terms()), list(index2.get_indexed_terms()))
+            for term in ["hydrogen", "hydrocephalus", "water", "pollution", "toxic", "wtf"]:
+                self.assertEqual(index1.get_document_frequency(term), index2.get_document_frequency(term))
+                self.assertEqual(index1.get_maximum_term_frequency(term), index2.get_maximum_term_frequency(term))
+                self.assertListEqual([(p.document_id, p.term_frequency) for p in index1[term]],
+                                     [(p.document_id, p.term_frequency) for p in index2[term]])
+            engine1 = in3120.SimpleSearchEngine(corpus, index1)
+            engine2 = in3120.SimpleSearchEngine(corpus, index2)
+            options = {"match_threshold": 0.5, "hit_count": 10}
+            matches1 = [(m["score"], m["document"].document_id)
+                        for m in engine1.evaluate("water pollution", options, in3120.SimpleRanker())]
+            matches2 = [(m["score"], m["document"].document_id)
+                        for m in engine2.evaluate("water pollution", options, in3120.SimpleRanker())]
+            self.assertListEqual(matches1, matches2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,104 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import unittest
+from context import in3120
+
+
+class TestPerfectHashDictionary(unittest.TestCase):
+
+    def setUp(self):
+        corpus = in3120.InMemoryCorpus("../data/cran.xml")
+        index = in3120.InMemoryInvertedIndex(corpus, ["body"], in3120.SimpleNormalizer(), in3120.SimpleTokenizer())
+        self._terms = list(index.get_indexed_terms())
+
+    def test_is_minimal_and_perfect(self):
+        vocabulary = in3120.PerfectHashDictionary(self._terms)
+        self.assertEqual(len(vocabulary), len(self._terms))
+        term_ids = [vocabulary.get_term_id(term) for term in self._terms]
+        self.assertListEqual(sorted(term_ids), list(range(len(self._terms))))
+        self.assertEqual(vocabulary["the"], vocabulary.get_term_id("the"))
+        self.assertIn("the", vocabulary)
+
+    def test_rejects_out_of_vocabulary_terms(self):
+        vocabulary = in3120.PerfectHashDictionary(self._terms)
+        misses = [f"{term}#" for term in self._terms]
+        false_positives = sum(1 for term in misses if vocabulary.get_term_id(term) is not None)
+        self.assertLess(false_positives, 5)
+        self.assertNotIn("wtf#", vocabulary)
+        with self.assertRaises(KeyError):
+            _ = vocabulary["wtf#"]
+
+    def test_is_read_only(self):
+        vocabulary = in3120.PerfectHashDictionary(["foo", "bar"])
+        self.assertEqual(vocabulary.add_if_absent("foo"), vocabulary.get_term_id("foo"))
+        with self.assertRaises(AssertionError):
+            vocabulary.add_if_absent("baz")
+
+    def test_iteration(self):
+        vocabulary = in3120.PerfectHashDictionary(self._terms)
+        pairs = list(vocabulary)
+        self.assertListEqual([term_id for (_, term_id) in pairs], list(range(len(self._terms))))
+        self.assertListEqual(sorted(term for (term, _) in pairs), sorted(self._terms))
+        for (term, term_id) in pairs[::17]:
+            self.assertEqual(vocabulary.get_term_id(term), term_id)
+            self.assertEqual(vocabulary.get_term(term_id), term)
+        self.assertIsNone(vocabulary.get_term(len(self._terms)))
+        vocabulary = in3120.PerfectHashDictionary(self._terms, store_terms=False)
+        self.assertEqual(vocabulary.get_term_id("the"), in3120.PerfectHashDictionary(self._terms).get_term_id("the"))
+        with self.assertRaises(AssertionError):
+            list(vocabulary)
+        with self.assertRaises(AssertionError):
+            vocabulary.get_term(0)
+
+    def test_bounded_search(self):
+        # If no bucket can be placed, we give up rather than search forever.
+        displacements = in3120.PerfectHashDictionary._displacements
+        try:
+            in3120.PerfectHashDictionary._displacements = 0
+            with self.assertRaises(AssertionError):
+                in3120.PerfectHashDictionary(self._terms[:100])
+        finally:
+            in3120.PerfectHashDictionary._displacements = displacements
+
+    def test_small_vocabularies(self):
+        for terms in [[], ["a"], ["a", "b"], ["blåbær", "東京", ""]]:
+            with self.subTest(terms=terms):
+                vocabulary = in3120.PerfectHashDictionary(terms)
+                self.assertEqual(vocabulary.size(), len(terms))
+                self.assertSetEqual({vocabulary.get_term_id(t) for t in terms}, set(range(len(terms))))
+                self.assertIsNone(vocabulary.get_term_id("foo"))
+                self.assertSetEqual(set(vocabulary), {(t, vocabulary.get_term_id(t)) for t in terms})
+
+    def test_duplicate_terms(self):
+        with self.assertRaises(AssertionError):
+            in3120.PerfectHashDictionary(["foo", "bar", "foo"])
+
+    def test_size(self):
+        vocabulary = in3120.PerfectHashDictionary(self._terms, store_terms=False)
+        self.assertLess(8 * len(vocabulary.get_buffer()) / len(self._terms), 24)
+
+    def test_mapped_buffer(self):
+        import mmap
+        import os
+        import tempfile
+        vocabulary = in3120.PerfectHashDictionary(self._terms)
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "terms.phd")
+            with open(filename, "wb") as file:
+                file.write(vocabulary.get_buffer())
+            with open(filename, "rb") as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            mapped = in3120.PerfectHashDictionary.from_buffer(data)
+            self.assertEqual(mapped.size(), vocabulary.size())
+            for term in self._terms[::13]:
+                self.assertEqual(mapped.get_term_id(term), vocabulary.get_term_id(term))
+                self.assertEqual(mapped.get_term(mapped.get_term_id(term)), term)
+            self.assertIsNone(mapped.get_term_id("wtf#"))
+            data.close()
+        with self.assertRaises(IOError):
+            in3120.PerfectHashDictionary.from_buffer(b"x" * 64)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,139 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import unittest
+from context import in3120
+
+
+class TestPhraseSearchEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.__normalizer = in3120.SimpleNormalizer()
+        self.__tokenizer = in3120.SimpleTokenizer()
+
+    def __create_engine(self, corpus, fields, compressed):
+        index = in3120.InMemoryInvertedIndex(corpus, fields, self.__normalizer, self.__tokenizer,
+                                             compressed, positional=True)
+        return in3120.PhraseSearchEngine(corpus, index)
+
+    def __matches(self, engine, query, options=None):
+        options = dict({"hit_count": 10}, **(options or {}))
+        return sorted((m["document"].document_id, m["score"]) for m in engine.evaluate(query, options))
+
+    def test_positional_postings(self):
+        for compressed in [False, True]:
+            corpus = in3120.InMemoryCorpus()
+            corpus.add_document(in3120.InMemoryDocument(0, {"a": "to be or not to be", "b": "be"}))
+            corpus.add_document(in3120.InMemoryDocument(1, {"a": "not", "b": "x to"}))
+            index = in3120.InMemoryInvertedIndex(corpus, ["a", "b"], self.__normalizer, self.__tokenizer,
+                                                 compressed, positional=True)
+            self.assertTrue(index.is_positional())
+            self.assertListEqual([(p.document_id, p.term_frequency, list(p.get_positions())) for p in index["be"]],
+                                 [(0, 3, [1, 5, 106])])
+            self.assertListEqual([(p.document_id, list(p.get_positions())) for p in index["to"]],
+                                 [(0, [0, 4]), (1, [102])])
+            self.assertListEqual([p.document_id for p in index["or"]], [0])
+
+    def test_phrases(self):
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"a": "to be or not to be", "b": "be or"}))
+        corpus.add_document(in3120.InMemoryDocument(1, {"a": "to be is to do", "b": "not to"}))
+        corpus.add_document(in3120.InMemoryDocument(2, {"a": "be to be to be", "b": ""}))
+        for compressed in [False, True]:
+            engine = self.__create_engine(corpus, ["a", "b"], compressed)
+            self.assertListEqual(self.__matches(engine, "to be"), [(0, 2), (1, 1), (2, 2)])
+            self.assertListEqual(self.__matches(engine, "to be or not to be"), [(0, 1)])
+            self.assertListEqual(self.__matches(engine, "BE OR"), [(0, 2)])
+            self.assertListEqual(self.__matches(engine, "be not"), [])
+            self.assertListEqual(self.__matches(engine, "be to be"), [(2, 2)])
+            self.assertListEqual(self.__matches(engine, "be"), [(0, 3), (1, 1), (2, 3)])
+            self.assertListEqual(self.__matches(engine, "do not"), [])  # Phrases don't span fields.
+            self.assertListEqual(self.__matches(engine, "wtf be"), [])
+            self.assertListEqual(self.__matches(engine, ""), [])
+
+    def test_proximity(self):
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"a": "foo x bar"}))
+        corpus.add_document(in3120.InMemoryDocument(1, {"a": "foo x y bar"}))
+        corpus.add_document(in3120.InMemoryDocument(2, {"a": "bar foo"}))
+        engine = self.__create_engine(corpus, ["a"], True)
+        self.assertListEqual(self.__matches(engine, "foo bar"), [])
+        self.assertListEqual(self.__matches(engine, "foo bar", {"slop": 1}), [(0, 1)])
+        self.assertListEqual(self.__matches(engine, "foo bar", {"slop": 2}), [(0, 1), (1, 1)])
+
+    def test_proximity_across_fields(self):
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"a": "foo x", "b": "y bar"}))
+        engine = self.__create_engine(corpus, ["a", "b"], False)
+        self.assertListEqual(self.__matches(engine, "foo bar", {"slop": 5}), [])
+        self.assertListEqual(self.__matches(engine, "foo bar", {"slop": 1000}), [])
+        self.assertListEqual(self.__matches(engine, "x y", {"slop": 1000}), [])
+
+    def test_many_candidate_positions(self):
+        # Backtracking over the candidate positions would take exponential time here.
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"a": " ".join(["foo"] * 200 + ["bar"])}))
+        engine = self.__create_engine(corpus, ["a"], True)
+        self.assertListEqual(self.__matches(engine, " ".join(["foo"] * 20) + " baz", {"slop": 10}), [])
+        self.assertListEqual(self.__matches(engine, " ".join(["foo"] * 20) + " bar", {"slop": 10}), [(0, 181)])
+
+    def test_cran_corpus(self):
+        corpus = in3120.InMemoryCorpus("../data/cran.xml")
+        engine = self.__create_engine(corpus, ["body"], True)
+        matches = list(engine.evaluate("approximate solution", {"hit_count": 5}))
+        self.assertIn(matches[0]["document"].document_id, [116, 1046])
+        self.assertEqual(matches[0]["score"], 2)  # Unlike with a suffix array, "approximate solutions" isn't a match.
+        matches = list(engine.evaluate("the boundary layer", {"hit_count": 5}))
+        self.assertEqual(len(matches), 5)
+        for i in range(1, len(matches)):
+            self.assertGreaterEqual(matches[i - 1]["score"], matches[i]["score"])
+        for match in matches:
+            self.assertIn("the boundary layer", " ".join(match["document"]["body"].lower().split()))
+
+    def test_memory_usage(self):
+        import tracemalloc
+        corpus = in3120.InMemoryCorpus("../data/cran.xml")
+        tracemalloc.start()
+        snapshot1 = tracemalloc.take_snapshot()
+        index = in3120.InMemoryInvertedIndex(corpus, ["body"], self.__normalizer, self.__tokenizer, True,
+                                             positional=True)
+        snapshot2 = tracemalloc.take_snapshot()
+        engine = in3120.SuffixArray(corpus, ["body"], self.__normalizer, self.__tokenizer)
+        snapshot3 = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        size_index = sum(s.size_diff for s in snapshot2.compare_to(snapshot1, "filename"))
+        size_engine = sum(s.size_diff for s in snapshot3.compare_to(snapshot2, "filename"))
+        self.assertIsNotNone(index)
+        self.assertIsNotNone(engine)
+        self.assertLess(size_index, size_engine)
+
+    def test_requires_positional_index(self):
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"a": "the foo bar"}))
+        index = in3120.InMemoryInvertedIndex(corpus, ["a"], self.__normalizer, self.__tokenizer)
+        self.assertFalse(index.is_positional())
+        with self.assertRaises(AssertionError):
+            in3120.PhraseSearchEngine(corpus, index)
+
+    def test_positions_with_codec(self):
+        corpus = in3120.InMemoryCorpus()
+        for i in range(300):
+            corpus.add_document(in3120.InMemoryDocument(i, {"a": f"foo {'bar ' * (i % 200)}foo baz"}))
+        index = in3120.InMemoryInvertedIndex(corpus, ["a"], self.__normalizer, self.__tokenizer,
+                                             positional=True, codec="bitpacking")
+        for posting in index["foo"]:
+            self.assertListEqual(list(posting.get_positions()), [0, 1 + posting.document_id % 200])
+        engine = in3120.PhraseSearchEngine(corpus, index)
+        self.assertEqual(len(self.__matches(engine, "foo baz", {"hit_count": 100})), 100)
+
+    def test_uses_yield(self):
+        import types
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"a": "the foo bar"}))
+        engine = self.__create_engine(corpus, ["a"], False)
+        matches = engine.evaluate("foo bar", {})
+        self.assertIsInstance(matches, types.GeneratorType, "Are you using yield?")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,73 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy as np
+from context import in3120
+
+
+class TestPostingCodec(unittest.TestCase):
+
+    def setUp(self):
+        import random
+        rng = random.Random(1234)
+        self._blocks = [[], [0], [7], [0] * 300, [1] * 128, [5, 1, 200, 3, 2 ** 40, 1, 0, 9],
+                        [rng.randint(1, 20) for _ in range(128)],
+                        [rng.choice([1, 2, 3, rng.randint(0, 2 ** 59)]) for _ in range(128)]]
+
+    def test_registry(self):
+        names = in3120.PostingCodec.get_names()
+        for name in ["vb", "bitpacking", "pfordelta", "simple8b", "gamma"]:
+            self.assertIn(name, names)
+            self.assertIsInstance(in3120.PostingCodec.create(name), in3120.PostingCodec)
+        with self.assertRaises(AssertionError):
+            in3120.PostingCodec.create("nonexistent")
+
+    def test_encode_and_decode(self):
+        for name in in3120.PostingCodec.get_names():
+            codec = in3120.PostingCodec.create(name)
+            for block in self._blocks:
+                with self.subTest(codec=name, block=block[:5]):
+                    encoded = codec.encode(np.array(block, dtype=np.int64))
+                    data = bytearray(b"\x01\x02") + encoded + bytearray(b"\x03")
+                    (numbers, used) = codec.decode(data, len(block), 2)
+                    self.assertListEqual([int(n) for n in numbers], block)
+                    self.assertEqual(used, len(encoded))
+
+    def test_compression(self):
+        # The codecs that are not byte-aligned should beat variable-byte encoding on small numbers.
+        block = np.array([1, 2, 1, 1, 3, 1, 2, 1] * 16, dtype=np.int64)
+        size = len(in3120.PostingCodec.create("vb").encode(block))
+        self.assertEqual(size, 128)
+        for name in ["bitpacking", "pfordelta", "simple8b", "gamma"]:
+            self.assertLess(len(in3120.PostingCodec.create(name).encode(block)), size / 2)
+
+    def test_pfordelta_exceptions(self):
+        codec = in3120.PostingCodec.create("pfordelta")
+        block = np.array([3] * 127 + [100000], dtype=np.int64)
+        encoded = codec.encode(block)
+        self.assertLess(len(encoded), len(in3120.PostingCodec.create("bitpacking").encode(block)))
+        self.assertListEqual(list(codec.decode(encoded, 128)[0]), list(block))
+
+    def test_simple8b_range(self):
+        codec = in3120.PostingCodec.create("simple8b")
+        with self.assertRaises(AssertionError):
+            codec.encode(np.array([2 ** 60], dtype=np.int64))
+        with self.assertRaises(IndexError):
+            codec.decode(codec.encode(np.array([1, 2, 3])), 100)
+
+    def test_compressed_index(self):
+        normalizer = in3120.SimpleNormalizer()
+        tokenizer = in3120.SimpleTokenizer()
+        corpus = in3120.InMemoryCorpus("../data/cran.xml")
+        reference = in3120.InMemoryInvertedIndex(corpus, ["body"], normalizer, tokenizer)
+        terms = ["flow", "boundary", "layer", "the", "hypersonic"]
+        for name in ["bitpacking", "simple8b"]:
+            index = in3120.InMemoryInvertedIndex(corpus, ["body"], normalizer, tokenizer, codec=name)
+            for term in terms:
+                expected = [(p.document_id, p.term_frequency) for p in reference[term]]
+                self.assertListEqual([(p.document_id, p.term_frequency) for p in index[term]], expected)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,104 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import unittest
+from context import in3120
+
+
+class TestPostingCursor(unittest.TestCase):
+
+    def setUp(self):
+        self._document_ids = list(range(3, 3000, 7))
+        self._term_frequencies = [1 + (d % 5) for d in self._document_ids]
+
+    def _make_posting_lists(self):
+        posting_lists = [in3120.InMemoryPostingList(), in3120.CompressedInMemoryPostingList(),
+                         in3120.CompressedInMemoryPostingList(False, "pfordelta")]
+        for posting_list in posting_lists:
+            for (document_id, term_frequency) in zip(self._document_ids, self._term_frequencies):
+                posting_list.append_posting(in3120.Posting(document_id, term_frequency))
+            posting_list.finalize_postings()
+        return posting_lists
+
+    def test_slots(self):
+        self.assertFalse(hasattr(in3120.Posting(1, 2), "__dict__"))
+        self.assertFalse(hasattr(in3120.PositionalPosting(1, 1, b"\x81"), "__dict__"))
+        with self.assertRaises(AttributeError):
+            in3120.Posting(1, 2).foo = 3
+
+    def test_next(self):
+        for posting_list in self._make_posting_lists():
+            with self.subTest(posting_list=type(posting_list).__name__):
+                cursor = posting_list.get_cursor()
+                self.assertIsInstance(cursor, in3120.PostingCursor)
+                seen = []
+                while cursor.next():
+                    seen.append((cursor.document_id, cursor.term_frequency))
+                self.assertListEqual(seen, list(zip(self._document_ids, self._term_frequencies)))
+                self.assertIsNone(cursor.document_id)
+                self.assertFalse(cursor.next())
+                self.assertFalse(cursor.advance_to(0))
+
+    def test_advance_to(self):
+        targets = [0, 3, 4, 10, 11, 500, 500, 1000, 2990, 2997, 2998]
+        for posting_list in self._make_posting_lists():
+            with self.subTest(posting_list=type(posting_list).__name__):
+                cursor = posting_list.get_cursor()
+                for target in targets:
+                    expected = next((d for d in self._document_ids if d >= target), None)
+                    self.assertEqual(cursor.advance_to(target), expected is not None)
+                    self.assertEqual(cursor.document_id, expected)
+                    if expected is not None:
+                        self.assertEqual(cursor.term_frequency, 1 + (expected % 5))
+
+    def test_get_posting(self):
+        cursor = self._make_posting_lists()[0].get_cursor()
+        self.assertTrue(cursor.advance_to(10))
+        posting = cursor.get_posting()
+        self.assertTrue(cursor.next())
+        self.assertEqual(posting.document_id, 10)
+        self.assertEqual(cursor.document_id, 17)
+
+    def test_positional(self):
+        for posting_list in [in3120.InMemoryPostingList(True), in3120.CompressedInMemoryPostingList(True)]:
+            with self.subTest(posting_list=type(posting_list).__name__):
+                posting_list.append_posting(in3120.PositionalPosting(4, 2, in3120.PositionalPosting.encode_positions([1, 5])))
+                posting_list.append_posting(in3120.PositionalPosting(9, 1, in3120.PositionalPosting.encode_positions([0])))
+                posting_list.finalize_postings()
+                cursor = posting_list.get_cursor()
+                self.assertTrue(cursor.advance_to(5))
+                self.assertListEqual(list(cursor.get_posting().get_positions()), [0])
+
+    def test_of(self):
+        postings = [in3120.Posting(d, f) for (d, f) in zip(self._document_ids, self._term_frequencies)]
+        cursor = in3120.PostingCursor.of(iter(postings))
+        self.assertIsInstance(cursor, in3120.IteratorPostingCursor)
+        self.assertIs(in3120.PostingCursor.of(cursor), cursor)
+        self.assertTrue(cursor.advance_to(11))
+        self.assertIs(cursor.get_posting(), postings[2])
+        iterator = self._make_posting_lists()[0].get_iterator()
+        self.assertIs(in3120.PostingCursor.of(iterator), iterator.get_cursor())
+
+    def test_iterator_shares_position(self):
+        for posting_list in self._make_posting_lists()[:2]:
+            with self.subTest(posting_list=type(posting_list).__name__):
+                iterator = posting_list.get_iterator()
+                self.assertEqual(next(iterator).document_id, 3)
+                self.assertEqual(iterator.advance_to(0).document_id, 10)
+                self.assertEqual(iterator.get_cursor().document_id, 10)
+                self.assertEqual(next(iterator).document_id, 17)
+
+    def test_inverted_index(self):
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"body": "a b"}))
+        corpus.add_document(in3120.InMemoryDocument(1, {"body": "b c b"}))
+        index = in3120.InMemoryInvertedIndex(corpus, ["body"], in3120.SimpleNormalizer(), in3120.SimpleTokenizer())
+        cursor = index.get_postings_cursor("b")
+        self.assertTrue(cursor.next())
+        self.assertTrue(cursor.next())
+        self.assertEqual((cursor.document_id, cursor.term_frequency), (1, 2))
+        self.assertFalse(index.get_postings_cursor("z").next())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -33,14 +33,76 @@ class TestPostingsMerger(unittest.TestCase):
         self.assertListEqual(result12, [1, 2, 3, 6])
         self.assertListEqual(result12, result21)
 
+    def test_advance(self):
+        postings = [in3120.Posting(1, 0), in3120.Posting(2, 0), in3120.Posting(5, 0), in3120.Posting(9, 0)]
+        iterator = iter(postings)
+        self.assertEqual(self._merger.advance(iterator, 2).document_id, 2)
+        self.assertEqual(self._merger.advance(iterator, 4).document_id, 5)
+        self.assertEqual(self._merger.advance(iterator, 0).document_id, 9)
+        self.assertIsNone(self._merger.advance(iterator, 10))
+
+    def test_skewed_compressed_lists(self):
+        short = in3120.CompressedInMemoryPostingList()
+        long = in3120.CompressedInMemoryPostingList()
+        for document_id in range(0, 100000):
+            long.append_posting(in3120.Posting(document_id, 1))
+        for document_id in [7, 5000, 77777, 99999]:
+            short.append_posting(in3120.Posting(document_id, 2))
+        result12 = [p.document_id for p in self._merger.intersection(iter(short), iter(long))]
+        result21 = [p.document_id for p in self._merger.intersection(iter(long), iter(short))]
+        self.assertListEqual(result12, [7, 5000, 77777, 99999])
+        self.assertListEqual(result12, result21)
+
+    def test_intersection_many(self):
+        postings1 = [in3120.Posting(i, 1) for i in [1, 2, 3, 5, 8, 13, 21, 34]]
+        postings2 = [in3120.Posting(i, 2) for i in range(0, 40, 1)]
+        postings3 = [in3120.Posting(i, 3) for i in range(1, 40, 2)]
+        for lists in [[postings1, postings2, postings3], [postings3, postings2, postings1]]:
+            for frequencies in [None, [len(postings) for postings in lists]]:
+                result = self._merger.intersection_many([iter(postings) for postings in lists], frequencies)
+                self.assertListEqual([p.document_id for p in result], [1, 3, 5, 13, 21])
+        result = self._merger.intersection_many([iter(postings1), iter(postings2), iter(postings3)], [3, 2, 1])
+        self.assertListEqual([p.term_frequency for p in result], [3, 3, 3, 3, 3])  # Yields from shortest.
+        self.assertListEqual(list(self._merger.intersection_many([])), [])
+        self.assertListEqual(list(self._merger.intersection_many([iter(postings1)])), postings1)
+        self.assertListEqual(list(self._merger.intersection_many([iter(postings1), iter([])])), [])
+
+    def test_intersection_many_postings(self):
+        postings1 = [in3120.Posting(i, 1) for i in [1, 2, 3, 5, 8, 13, 21, 34]]
+        postings2 = [in3120.Posting(i, 2) for i in range(0, 40, 1)]
+        postings3 = [in3120.Posting(i, 3) for i in range(1, 40, 2)]
+        for frequencies in [None, [8, 40, 20], [3, 2, 1]]:
+            result = self._merger.intersection_many_postings([iter(postings2), iter(postings1), iter(postings3)],
+                                                             frequencies)
+            self.assertListEqual([[(p.document_id, p.term_frequency) for p in postings] for postings in result],
+                                 [[(i, 2), (i, 1), (i, 3)] for i in [1, 3, 5, 13, 21]])
+        self.assertListEqual(list(self._merger.intersection_many_postings([])), [])
+        self.assertListEqual(list(self._merger.intersection_many_postings([iter(postings1), iter([])])), [])
+
+    def test_intersection_many_mesh_corpus(self):
+        from functools import reduce
+        normalizer = in3120.SimpleNormalizer()
+        tokenizer = in3120.SimpleTokenizer()
+        corpus = in3120.InMemoryCorpus("../data/mesh.txt")
+        for compressed in [False, True]:
+            index = in3120.InMemoryInvertedIndex(corpus, ["body"], normalizer, tokenizer, compressed)
+            for query in ["HIV protein", "acid amino protein", "water pollution", "human virus type"]:
+                terms = list(index.get_terms(query))
+                expected = reduce(lambda p1, p2: self._merger.intersection(p1, p2), (index[t] for t in terms))
+                frequencies = [index.get_document_frequency(t) for t in terms]
+                result = self._merger.intersection_many([index[t] for t in terms], frequencies)
+                self.assertListEqual([p.document_id for p in result], [p.document_id for p in expected])
+
     def test_uses_yield(self):
         import types
         postings1 = [in3120.Posting(1, 0), in3120.Posting(2, 0), in3120.Posting(3, 0)]
         postings2 = [in3120.Posting(2, 0), in3120.Posting(3, 0), in3120.Posting(6, 0)]
         result1 = self._merger.intersection(iter(postings1), iter(postings2))
         result2 = self._merger.union(iter(postings1), iter(postings2))
+        result3 = self._merger.intersection_many([iter(postings1), iter(postings2)])
         self.assertIsInstance(result1, types.GeneratorType, "Are you using yield?")
         self.assertIsInstance(result2, types.GeneratorType, "Are you using yield?")
+        self.assertIsInstance(result3, types.GeneratorType, "Are you using yield?")
 
     def _process_query_with_two_terms(self, corpus, index, query, operator, expected):
         terms = list(index.get_terms(query))
@@ -0,0 +1,180 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import unittest
+from context import in3120
+
+
+class TestQueryCache(unittest.TestCase):
+
+    def setUp(self):
+        self._now = 0.0
+
+    def _clock(self) -> float:
+        return self._now
+
+    def test_hits_and_misses(self):
+        cache = in3120.QueryCache(10)
+        key = in3120.QueryCache.make_key(["foo", "bar"], {"hit_count": 5})
+        self.assertIsNone(cache.get(key))
+        cache.put(key, [{"score": 1.0, "document": None}])
+        self.assertListEqual(cache.get(key), [{"score": 1.0, "document": None}])
+        self.assertIsNone(cache.get(in3120.QueryCache.make_key(["bar", "foo"], {"hit_count": 5})))
+        self.assertIsNone(cache.get(in3120.QueryCache.make_key(["foo", "bar"], {"hit_count": 6})))
+        statistics = cache.get_statistics()
+        self.assertEqual(statistics["hits"], 1)
+        self.assertEqual(statistics["misses"], 3)
+        self.assertEqual(statistics["size"], 1)
+
+    def test_options_order_does_not_matter(self):
+        key1 = in3120.QueryCache.make_key(["foo"], {"a": 1, "b": 2})
+        key2 = in3120.QueryCache.make_key(["foo"], {"b": 2, "a": 1})
+        self.assertEqual(key1, key2)
+
+    def test_options_are_frozen(self):
+        key1 = in3120.QueryCache.make_key(["foo"], {"a": [1, {"b": {2, 3}}], 1: "x", "c": {"d": 4, 5: 6}})
+        key2 = in3120.QueryCache.make_key(["foo"], {"c": {5: 6, "d": 4}, 1: "x", "a": [1, {"b": {3, 2}}]})
+        key3 = in3120.QueryCache.make_key(["foo"], {"c": {5: 6, "d": 4}, 1: "x", "a": [{"b": {3, 2}}, 1]})
+        self.assertEqual(key1, key2)
+        self.assertNotEqual(key1, key3)
+        cache = in3120.QueryCache()
+        cache.put(key1, [{"score": 1.0}])
+        self.assertListEqual(cache.get(key2), [{"score": 1.0}])
+        self.assertIsNone(cache.get(key3))
+
+    def test_unhashable_options_are_not_cached(self):
+        class Unhashable:
+            __hash__ = None
+
+        self.assertIsNone(in3120.QueryCache.make_key(["foo"], {"a": Unhashable()}))
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"body": "foo bar"}))
+        index = in3120.InMemoryInvertedIndex(corpus, ["body"], in3120.SimpleNormalizer(), in3120.SimpleTokenizer())
+        cache = in3120.QueryCache()
+        engine = in3120.SimpleSearchEngine(corpus, index, cache)
+        options = {"match_threshold": 1.0, "a": Unhashable()}
+        for _ in range(2):
+            matches = list(engine.evaluate("foo", options, in3120.SimpleRanker()))
+            self.assertListEqual([m["document"].document_id for m in matches], [0])
+        self.assertEqual(len(cache), 0)
+
+    def test_results_are_copied(self):
+        cache = in3120.QueryCache(10)
+        results = [{"score": 1.0}]
+        cache.put("key", results)
+        results[0]["score"] = 2.0
+        cache.get("key")[0]["score"] = 3.0
+        self.assertEqual(cache.get("key")[0]["score"], 1.0)
+
+    def test_lru_eviction(self):
+        cache = in3120.QueryCache(2)
+        cache.put("a", [])
+        cache.put("b", [])
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("c", [])
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get_statistics()["evictions"], 1)
+
+    def test_ttl_expiration(self):
+        cache = in3120.QueryCache(10, 60.0, self._clock)
+        cache.put("a", [])
+        self._now = 59.0
+        self.assertIsNotNone(cache.get("a"))
+        self._now = 60.0
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get_statistics()["expirations"], 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_generation_invalidates(self):
+        cache = in3120.QueryCache(10)
+        cache.put("a", [], 1)
+        self.assertIsNotNone(cache.get("a", 1))
+        self.assertIsNone(cache.get("a", 2))
+        self.assertEqual(cache.get_statistics()["invalidations"], 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_illegal_arguments(self):
+        with self.assertRaises(AssertionError):
+            in3120.QueryCache(0)
+        with self.assertRaises(AssertionError):
+            in3120.QueryCache(10, 0.0)
+
+    def test_simple_search_engine(self):
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"body": "foo bar"}))
+        corpus.add_document(in3120.InMemoryDocument(1, {"body": "bar baz"}))
+        index = in3120.InMemoryInvertedIndex(corpus, ["body"], in3120.SimpleNormalizer(), in3120.SimpleTokenizer())
+        cache = in3120.QueryCache(10)
+        engine = in3120.SimpleSearchEngine(corpus, index, cache)
+        ranker = in3120.SimpleRanker()
+        options = {"match_threshold": 0.5}
+        matches1 = list(engine.evaluate("BAR", options, ranker))
+        matches2 = list(engine.evaluate("bar!", options, ranker))
+        self.assertListEqual(matches1, matches2)
+        self.assertEqual(len(matches1), 2)
+        self.assertEqual(engine.get_statistics()["queries"], 1)
+        self.assertEqual(cache.get_statistics()["hits"], 1)
+        list(engine.evaluate("bar", options, in3120.SimpleRanker()))
+        self.assertEqual(engine.get_statistics()["queries"], 2)
+
+        # Mutating the index invalidates the cache.
+        corpus.add_document(in3120.InMemoryDocument(2, {"body": "bar"}))
+        index.add_document(corpus[2])
+        self.assertEqual(len(list(engine.evaluate("bar", options, ranker))), 3)
+        self.assertEqual(engine.get_statistics()["queries"], 3)
+
+    def test_suffix_array(self):
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"a": "the best"}))
+        corpus.add_document(in3120.InMemoryDocument(1, {"a": "the bearnaise"}))
+        cache = in3120.QueryCache(10)
+        engine = in3120.SuffixArray(corpus, ["a"], in3120.SimpleNormalizer(), in3120.SimpleTokenizer(), cache)
+        matches1 = list(engine.evaluate("The Be", {}))
+        matches2 = list(engine.evaluate("the  be", {}))
+        self.assertListEqual(matches1, matches2)
+        self.assertEqual(len(matches1), 2)
+        self.assertEqual(cache.get_statistics()["hits"], 1)
+
+    def test_shared_between_engines(self):
+        normalizer = in3120.SimpleNormalizer()
+        tokenizer = in3120.SimpleTokenizer()
+        corpus1 = in3120.InMemoryCorpus()
+        corpus1.add_document(in3120.InMemoryDocument(0, {"a": "foo bar"}))
+        corpus2 = in3120.InMemoryCorpus()
+        corpus2.add_document(in3120.InMemoryDocument(0, {"a": "foo"}))
+        corpus2.add_document(in3120.InMemoryDocument(1, {"a": "foo foo"}))
+        cache = in3120.QueryCache(10)
+        index = in3120.InMemoryInvertedIndex(corpus1, ["a"], normalizer, tokenizer)
+        engine1 = in3120.SimpleSearchEngine(corpus1, index, cache)
+        engine2 = in3120.SuffixArray(corpus2, ["a"], normalizer, tokenizer, cache)
+        engine3 = in3120.SuffixArray(corpus1, ["a"], normalizer, tokenizer, cache)
+        ranker = in3120.SimpleRanker()
+        for _ in range(2):
+            self.assertEqual(len(list(engine1.evaluate("foo", {}, ranker))), 1)
+            self.assertEqual(len(list(engine2.evaluate("foo", {}))), 2)
+            self.assertEqual(len(list(engine3.evaluate("foo", {}))), 1)
+        statistics = cache.get_statistics()
+        self.assertEqual(statistics["misses"], 3)
+        self.assertEqual(statistics["hits"], 3)
+        self.assertEqual(statistics["invalidations"], 0)
+
+    def test_does_not_keep_objects_alive(self):
+        import gc
+        import weakref
+        cache = in3120.QueryCache(10)
+        ranker = in3120.SimpleRanker()
+        reference = weakref.ref(ranker)
+        cache.put(in3120.QueryCache.make_key(["foo"], {}, ranker), [])
+        self.assertIsNotNone(cache.get(in3120.QueryCache.make_key(["foo"], {}, ranker)))
+        self.assertIsNone(cache.get(in3120.QueryCache.make_key(["foo"], {}, in3120.SimpleRanker())))
+        del ranker
+        gc.collect()
+        self.assertIsNone(reference())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,113 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import random
+import unittest
+from context import in3120
+
+
+class TestSegmentedInvertedIndex(unittest.TestCase):
+
+    class SmallSegmentsIndex(in3120.SegmentedInvertedIndex):
+        _segment_size = 10
+        _merge_factor = 3
+
+    def setUp(self):
+        self._normalizer = in3120.SimpleNormalizer()
+        self._tokenizer = in3120.SimpleTokenizer()
+
+    def _assert_same_postings(self, index1, index2, terms):
+        for term in terms:
+            self.assertListEqual([(p.document_id, p.term_frequency) for p in index1[term]],
+                                 [(p.document_id, p.term_frequency) for p in index2[term]])
+
+    def test_add_documents(self):
+        corpus = in3120.InMemoryCorpus("../data/mesh.txt")
+        reference = in3120.InMemoryInvertedIndex(corpus, ["body"], self._normalizer, self._tokenizer)
+        initial = in3120.InMemoryCorpus()
+        for document in corpus:
+            if document.document_id < 1000:
+                initial.add_document(document)
+        index = self.SmallSegmentsIndex(initial, ["body"], self._normalizer, self._tokenizer, True)
+        generation = index.get_generation()
+        for document in corpus:
+            if document.document_id >= 1000:
+                index.add_document(document)
+        self.assertGreater(index.get_generation(), generation)
+        self.assertGreater(index.get_segment_count(), 1)
+        self.assertLess(index.get_segment_count(), 20)  # Tiered merging keeps this in check.
+        terms = ["hydrogen", "hydrocephalus", "water", "pollution", "toxic", "wtf"]
+        self._assert_same_postings(reference, index, terms)
+        for term in terms:
+            self.assertEqual(reference.get_document_frequency(term), index.get_document_frequency(term))
+            self.assertEqual(reference.get_maximum_term_frequency(term), index.get_maximum_term_frequency(term))
+        self.assertSetEqual(set(reference.get_indexed_terms()), set(index.get_indexed_terms()))
+        self.assertAlmostEqual(reference.get_average_document_length(), index.get_average_document_length(), 8)
+        self.assertEqual(reference.get_document_length(12345), index.get_document_length(12345))
+        index.merge()
+        self.assertEqual(index.get_segment_count(), 1)
+        self._assert_same_postings(reference, index, terms)
+
+    def test_delete_documents(self):
+        corpus = in3120.InMemoryCorpus()
+        for i in range(0, 100):
+            corpus.add_document(in3120.InMemoryDocument(i, {"body": "foo bar" if i % 2 else "foo"}))
+        index = self.SmallSegmentsIndex(in3120.InMemoryCorpus(), ["body"], self._normalizer, self._tokenizer)
+        for document in corpus:
+            index.add_document(document)
+        self.assertTrue(index.delete_document(3))
+        self.assertFalse(index.delete_document(3))
+        self.assertFalse(index.delete_document(1000))
+        self.assertTrue(index.delete_document(99))
+        self.assertTrue(index.delete_document(40))
+        self.assertListEqual([p.document_id for p in index["bar"]], [i for i in range(1, 98, 2) if i != 3])
+        self.assertEqual(len(list(index["foo"])), 97)
+        self.assertEqual(index.get_document_frequency("foo"), 100)  # Not purged yet.
+        index.merge()
+        self.assertEqual(index.get_document_frequency("foo"), 97)
+        self.assertEqual(len(list(index["foo"])), 97)
+        self.assertFalse(index.delete_document(3))
+
+    def test_advance_to(self):
+        rng = random.Random(1234)
+        corpus = in3120.InMemoryCorpus()
+        for i in range(0, 300):
+            corpus.add_document(in3120.InMemoryDocument(i, {"body": "foo" if rng.random() < 0.5 else "bar"}))
+        index = self.SmallSegmentsIndex(in3120.InMemoryCorpus(), ["body"], self._normalizer, self._tokenizer)
+        for document in corpus:
+            index.add_document(document)
+        for i in rng.sample(range(0, 300), 50):
+            index.delete_document(i)
+        expected = [p.document_id for p in index["foo"]]
+        for _ in range(0, 20):
+            iterator = index["foo"]
+            target = 0
+            while True:
+                target += rng.randint(1, 30)
+                posting = iterator.advance_to(target)
+                candidates = [d for d in expected if d >= target]
+                if not candidates:
+                    self.assertIsNone(posting)
+                    break
+                self.assertEqual(posting.document_id, candidates[0])
+                target = posting.document_id + 1
+
+    def test_search_engine(self):
+        corpus = in3120.InMemoryCorpus("../data/cran.xml")
+        index = self.SmallSegmentsIndex(in3120.InMemoryCorpus(), ["body"], self._normalizer, self._tokenizer)
+        for document in corpus:
+            index.add_document(document)
+        reference = in3120.InMemoryInvertedIndex(corpus, ["body"], self._normalizer, self._tokenizer)
+        engine1 = in3120.SimpleSearchEngine(corpus, reference)
+        engine2 = in3120.SimpleSearchEngine(corpus, index)
+        for strategy in ["daat", "wand", "taat"]:
+            options = {"match_threshold": 0.0, "hit_count": 10, "strategy": strategy}
+            matches1 = [(m["score"], m["document"].document_id)
+                        for m in engine1.evaluate("supersonic flow", options, in3120.BetterRanker(corpus, reference))]
+            matches2 = [(m["score"], m["document"].document_id)
+                        for m in engine2.evaluate("supersonic flow", options, in3120.BetterRanker(corpus, index))]
+            self.assertListEqual(matches1, matches2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
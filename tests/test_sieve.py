@@ -21,6 +21,19 @@ class TestSieve(unittest.TestCase):
         sieve.sift(4.0, "four")
         self.assertListEqual(list(sieve.winners()), [(10.0, "ten"), (9.0, "nine"), (8.0, "eight")])
 
+    def test_threshold(self):
+        sieve = in3120.Sieve(2)
+        self.assertEqual(sieve.size(), 2)
+        self.assertIsNone(sieve.threshold())
+        sieve.sift(1.0, "one")
+        self.assertIsNone(sieve.threshold())
+        sieve.sift(3.0, "three")
+        self.assertEqual(sieve.threshold(), 1.0)
+        sieve.sift(2.0, "two")
+        self.assertEqual(sieve.threshold(), 2.0)
+        sieve.sift(2.0, "deuce")
+        self.assertListEqual(list(sieve.winners()), [(3.0, "three"), (2.0, "two")])
+
     def test_invalid_size(self):
         for i in [-1, 0]:
             with self.assertRaises(AssertionError):
@@ -1,6 +1,7 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import functools
 import unittest
 from context import in3120
 
@@ -192,6 +193,302 @@ class TestSimpleSearchEngine(unittest.TestCase):
         history = index.get_history()
         self.assertTrue(history == ordering1 or history == ordering2)  # Strict.
 
+    def _test_strategies_agree(self, corpus, index, queries, rankers, strategy):
+        for query in queries:
+            for ranker in rankers:
+                for match_threshold in [0.0, 0.5, 1.0]:
+                    for hit_count in [1, 3, 10]:
+                        options1 = {"match_threshold": match_threshold, "hit_count": hit_count}
+                        options2 = dict(options1, strategy=strategy)
+                        engine = in3120.SimpleSearchEngine(corpus, index)
+                        matches1 = [(m["score"], m["document"].document_id) for m in engine.evaluate(query, options1, ranker)]
+                        matches2 = [(m["score"], m["document"].document_id) for m in engine.evaluate(query, options2, ranker)]
+                        self.assertListEqual(matches1, matches2)
+
+    def test_wand_agrees_with_exhaustive_traversal(self):
+        corpus = in3120.InMemoryCorpus("../data/cran.xml")
+        queries = ["viscous flow", "the boundary layer", "supersonic flow over a wing", "heat transfer of the slender body",
+                   "xyzzy flow", "the of and a"]
+        for compressed in [False, True]:
+            index = in3120.InMemoryInvertedIndex(corpus, ["body"], self.__normalizer, self.__tokenizer, compressed)
+            rankers = [in3120.SimpleRanker(), in3120.BetterRanker(corpus, index)]
+            self._test_strategies_agree(corpus, index, queries, rankers, "wand")
+
+    def test_taat_agrees_with_daat(self):
+        corpus = in3120.InMemoryCorpus("../data/cran.xml")
+        queries = ["viscous flow", "the boundary layer", "supersonic flow over a wing", "heat transfer of the slender body",
+                   "xyzzy flow", "xyzzy", "the of and a"]
+        for compressed in [False, True]:
+            index = in3120.InMemoryInvertedIndex(corpus, ["body"], self.__normalizer, self.__tokenizer, compressed)
+            rankers = [in3120.SimpleRanker(), in3120.BetterRanker(corpus, index)]
+            self._test_strategies_agree(corpus, index, queries, rankers, "taat")
+
+    def test_wildcards(self):
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"body": "aerofoil wing"}))
+        corpus.add_document(in3120.InMemoryDocument(1, {"body": "aerodynamic aerofoil"}))
+        corpus.add_document(in3120.InMemoryDocument(2, {"body": "airfoil wing"}))
+        corpus.add_document(in3120.InMemoryDocument(3, {"body": "wing"}))
+        index = in3120.InMemoryInvertedIndex(corpus, ["body"], self.__normalizer, self.__tokenizer)
+        engine = in3120.SimpleSearchEngine(corpus, index)
+        for strategy in ["daat", "wand", "taat"]:
+            with self.subTest(strategy=strategy):
+                options = {"match_threshold": 1.0, "strategy": strategy}
+                ranker = in3120.SimpleRanker()
+                matches = {m["document"].document_id: m["score"] for m in engine.evaluate("AERO* wing", options, ranker)}
+                self.assertDictEqual(matches, {0: 2.0})
+                matches = {m["document"].document_id: m["score"] for m in engine.evaluate("aero*", options, ranker)}
+                self.assertDictEqual(matches, {0: 1.0, 1: 2.0})
+                matches = {m["document"].document_id: m["score"] for m in engine.evaluate("*foil", options, ranker)}
+                self.assertDictEqual(matches, {0: 1.0, 1: 1.0, 2: 1.0})
+                matches = list(engine.evaluate("aero* wing", dict(options, expansion_limit=1), ranker))
+                self.assertListEqual([m["document"].document_id for m in matches], [0])
+                self.assertListEqual(list(engine.evaluate("xyz* wing", options, ranker)), [])
+                matches = {m["document"].document_id: m["score"] for m in engine.evaluate("wing-aero*", options, ranker)}
+                self.assertDictEqual(matches, {0: 2.0})  # Not glued together into 'wingaero*'.
+                matches = {m["document"].document_id: m["score"] for m in engine.evaluate("*-wing", options, ranker)}
+                self.assertDictEqual(matches, {0: 1.0, 2: 1.0, 3: 1.0})
+        corpus.add_document(in3120.InMemoryDocument(4, {"body": "aeroplane wing"}))
+        index.add_document(corpus[4])
+        matches = {m["document"].document_id for m in engine.evaluate("aero* wing", {"match_threshold": 1.0}, ranker)}
+        self.assertSetEqual(matches, {0, 4})
+
+    def test_wildcards_agree_across_strategies(self):
+        corpus = in3120.InMemoryCorpus("../data/cran.xml")
+        index = in3120.InMemoryInvertedIndex(corpus, ["body"], self.__normalizer, self.__tokenizer)
+        engine = in3120.SimpleSearchEngine(corpus, index)
+        ranker = in3120.BetterRanker(corpus, index)
+        for query in ["aero* wing", "supersonic *flow", "the boundary lay*r", "x*yz flow"]:
+            for match_threshold in [0.0, 0.5, 1.0]:
+                matches = [[(m["score"], m["document"].document_id) for m in engine.evaluate(query, options, ranker)]
+                           for options in [{"match_threshold": match_threshold, "strategy": s} for s in ["daat", "wand", "taat"]]]
+                self.assertListEqual(matches[0], matches[1])
+                self.assertListEqual(matches[0], matches[2])
+
+    def test_fielded_queries(self):
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"name": "Oslo Airport", "type": "large_airport"}))
+        corpus.add_document(in3120.InMemoryDocument(1, {"name": "Oslo Heliport", "type": "heliport"}))
+        corpus.add_document(in3120.InMemoryDocument(2, {"name": "Heliport Airport", "type": "small_airport"}))
+        index = in3120.InMemoryInvertedIndex(corpus, ["name", "type"], self.__normalizer, self.__tokenizer, fielded=True)
+        engine = in3120.SimpleSearchEngine(corpus, index)
+        for strategy in ["daat", "wand", "taat"]:
+            with self.subTest(strategy=strategy):
+                options = {"match_threshold": 1.0, "strategy": strategy}
+                ranker = in3120.SimpleRanker()
+                matches = {m["document"].document_id: m["score"] for m in engine.evaluate("heliport", options, ranker)}
+                self.assertDictEqual(matches, {1: 2.0, 2: 1.0})
+                matches = {m["document"].document_id: m["score"] for m in engine.evaluate("type:HELIPORT", options, ranker)}
+                self.assertDictEqual(matches, {1: 1.0})
+                matches = {m["document"].document_id for m in engine.evaluate("name:heliport airport", options, ranker)}
+                self.assertSetEqual(matches, {2})
+                matches = {m["document"].document_id for m in engine.evaluate("name:*port oslo", options, ranker)}
+                self.assertSetEqual(matches, {0, 1})
+                matches = {m["document"].document_id for m in engine.evaluate("wtf:oslo", options, ranker)}
+                self.assertSetEqual(matches, set())
+                matches = {m["document"].document_id for m in engine.evaluate("Airport\tname:oslo,x wtf:* type:small*",
+                                                                               dict(options, match_threshold=0.0), ranker)}
+                self.assertSetEqual(matches, {0, 1, 2})
+        self.assertListEqual(list(engine.evaluate("name:", {}, in3120.SimpleRanker())), [])
+
+        # Terms qualified by fields that the ranker doesn't weight are still scored.
+        ranker = in3120.BM25FRanker(corpus, index, {"type": 1.0})
+        matches = [m["score"] for m in engine.evaluate("name:oslo", {"match_threshold": 1.0}, ranker)]
+        self.assertEqual(len(matches), 2)
+        self.assertGreater(min(matches), 0.0)
+
+    def test_fielded_ranking(self):
+        corpus = in3120.InMemoryCorpus("../data/imdb.csv")
+        fields = ["title", "genre", "description", "actors"]
+        index = in3120.InMemoryInvertedIndex(corpus, fields, self.__normalizer, self.__tokenizer, fielded=True)
+        engine = in3120.SimpleSearchEngine(corpus, index)
+        ranker = in3120.BM25FRanker(corpus, index, {"title": 5.0, "genre": 2.0, "description": 1.0, "actors": 1.0})
+        for query in ["love story", "title:love story", "a man and his family", "dark* genre:horror"]:
+            for match_threshold in [0.0, 1.0]:
+                matches = [[(m["score"], m["document"].document_id) for m in engine.evaluate(query, options, ranker)]
+                           for options in [{"match_threshold": match_threshold, "strategy": s} for s in ["daat", "wand"]]]
+                self.assertTrue(matches[0])
+                self.assertListEqual(matches[0], matches[1])
+        for match in engine.evaluate("title:love", {"match_threshold": 1.0}, ranker):
+            self.assertIn("love", match["document"]["title"].lower())
+        match = next(engine.evaluate("love", {"match_threshold": 1.0}, ranker))
+        self.assertIn("love", match["document"]["title"].lower())
+
+    def test_champion_lists(self):
+        corpus = in3120.InMemoryCorpus("../data/imdb.csv")
+        fields = ["title", "description"]
+        index = in3120.InMemoryInvertedIndex(corpus, fields, self.__normalizer, self.__tokenizer, champions=20)
+        engine = in3120.SimpleSearchEngine(corpus, index)
+        ranker = in3120.BetterRanker(corpus, index)
+        for strategy in ["daat", "wand", "taat"]:
+            with self.subTest(strategy=strategy):
+                options = {"match_threshold": 0.5, "hit_count": 5, "strategy": strategy}
+                before = engine.get_statistics()
+                exact = [m["document"].document_id for m in engine.evaluate("the family", options, ranker)]
+                middle = engine.get_statistics()
+                approximate = [m["document"].document_id
+                               for m in engine.evaluate("the family", dict(options, champions=True), ranker)]
+                after = engine.get_statistics()
+                self.assertEqual(len(approximate), 5)
+                self.assertTrue(set(approximate) & set(exact))
+                self.assertLess(after["postings"] - middle["postings"], middle["postings"] - before.get("postings", 0))
+                self.assertEqual(after["champion_hits"] - before.get("champion_hits", 0), 1)
+
+                # Too few matches in the champion lists, so we have to fall back to the full posting lists.
+                options = dict(options, match_threshold=1.0)
+                exact = list(engine.evaluate("love story", options, ranker))
+                approximate = list(engine.evaluate("love story", dict(options, champions=True), ranker))
+                self.assertListEqual(approximate, exact)
+                self.assertEqual(engine.get_statistics()["champion_misses"] - before.get("champion_misses", 0), 1)
+
+    def test_evaluate_batch(self):
+        corpus = in3120.InMemoryCorpus("../data/cran.xml")
+        queries = ["viscous flow", "the boundary layer", "Viscous  FLOW", "supersonic flow over a wing", "xyzzy",
+                   "", "aero* wing", "heat transfer of the slender body", "viscous flow", "boundary layer flow"]
+        for compressed in [False, True]:
+            index = in3120.InMemoryInvertedIndex(corpus, ["body"], self.__normalizer, self.__tokenizer, compressed)
+            engine = in3120.SimpleSearchEngine(corpus, index)
+            for strategy in ["daat", "wand", "taat"]:
+                options = {"match_threshold": 0.5, "hit_count": 5, "strategy": strategy}
+                expected = [list(engine.evaluate(query, options, in3120.BetterRanker(corpus, index))) for query in queries]
+                for workers in [1, 2]:
+                    with self.subTest(compressed=compressed, strategy=strategy, workers=workers):
+                        before = engine.get_statistics()["queries"]
+                        results = engine.evaluate_batch(queries, options,
+                                                        functools.partial(in3120.BetterRanker, corpus, index), workers)
+                        self.assertEqual(len(results), len(queries))
+                        for (matches1, matches2) in zip(expected, results):
+                            self.assertListEqual([(m["score"], m["document"].document_id) for m in matches1],
+                                                 [(m["score"], m["document"].document_id) for m in matches2])
+                        self.assertEqual(engine.get_statistics()["queries"] - before, len(queries) - 2)
+
+    def test_evaluate_batch_concurrently(self):
+        import multiprocessing
+        import threading
+        corpus = in3120.InMemoryCorpus("../data/cran.xml")
+        index = in3120.InMemoryInvertedIndex(corpus, ["body"], self.__normalizer, self.__tokenizer)
+        engine = in3120.SimpleSearchEngine(corpus, index)
+        batches = [["viscous flow", "boundary layer"], ["supersonic wing", "heat transfer", "slender body"]]
+        options = [{"match_threshold": 1.0, "hit_count": 3}, {"match_threshold": 0.5, "hit_count": 7}]
+        expected = [[list(engine.evaluate(q, o, in3120.SimpleRanker())) for q in b] for (b, o) in zip(batches, options)]
+
+        # Batches evaluated by different threads don't share any state.
+        results = [None, None]
+
+        def _evaluate(i: int) -> None:
+            for _ in range(10):
+                results[i] = engine.evaluate_batch(batches[i], options[i], in3120.SimpleRanker)
+
+        threads = [threading.Thread(target=_evaluate, args=(i,)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertListEqual(results, expected)
+
+        # Any start method will do, as long as the engine and the ranker factory can be pickled. The engine's
+        # cache and tracer stay behind.
+        engine = in3120.SimpleSearchEngine(corpus, index, in3120.QueryCache(),
+                                           in3120.RecordingTracer(lambda trace: None))
+        method = multiprocessing.get_start_method()
+        try:
+            multiprocessing.set_start_method("spawn", force=True)
+            self.assertListEqual(engine.evaluate_batch(batches[1], options[1], in3120.SimpleRanker, 2), expected[1])
+        finally:
+            multiprocessing.set_start_method(method, force=True)
+
+    def test_taat_static_scores_and_ties(self):
+        corpus = in3120.InMemoryCorpus()
+        for i in range(0, 20):
+            corpus.add_document(in3120.InMemoryDocument(i, {"a": "foo bar" if i % 3 else "foo",
+                                                            "static_quality_score": (i % 4) / 10.0}))
+        index = in3120.InMemoryInvertedIndex(corpus, ["a"], self.__normalizer, self.__tokenizer)
+        self._test_strategies_agree(corpus, index, ["foo", "foo bar", "bar baz", "foo foo bar"],
+                                    [in3120.SimpleRanker(), in3120.BetterRanker(corpus, index)], "taat")
+
+    def test_taat_falls_back_to_daat(self):
+        class UpdatingRanker(in3120.SimpleRanker):
+            def __init__(self):
+                super().__init__()
+                self.updates = 0
+
+            def update(self, term: str, multiplicity: int, posting: in3120.Posting) -> None:
+                self.updates += 1
+                super().update(term, multiplicity, posting)
+
+            def get_term_score(self, term: str, multiplicity: int, term_frequency: int):
+                return None
+
+        corpus = in3120.InMemoryCorpus("../data/mesh.txt")
+        index = in3120.InMemoryInvertedIndex(corpus, ["body"], self.__normalizer, self.__tokenizer)
+        engine = in3120.SimpleSearchEngine(corpus, index)
+        options = {"match_threshold": 0.0, "hit_count": 5}
+        rankers = [UpdatingRanker(), in3120.SimpleRanker()]
+        matches = [list(engine.evaluate("water pollution", dict(options, strategy="taat"), ranker)) for ranker in rankers]
+        self.assertListEqual(matches[0], matches[1])
+        self.assertGreater(rankers[0].updates, 0)
+
+    def test_wand_prunes(self):
+        class CountingRanker(in3120.BetterRanker):
+            def __init__(self, corpus: in3120.Corpus, inverted_index: in3120.InvertedIndex):
+                super().__init__(corpus, inverted_index)
+                self.updates = 0
+
+            def update(self, term: str, multiplicity: int, posting: in3120.Posting) -> None:
+                self.updates += 1
+                super().update(term, multiplicity, posting)
+
+        class UnboundedRanker(CountingRanker):
+            def get_upper_bound(self, term: str, multiplicity: int, maximum_term_frequency: int):
+                return None
+
+        corpus = in3120.InMemoryCorpus("../data/cran.xml")
+        index = in3120.InMemoryInvertedIndex(corpus, ["body"], self.__normalizer, self.__tokenizer)
+        engine = in3120.SimpleSearchEngine(corpus, index)
+        options = {"match_threshold": 0.0, "hit_count": 5}
+        rankers = [CountingRanker(corpus, index), CountingRanker(corpus, index), UnboundedRanker(corpus, index)]
+        matches = [list(engine.evaluate("flow of the wing", dict(options, strategy=strategy), ranker))
+                   for (strategy, ranker) in zip(["daat", "wand", "wand"], rankers)]
+        self.assertEqual(len(matches[0]), 5)
+        self.assertListEqual(matches[0], matches[1])
+        self.assertListEqual(matches[0], matches[2])
+        self.assertLess(rankers[1].updates, rankers[0].updates / 4)
+        self.assertEqual(rankers[2].updates, rankers[0].updates)  # No bounds, no pruning.
+
+    def test_statistics(self):
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"a": "foo bar"}))
+        corpus.add_document(in3120.InMemoryDocument(1, {"a": "foo"}))
+        corpus.add_document(in3120.InMemoryDocument(2, {"a": "bar baz"}))
+        index = in3120.InMemoryInvertedIndex(corpus, ["a"], self.__normalizer, self.__tokenizer)
+        engine = in3120.SimpleSearchEngine(corpus, index)
+        ranker = in3120.SimpleRanker()
+        self.assertDictEqual(engine.get_statistics(), {})
+        self.assertEqual(len(list(engine.evaluate("foo bar", {"match_threshold": 1.0}, ranker))), 1)
+        self.assertDictEqual(engine.get_statistics(), {"queries": 1, "postings": 4})
+        self.assertEqual(len(list(engine.evaluate("foo wtf", {"match_threshold": 0.0}, ranker))), 2)
+        self.assertDictEqual(engine.get_statistics(), {"queries": 2, "postings": 6})
+
+    def test_many_query_terms(self):
+        from itertools import product
+        corpus = in3120.InMemoryCorpus()
+        words = ["".join(term) for term in product("bcd", "aei", "jkl")]
+        for i in range(0, 1000):
+            text = " ".join(words[(i * j) % len(words)] for j in range(1, 12))
+            corpus.add_document(in3120.InMemoryDocument(corpus.size(), {"a": text}))
+        index = in3120.InMemoryInvertedIndex(corpus, ["a"], self.__normalizer, self.__tokenizer)
+        engine = in3120.SimpleSearchEngine(corpus, index)
+        query = " ".join(words)
+        for match_threshold in [0.0, 0.2, 0.4]:
+            matches = list(engine.evaluate(query, {"match_threshold": match_threshold, "hit_count": 100},
+                                           in3120.SimpleRanker()))
+            self.assertGreater(len(matches), 0)
+            for i in range(1, len(matches)):
+                self.assertGreaterEqual(matches[i - 1]["score"], matches[i]["score"])
+            for match in matches:
+                terms = set(index.get_terms(match["document"]["a"]))
+                self.assertGreaterEqual(len(terms), max(1, int(match_threshold * len(words))))
+
     def test_uses_yield(self):
         import types
         corpus = in3120.InMemoryCorpus()
@@ -0,0 +1,58 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from context import in3120
+
+
+class TestSpimiIndexBuilder(unittest.TestCase):
+
+    def setUp(self):
+        self._normalizer = in3120.SimpleNormalizer()
+        self._tokenizer = in3120.SimpleTokenizer()
+        self._directory = tempfile.TemporaryDirectory()
+        self._filename = os.path.join(self._directory.name, "index.bin")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def _test_agrees_with_in_memory_index(self, corpus, fields, memory_budget):
+        builder = in3120.SpimiIndexBuilder(fields, self._normalizer, self._tokenizer, memory_budget)
+        runs = builder.build(corpus, self._filename)
+        index1 = in3120.InMemoryInvertedIndex(corpus, fields, self._normalizer, self._tokenizer)
+        with in3120.MappedInvertedIndex(self._filename, self._normalizer, self._tokenizer) as index2:
+            terms = sorted(index1.get_indexed_terms())
+            self.assertListEqual(terms, list(index2.get_indexed_terms()))
+            for term in terms:
+                self.assertEqual(index1.get_document_frequency(term), index2.get_document_frequency(term))
+                self.assertEqual(index1.get_maximum_term_frequency(term), index2.get_maximum_term_frequency(term))
+                self.assertListEqual([(p.document_id, p.term_frequency) for p in index1[term]],
+                                     [(p.document_id, p.term_frequency) for p in index2[term]])
+        return runs
+
+    def test_single_run(self):
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"a": "this is a Test", "b": "ØØ"}))
+        corpus.add_document(in3120.InMemoryDocument(1, {"a": "test TEST prØve"}))
+        self.assertEqual(self._test_agrees_with_in_memory_index(corpus, ["a", "b"], 1000000), 1)
+
+    def test_many_runs(self):
+        corpus = in3120.InMemoryCorpus("../data/mesh.txt")
+        self.assertGreater(self._test_agrees_with_in_memory_index(corpus, ["body"], 50000), 10)
+
+    def test_empty_corpus(self):
+        self.assertEqual(self._test_agrees_with_in_memory_index(in3120.InMemoryCorpus(), ["body"], 1000), 0)
+
+    def test_unsorted_documents(self):
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(1, {"a": "foo"}), False)
+        corpus.add_document(in3120.InMemoryDocument(0, {"a": "bar"}), False)
+        builder = in3120.SpimiIndexBuilder(["a"], self._normalizer, self._tokenizer)
+        with self.assertRaises(AssertionError):
+            builder.build(corpus, self._filename)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,221 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import threading
+import unittest
+from context import in3120
+
+
+class TestTracer(unittest.TestCase):
+
+    def setUp(self):
+        self._now = 0.0
+        self._traces = []
+        self._normalizer = in3120.SimpleNormalizer()
+        self._tokenizer = in3120.SimpleTokenizer()
+        self._corpus = in3120.InMemoryCorpus()
+        self._corpus.add_document(in3120.InMemoryDocument(0, {"body": "this is a test"}))
+        self._corpus.add_document(in3120.InMemoryDocument(1, {"body": "test test"}))
+        self._corpus.add_document(in3120.InMemoryDocument(2, {"body": "this is another test"}))
+        self._index = in3120.InMemoryInvertedIndex(self._corpus, ["body"], self._normalizer, self._tokenizer)
+
+    def _clock(self) -> float:
+        self._now += 1.0
+        return self._now
+
+    def test_does_nothing_by_default(self):
+        tracer = in3120.Tracer()
+        with tracer.trace("Engine", "query"):
+            with tracer.span("stage"):
+                tracer.count("counter")
+        engine = in3120.SimpleSearchEngine(self._corpus, self._index)
+        results = list(engine.evaluate("this test", {"match_threshold": 1.0}, in3120.SimpleRanker()))
+        self.assertSetEqual({r["document"].document_id for r in results}, {0, 2})
+
+    def test_stays_lazy_unless_recording(self):
+        # A tracer that doesn't record gets told about the work only once the client has consumed all results.
+        counters = []
+
+        class _Tracer(in3120.Tracer):
+            def count(self, counter: str, value: int = 1) -> None:
+                counters.append(counter)
+
+        trie = in3120.Trie()
+        trie.add(["abba", "abbor", "ørret"], self._tokenizer)
+        finder = in3120.StringFinder(trie, self._tokenizer, _Tracer())
+        results = finder.scan("abba abbor")
+        self.assertEqual(next(results)["match"], "abba")
+        self.assertListEqual(counters, [])
+        self.assertEqual(next(results)["match"], "abbor")
+        self.assertListEqual(list(results), [])
+        self.assertListEqual(counters, ["trie_nodes", "candidates"])
+        counters.clear()
+        engine = in3120.EditSearchEngine(trie, _Tracer())
+        results = engine.evaluate("abba", {"upper_bound": 1})
+        self.assertListEqual(counters, [])
+        self.assertEqual(next(results)["match"], "abba")
+        self.assertListEqual(counters, ["trie_nodes", "candidates"])
+        engine = in3120.SuffixArray(self._corpus, ["body"], self._normalizer, self._tokenizer, tracer=_Tracer())
+        counters.clear()
+        results = engine.evaluate("tes", {"hit_count": 5})
+        self.assertListEqual(counters, [])
+        self.assertEqual(next(results)["document"].document_id, 1)
+        self.assertListEqual(counters, ["candidates"])
+
+        # Documents are looked up in the corpus as the results are consumed.
+        lookups = []
+
+        class _Corpus(in3120.InMemoryCorpus):
+            def get_document(self, document_id: int) -> in3120.Document:
+                lookups.append(document_id)
+                return super().get_document(document_id)
+
+        corpus = _Corpus()
+        for document in self._corpus:
+            corpus.add_document(document)
+        engine = in3120.SimpleSearchEngine(corpus, self._index, tracer=_Tracer())
+        results = engine.evaluate("this test", {"match_threshold": 1.0}, in3120.SimpleRanker())
+        next(results)
+        self.assertEqual(len(lookups), 1)
+        self.assertEqual(len(list(results)), 1)
+        self.assertEqual(len(lookups), 2)
+        engine = in3120.SimpleSearchEngine(corpus, self._index, tracer=in3120.RecordingTracer(self._traces.append))
+        lookups.clear()
+        next(engine.evaluate("this test", {"match_threshold": 1.0}, in3120.SimpleRanker()))
+        self.assertEqual(len(lookups), 2)
+
+    def test_spans_and_counters(self):
+        tracer = in3120.RecordingTracer(self._traces.append, self._clock)
+        with tracer.trace("Engine", "query"):
+            tracer.count("counter", 2)
+            with tracer.span("a"):
+                pass
+            with tracer.span("b"):
+                tracer.count("counter")
+            with tracer.span("a"):
+                pass
+        tracer.count("counter")
+        with tracer.span("c"):
+            pass
+        self.assertEqual(len(self._traces), 1)
+        trace = self._traces[0]
+        self.assertEqual(trace["engine"], "Engine")
+        self.assertEqual(trace["query"], "query")
+        self.assertDictEqual(trace["spans"], {"a": 2.0, "b": 1.0})
+        self.assertDictEqual(trace["counters"], {"counter": 3})
+        self.assertEqual(trace["duration"], 7.0)
+
+    def test_nested_traces_are_merged(self):
+        tracer = in3120.RecordingTracer(self._traces.append, self._clock)
+        with tracer.trace("Outer", "foo"):
+            with tracer.trace("Inner", "bar"):
+                tracer.count("counter")
+        self.assertEqual(len(self._traces), 1)
+        self.assertEqual(self._traces[0]["engine"], "Outer")
+        self.assertDictEqual(self._traces[0]["counters"], {"counter": 1})
+
+    def test_trace_is_exported_on_errors(self):
+        tracer = in3120.RecordingTracer(self._traces.append, self._clock)
+        with self.assertRaises(AssertionError):
+            with tracer.trace("Engine", "query"):
+                with tracer.span("stage"):
+                    assert False
+        self.assertEqual(len(self._traces), 1)
+        self.assertIn("stage", self._traces[0]["spans"])
+
+    def test_json_lines_exporter(self):
+        stream = io.StringIO()
+        tracer = in3120.RecordingTracer(in3120.JsonLinesExporter(stream))
+        engine = in3120.SimpleSearchEngine(self._corpus, self._index, tracer=tracer)
+        ranker = in3120.SimpleRanker()
+        for strategy in ["daat", "wand", "taat"]:
+            list(engine.evaluate("this test", {"match_threshold": 1.0, "strategy": strategy}, ranker))
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        for line in lines:
+            trace = json.loads(line)
+            self.assertEqual(trace["engine"], "SimpleSearchEngine")
+            self.assertEqual(trace["query"], "this test")
+            self.assertGreaterEqual(trace["duration"], sum(trace["spans"].values()) - 1e-6)
+            self.assertLessEqual({"normalize", "expand", "fetch", "traverse", "sieve", "materialize"}, set(trace["spans"]))
+            self.assertEqual(trace["counters"]["candidates"], 2)
+            self.assertGreater(trace["counters"]["postings"], 0)
+
+    def test_simple_search_engine(self):
+        tracer = in3120.RecordingTracer(self._traces.append, self._clock)
+        cache = in3120.QueryCache()
+        engine = in3120.SimpleSearchEngine(self._corpus, self._index, cache, tracer)
+        ranker = in3120.SimpleRanker()
+        options = {"match_threshold": 1.0}
+        list(engine.evaluate("this test", options, ranker))
+        list(engine.evaluate("test this", options, ranker))
+        list(engine.evaluate("this test", options, ranker))
+        self.assertEqual(len(self._traces), 3)
+        self.assertDictEqual(self._traces[0]["counters"], {"cache_misses": 1, "postings": 5, "candidates": 2})
+        self.assertDictEqual(self._traces[1]["counters"], {"cache_misses": 1, "postings": 5, "candidates": 2})
+        self.assertDictEqual(self._traces[2]["counters"], {"cache_hits": 1})
+        self.assertListEqual(list(self._traces[2]["spans"]), ["normalize"])
+
+    def test_suffix_array(self):
+        tracer = in3120.RecordingTracer(self._traces.append, self._clock)
+        engine = in3120.SuffixArray(self._corpus, ["body"], self._normalizer, self._tokenizer, tracer=tracer)
+        results = list(engine.evaluate("tes", {"hit_count": 5}))
+        self.assertListEqual([(r["document"].document_id, r["score"]) for r in results], [(1, 2), (0, 1), (2, 1)])
+        self.assertEqual(len(self._traces), 1)
+        self.assertEqual(self._traces[0]["engine"], "SuffixArray")
+        self.assertListEqual(sorted(self._traces[0]["spans"]), ["materialize", "normalize", "score", "traverse"])
+        self.assertDictEqual(self._traces[0]["counters"], {"candidates": 4})
+
+    def test_edit_search_engine(self):
+        tracer = in3120.RecordingTracer(self._traces.append, self._clock)
+        trie = in3120.Trie()
+        trie.add(["abba", "abbor", "ørret"], self._tokenizer)
+        engine = in3120.EditSearchEngine(trie, tracer)
+        results = list(engine.evaluate("abba", {"upper_bound": 1}))
+        self.assertListEqual([r["match"] for r in results], ["abba"])
+        self.assertEqual(len(self._traces), 1)
+        self.assertListEqual(sorted(self._traces[0]["spans"]), ["sieve", "traverse"])
+        self.assertEqual(self._traces[0]["counters"]["candidates"], 1)
+        self.assertGreater(self._traces[0]["counters"]["trie_nodes"], 4)
+        self.assertLess(self._traces[0]["counters"]["trie_nodes"], len("abba") + len("abbor") + len("ørret") + 1)
+
+    def test_string_finder(self):
+        tracer = in3120.RecordingTracer(self._traces.append, self._clock)
+        trie = in3120.Trie()
+        trie.add(["romerike", "apple computer", "apple"], self._tokenizer)
+        finder = in3120.StringFinder(trie, self._tokenizer, tracer)
+        results = list(finder.scan("the apple computer is from romerike"))
+        self.assertListEqual([r["match"] for r in results], ["apple", "apple computer", "romerike"])
+        self.assertEqual(len(self._traces), 1)
+        self.assertEqual(self._traces[0]["engine"], "StringFinder")
+        self.assertListEqual(list(self._traces[0]["spans"]), ["traverse"])
+        self.assertEqual(self._traces[0]["counters"]["candidates"], 3)
+        self.assertGreater(self._traces[0]["counters"]["trie_nodes"], 0)
+
+    def test_shared_between_threads(self):
+        stream = io.StringIO()
+        tracer = in3120.RecordingTracer(in3120.JsonLinesExporter(stream))
+        engine = in3120.SimpleSearchEngine(self._corpus, self._index, tracer=tracer)
+        queries = ["this", "test", "another", "this test"]
+
+        def _evaluate(query: str) -> None:
+            ranker = in3120.SimpleRanker()
+            for _ in range(25):
+                list(engine.evaluate(query, {"match_threshold": 1.0}, ranker))
+
+        threads = [threading.Thread(target=_evaluate, args=(query,)) for query in queries]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        traces = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(len(traces), 25 * len(queries))
+        expected = {"this": 2, "test": 3, "another": 1, "this test": 2}
+        for trace in traces:
+            self.assertEqual(trace["counters"]["candidates"], expected[trace["query"]])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
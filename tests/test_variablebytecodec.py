@@ -31,6 +31,39 @@ class TestVariableByteCodec(unittest.TestCase):
         self.assertEqual(in3120.VariableByteCodec.decode(data, 11), (214577, 3))
         self.assertEqual(in3120.VariableByteCodec.decode(data, 14), (134217728, 4))
 
+    def test_encode_and_decode_many(self):
+        import random
+        rng = random.Random(1234)
+        numbers = [rng.choice([rng.randint(0, 127), rng.randint(0, 100000), rng.randint(0, 2 ** 62)]) for _ in range(1000)]
+        numbers += [0, 127, 128, 16383, 16384, 2 ** 63 - 1]
+        data = bytearray()
+        for number in numbers:
+            in3120.VariableByteCodec.encode(number, data)
+        self.assertEqual(in3120.VariableByteCodec.encode_many(numbers), bytes(data))
+        self.assertEqual(in3120.VariableByteCodec.encode_many(iter(numbers)), bytes(data))
+        self.assertEqual(in3120.VariableByteCodec.encode_many([]), b"")
+        (decoded, used) = in3120.VariableByteCodec.decode_many(data)
+        self.assertListEqual([int(n) for n in decoded], numbers)
+        self.assertEqual(used, len(data))
+        (decoded, used) = in3120.VariableByteCodec.decode_many(data, 3)
+        self.assertListEqual([int(n) for n in decoded], numbers[:3])
+        (decoded, _) = in3120.VariableByteCodec.decode_many(data, 2, used)
+        self.assertListEqual([int(n) for n in decoded], numbers[3:5])
+        self.assertEqual(in3120.VariableByteCodec.decode_many(data, 0)[1], 0)
+        with self.assertRaises(IndexError):
+            in3120.VariableByteCodec.decode_many(data, len(numbers) + 1)
+        with self.assertRaises(AssertionError):
+            in3120.VariableByteCodec.encode_many([1, -1])
+
+    def test_decode_gaps(self):
+        data = in3120.VariableByteCodec.encode_many([5, 1, 200, 3])
+        (numbers, used) = in3120.VariableByteCodec.decode_gaps(data)
+        self.assertListEqual(list(numbers), [5, 6, 206, 209])
+        self.assertEqual(used, 5)
+        (numbers, used) = in3120.VariableByteCodec.decode_gaps(data, 2, 1, 1000)
+        self.assertListEqual(list(numbers), [1001, 1201])
+        self.assertEqual(used, 3)
+
     def test_negative_numbers(self):
         for i in range(1, 5):
             with self.assertRaises(AssertionError):
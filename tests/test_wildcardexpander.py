@@ -0,0 +1,63 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import unittest
+from context import in3120
+
+
+class TestWildcardExpander(unittest.TestCase):
+
+    def setUp(self):
+        self._corpus = in3120.InMemoryCorpus("../data/cran.xml")
+        self._index = in3120.InMemoryInvertedIndex(self._corpus, ["body"], in3120.SimpleNormalizer(),
+                                                   in3120.SimpleTokenizer())
+        self._terms = list(self._index.get_indexed_terms())
+        self._expander = in3120.WildcardExpander(self._index)
+
+    def _expand_by_brute_force(self, pattern: str, limit: int):
+        import re
+        regex = re.compile(".*".join(re.escape(part) for part in pattern.split("*")))
+        matches = [term for term in self._terms if regex.fullmatch(term)]
+        return sorted(matches, key=lambda t: (-self._index.get_document_frequency(t), t))[:limit]
+
+    def test_expand(self):
+        patterns = ["aero*", "*foil", "aero*foil", "a*r*l", "*", "**", "wing", "wing*", "*wing*", "x*y",
+                    "xyzzy*", "*xyzzy", "", "the", "t*e", "a*a", "s*s*s"]
+        for pattern in patterns:
+            for limit in [1, 5, 100000]:
+                with self.subTest(pattern=pattern, limit=limit):
+                    self.assertListEqual(self._expander.expand(pattern, limit), self._expand_by_brute_force(pattern, limit))
+
+    def test_ordered_by_document_frequency(self):
+        terms = self._expander.expand("aero*", 5)
+        self.assertEqual(len(terms), 5)
+        frequencies = [self._index.get_document_frequency(term) for term in terms]
+        self.assertListEqual(frequencies, sorted(frequencies, reverse=True))
+        self.assertIn("aerodynamic", terms)
+
+    def test_fielded(self):
+        corpus = in3120.InMemoryCorpus()
+        corpus.add_document(in3120.InMemoryDocument(0, {"name": "oslo airport", "type": "large_airport"}))
+        corpus.add_document(in3120.InMemoryDocument(1, {"name": "bergen heliport", "type": "heliport"}))
+        index = in3120.InMemoryInvertedIndex(corpus, ["name", "type"], in3120.SimpleNormalizer(),
+                                             in3120.SimpleTokenizer(), fielded=True)
+        expander = in3120.WildcardExpander(index)
+        self.assertListEqual(expander.expand("*port"), ["airport", "heliport", "large_airport"])
+        self.assertListEqual(expander.expand("name:*port"), ["name:airport", "name:heliport"])
+        self.assertListEqual(expander.expand("type:*"), ["type:heliport", "type:large_airport"])
+        self.assertListEqual(expander.expand("*:heli*"), [])
+
+    def test_empty_vocabulary(self):
+        corpus = in3120.InMemoryCorpus()
+        index = in3120.InMemoryInvertedIndex(corpus, ["body"], in3120.SimpleNormalizer(), in3120.SimpleTokenizer())
+        expander = in3120.WildcardExpander(index)
+        self.assertListEqual(expander.expand("*"), [])
+        self.assertListEqual(expander.expand("a*b"), [])
+
+    def test_illegal_limit(self):
+        with self.assertRaises(AssertionError):
+            self._expander.expand("aero*", 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
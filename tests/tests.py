@@ -2,28 +2,41 @@
 # -*- coding: utf-8 -*-
 
 from test_betterranker import TestBetterRanker
+from test_bm25ranker import TestBM25Ranker
 from test_simplenormalizer import TestSimpleNormalizer
 from test_simpleranker import TestSimpleRanker
 from test_simpletokenizer import TestSimpleTokenizer
 from test_compressedinmemorypostinglist import TestCompressedInMemoryPostingList
 from test_documentpipeline import TestDocumentPipeline
 from test_expressioncomposer import TestExpressionComposer
+from test_frontcodeddictionary import TestFrontCodedDictionary
+from test_impactsearchengine import TestImpactSearchEngine
 from test_inmemorycorpus import TestInMemoryCorpus
 from test_inmemorydictionary import TestInMemoryDictionary
 from test_inmemorydocument import TestInMemoryDocument
 from test_inmemoryinvertedindexwithcompression import TestInMemoryInvertedIndexWithCompression
 from test_inmemoryinvertedindexwithoutcompression import TestInMemoryInvertedIndexWithoutCompression
 from test_inmemorypostinglist import TestInMemoryPostingList
+from test_mappedinvertedindex import TestMappedInvertedIndex
 from test_naivebayesclassifier import TestNaiveBayesClassifier
+from test_perfecthashdictionary import TestPerfectHashDictionary
+from test_phrasesearchengine import TestPhraseSearchEngine
+from test_postingcodec import TestPostingCodec
+from test_postingcursor import TestPostingCursor
 from test_postingsmerger import TestPostingsMerger
+from test_querycache import TestQueryCache
 from test_shallowcaseextractor import TestShallowCaseExtractor
 from test_shinglegenerator import TestShingleGenerator
 from test_sieve import TestSieve
+from test_segmentedinvertedindex import TestSegmentedInvertedIndex
+from test_spimiindexbuilder import TestSpimiIndexBuilder
 from test_simplesearchengine import TestSimpleSearchEngine
 from test_stringfinder import TestStringFinder
 from test_suffixarray import TestSuffixArray
 from test_trie import TestTrie
+from test_tracer import TestTracer
 from test_variablebytecodec import TestVariableByteCodec
+from test_wildcardexpander import TestWildcardExpander
 from test_soundexnormalizer import TestSoundexNormalizer
 from test_porternormalizer import TestPorterNormalizer
 from test_similaritysearchengine import TestSimilaritySearchEngine